@@ -1,20 +1,59 @@
+import os
 import sys
-import subprocess
-import shlex
-import re
-from PySide6.QtCore import Qt, QThread, Signal, QSize
-from PySide6.QtGui import QIcon, QPixmap, QPainter, QBrush, QColor, QPen
-from PySide6.QtSvg import QSvgRenderer
+import json
+import hashlib
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from collections import OrderedDict
+from pam_core import (
+    DATA_DIR, DOWNLOAD_WORKERS, popen_cmd, iter_winget_table, winget_search_cmd,
+    write_json_atomic, SearchIndex, Catalog, CatalogEntry, InventoryCache, SearchCache, PackageIndex, BatchScheduler,
+    UpgradeCache, TRACER, ProcessWatch, command_timeout, PRIORITY_USER, PRIORITY_BULK, RotatingLog, ACTION_LABELS,
+    INSTALLER_CACHE_DIR, InstallerCache, prefetch_installers, get_backend, INVENTORY_PATCH_MAX,
+    winget_installed_rows,
+    plan_desired_state, read_profile, write_profile, winget_upgrade_listing,
+)
+from PySide6.QtCore import (
+    Qt, QThread, Signal, QSize, QTimer, QAbstractListModel, QAbstractTableModel, QModelIndex, QRect, QRectF,
+)
+from PySide6.QtGui import QIcon, QPixmap, QPainter, QBrush, QColor, QPen, QFont, QFontMetrics, QPainterPath
 from PySide6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
-    QLineEdit, QPushButton, QLabel, QTreeWidget, QTreeWidgetItem,
-    QMessageBox, QScrollArea, QGridLayout, QFrame, QCheckBox,
-    QProgressBar, QTextEdit, QToolButton, QSizePolicy, QSpacerItem
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget, QLineEdit,
+    QPushButton, QLabel, QTreeWidget, QTreeWidgetItem, QTreeView, QMessageBox,
+    QProgressBar, QSpacerItem, QListView, QStyledItemDelegate, QStyle,
+    QFileDialog, QListWidget, QListWidgetItem, QPlainTextEdit
 )
 
 # --------------------------
 # Configuration / App List
 # --------------------------
+# idle time after the last keystroke before the Winget Search tab queries winget
+SEARCH_DEBOUNCE_MS = 400
+# rendered icons kept in memory, and whether they are saved as a sprite atlas between launches
+ICON_CACHE_SIZE = 256
+ICON_ATLAS = True
+# idle time after the last keystroke before the Explore / Installed filters run
+FILTER_DEBOUNCE_MS = 150
+# delay after the window is shown before the other tabs are built in the background
+IDLE_TAB_DELAY_MS = 300
+# offline index results shown in the Explore grid per filter, and the header they are listed under
+# until the filter text changes (only installing or "Add from Winget" adds them to the catalog)
+PACKAGE_INDEX_FILTER_LIMIT = 24
+PACKAGE_INDEX_CATEGORY = "From the Package Index"
+# where the Save / Apply Profile dialogs start
+PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+# progress log lines kept on screen (all of them go to PROGRESS_LOG_PATH) and how often it is repainted
+PROGRESS_LOG_BLOCKS = 5000
+PROGRESS_FLUSH_MS = 50
+PROGRESS_LOG_PATH = os.path.join(DATA_DIR, "logs", "progress.log")
+# checked Explore apps are downloaded into the installer cache this long after the last click (0: never).
+# Opt-in with PAM_PREFETCH=1: it downloads gigabytes before anything is confirmed, metered connection or not
+PREFETCH_DELAY_MS = 3000 if os.environ.get("PAM_PREFETCH", "0") != "0" else 0
+# how queued tasks are labelled in the Progress tab, by priority
+PRIORITY_NAMES = {0: "removal", 1: "selected", 2: "bulk"}
+
+# "Depends" lists what must be installed first; selecting the app plans those too
 APPS = [
     # Browsers
     {"Name": "Google Chrome", "Id": "Google.Chrome", "Category": "Browsers"},
@@ -50,10 +89,10 @@ APPS = [
     {"Name": "Java", "Id": "Oracle.JavaRuntimeEnvironment", "Category": "Development"},
     {"Name": "Docker Desktop", "Id": "Docker.DockerDesktop", "Category": "Development"},
     {"Name": "Postman", "Id": "Postman.Postman", "Category": "Development"},
-    {"Name": "IntelliJ IDEA Community", "Id": "JetBrains.IntelliJIDEA.Community", "Category": "Development"},
-    {"Name": "PyCharm Community", "Id": "JetBrains.PyCharm.Community", "Category": "Development"},
-    {"Name": "Eclipse IDE", "Id": "EclipseAdoptium.EclipseIDE", "Category": "Development"},
-    {"Name": "NetBeans IDE", "Id": "Apache.NetBeans", "Category": "Development"},
+    {"Name": "IntelliJ IDEA Community", "Id": "JetBrains.IntelliJIDEA.Community", "Category": "Development", "Depends": ["Git.Git"]},
+    {"Name": "PyCharm Community", "Id": "JetBrains.PyCharm.Community", "Category": "Development", "Depends": ["Python.Python.3", "Git.Git"]},
+    {"Name": "Eclipse IDE", "Id": "EclipseAdoptium.EclipseIDE", "Category": "Development", "Depends": ["Oracle.JavaRuntimeEnvironment"]},
+    {"Name": "NetBeans IDE", "Id": "Apache.NetBeans", "Category": "Development", "Depends": ["Oracle.JavaRuntimeEnvironment"]},
     {"Name": "Visual Studio Community", "Id": "Microsoft.VisualStudio.Community", "Category": "Development"},
     {"Name": "Sublime Text", "Id": "SublimeHQ.SublimeText", "Category": "Development"},
     {"Name": "Atom Editor", "Id": "GitHub.Atom", "Category": "Development"},
@@ -66,12 +105,12 @@ APPS = [
     {"Name": "Anaconda", "Id": "Anaconda.Anaconda", "Category": "AI/ML"},
     {"Name": "Miniconda", "Id": "Miniconda.Miniconda3", "Category": "AI/ML"},
     {"Name": "Power BI Desktop", "Id": "Microsoft.PowerBIDesktop", "Category": "AI/ML"},
-    {"Name": "Jupyter Notebook", "Id": "Jupyter.JupyterLab", "Category": "AI/ML"},
+    {"Name": "Jupyter Notebook", "Id": "Jupyter.JupyterLab", "Category": "AI/ML", "Depends": ["Python.Python.3"]},
     {"Name": "R Studio", "Id": "RProject.RStudio", "Category": "AI/ML"},
-    {"Name": "TensorFlow", "Id": "Google.TensorFlow", "Category": "AI/ML"},
-    {"Name": "PyTorch", "Id": "PyTorch.PyTorch", "Category": "AI/ML"},
-    {"Name": "Keras", "Id": "Keras.Keras", "Category": "AI/ML"},
-    {"Name": "Weka", "Id": "UniversityOfWaikato.Weka", "Category": "AI/ML"},
+    {"Name": "TensorFlow", "Id": "Google.TensorFlow", "Category": "AI/ML", "Depends": ["Python.Python.3"]},
+    {"Name": "PyTorch", "Id": "PyTorch.PyTorch", "Category": "AI/ML", "Depends": ["Python.Python.3"]},
+    {"Name": "Keras", "Id": "Keras.Keras", "Category": "AI/ML", "Depends": ["Python.Python.3"]},
+    {"Name": "Weka", "Id": "UniversityOfWaikato.Weka", "Category": "AI/ML", "Depends": ["Oracle.JavaRuntimeEnvironment"]},
     {"Name": "RapidMiner Studio", "Id": "RapidMiner.RapidMinerStudio", "Category": "AI/ML"},
     {"Name": "Orange Data Mining", "Id": "OrangeDataMining.Orange", "Category": "AI/ML"},
     {"Name": "KNIME Analytics Platform", "Id": "KNIME.KNIMEAnalyticsPlatform", "Category": "AI/ML"},
@@ -118,100 +157,618 @@ APPS = [
     {"Name": "SiSoftware Sandra", "Id": "SiSoftware.Sandra", "Category": "PC Test"},
 ]
 
-# --------------------------
-# Winget helpers (robust parsing)
-# --------------------------
-def run_cmd(cmd: str):
-    """Run a shell command and return CompletedProcess"""
-    return subprocess.run(cmd, shell=True, capture_output=True, text=True)
-
-def parse_winget_search_output(output: str):
-    """
-    Parses winget search output lines with regex:
-    - matches lines like: Name  <spaces> Id
-    - Name might contain spaces, Id is usually last token with no spaces
-    """
-    items = []
-    lines = output.splitlines()
-    # skip potential header lines until a line that looks like data exists
-    for ln in lines:
-        ln = ln.rstrip()
-        if not ln:
-            continue
-        # attempt to capture: name (anything) then 2+ spaces then id (last token)
-        m = re.match(r'^(?P<name>.+?)\s{2,}(?P<id>\S+)(?:\s.*)?$', ln)
-        if m:
-            name = m.group('name').strip()
-            appid = m.group('id').strip()
-            items.append({"Name": name, "Id": appid, "Category": "Winget"})
-    return items
-
-def winget_search_apps(query: str):
-    try:
-        res = run_cmd(f'winget search {shlex.quote(query)}')
-        return parse_winget_search_output(res.stdout)
-    except Exception:
-        return []
-
-def winget_list_installed():
-    try:
-        res = run_cmd('winget list')
-        # parse similar to search
-        return parse_winget_search_output(res.stdout)
-    except Exception:
-        return []
-
-def winget_is_installed(app_id: str) -> bool:
-    res = run_cmd(f'winget list --id {shlex.quote(app_id)} --exact')
-    return app_id.lower() in (res.stdout or "").lower()
-
-def winget_install_or_update(app_id: str):
-    # run install or upgrade, return CompletedProcess
-    if winget_is_installed(app_id):
-        return run_cmd(f'winget upgrade --id {shlex.quote(app_id)} --exact --silent --accept-package-agreements --accept-source-agreements')
-    else:
-        return run_cmd(f'winget install --id {shlex.quote(app_id)} --exact --silent --accept-package-agreements --accept-source-agreements')
-
-def winget_uninstall(app_id: str):
-    return run_cmd(f'winget uninstall --id {shlex.quote(app_id)} --exact --silent')
-
 # --------------------------
 # Worker thread
 # --------------------------
 class WorkerThread(QThread):
     progress_signal = Signal(str, int)     # message, percent
+    package_progress_signal = Signal(str, int, int)  # app id, package percent, total percent (throttled)
+    queue_signal = Signal()                # the pending tasks changed
     finished_signal = Signal(str)          # summary
-    def __init__(self, tasks, action_label):
+    def __init__(self, tasks, action_label, max_workers=DOWNLOAD_WORKERS, snapshot=None, plan=None, priority=None,
+                 cache=None):
         super().__init__()
         self.tasks = tasks[:]  # list of app ids
         self.action_label = action_label
-        self._cancelled = False
+        # plan is a DeploymentPlan whose decisions replace the snapshot classification
+        self.plan = plan
+        self.priority = priority
+        # the tasks are queued from run(): queuing already reports skips, and the signals
+        # are only connected once the thread is constructed
+        self.scheduler = BatchScheduler([], action_label, max_workers,
+                                        self.progress_signal.emit, snapshot,
+                                        self.package_progress_signal.emit,
+                                        queue_changed=self.queue_signal.emit, cache=cache)
+
+    def add(self, ids, action_label, plan=None, priority=None):
+        """Queue more work on the running batch; None once it is finishing (start another then)"""
+        action = "uninstall" if action_label == ACTION_LABELS["uninstall"] else "install"
+        return self.scheduler.add(ids, action, priority, plan and plan.versions, plan and plan.actions(),
+                                  plan and plan.depends)
 
     def run(self):
-        total = len(self.tasks) if self.tasks else 1
-        for idx, app_id in enumerate(self.tasks):
-            if self._cancelled:
-                self.progress_signal.emit("Cancelled by user", 0)
-                self.finished_signal.emit("Cancelled")
-                return
-            msg = f"{self.action_label} {app_id}..."
-            percent = int((idx / total) * 100)
-            # emit start message
-            self.progress_signal.emit(msg, percent)
-            # perform action
-            try:
-                if self.action_label == "Uninstalling":
-                    winget_uninstall(app_id)
-                else:
-                    winget_install_or_update(app_id)
-                self.progress_signal.emit(f"{self.action_label} done for {app_id}", min(99, percent + 10))
-            except Exception as e:
-                self.progress_signal.emit(f"Error for {app_id}: {e}", min(99, percent + 10))
+        with TRACER.span("worker", "ui", action=self.action_label, packages=len(self.tasks)):
+            self.add(self.tasks, self.action_label, self.plan, self.priority)
+            self.scheduler.run()
+        if self.scheduler.cancelled:
+            self.progress_signal.emit("Cancelled by user", 0)
+            self.finished_signal.emit("Cancelled")
+            return
         self.progress_signal.emit(f"{self.action_label} Completed", 100)
         self.finished_signal.emit("Done")
 
+    def touched(self):
+        """Ids whose installed state this batch may have changed"""
+        return [app_id for app_id, result in self.scheduler.results.items()
+                if result not in ("skipped", "removed", "blocked")]
+
+    def cancel(self):
+        self.scheduler.cancel()
+
+
+class SearchThread(QThread):
+    """
+    Streams `winget search` results; cancel() kills the process so stale results never arrive.
+    Backends that answer a search whole (the helper) are asked instead, and cancel() drops the answer.
+    """
+    item_signal = Signal(dict)             # one result, as soon as winget prints it
+    done_signal = Signal(list)             # all results, not emitted when cancelled
+    def __init__(self, query, cache=None, source=None, index=None):
+        super().__init__()
+        self.query = query
+        self.cache = cache
+        self.source = source
+        self.index = index
+        # set by cancel(); the ProcessWatch kills the search even if it starts after that
+        self.stop = threading.Event()
+
+    def run(self):
+        with TRACER.span("search", "ui", query=self.query) as sp:
+            sp.args["from"], sp.args["rows"] = self._search()
+
+    def _search(self):
+        """Returns where the results came from and how many there were"""
+        origin = "index"
+        if self.index is not None and self.index.fresh and self.source in (None, "winget"):
+            cached = self.index.search(self.query)
+        else:
+            origin = "cache"
+            cached = self.cache.get(self.query, self.source) if self.cache is not None else None
+        if cached is not None:
+            for item in cached:
+                self.item_signal.emit(item)
+            self.done_signal.emit(cached)
+            return origin, len(cached)
+        items = []
+        backend = get_backend()
+        try:
+            if not self.stop.is_set() and not backend.streams_search:
+                items = backend.search(self.query, self.source)
+                if not self.stop.is_set():
+                    for item in items:
+                        self.item_signal.emit(item)
+            elif not self.stop.is_set():
+                proc = popen_cmd(winget_search_cmd(self.query, self.source))
+                with ProcessWatch(proc, command_timeout("winget search"), self.stop):
+                    for item in iter_winget_table(proc.stdout):
+                        if self.stop.is_set():
+                            break
+                        items.append(item)
+                        self.item_signal.emit(item)
+                    proc.wait()
+        except Exception:
+            pass  # a failed search shows no results, as winget_search_apps does
+        if not self.stop.is_set():
+            if self.cache is not None and items:
+                self.cache.put(self.query, items, self.source)
+            self.done_signal.emit(items)
+        return ("cancelled" if self.stop.is_set() else "winget"), len(items)
+
     def cancel(self):
-        self._cancelled = True
+        self.stop.set()
+
+
+class InventoryThread(QThread):
+    """Loads the whole listing, or with ids re-lists only those packages and patches them in"""
+    loaded_signal = Signal(list)           # installed items
+    patched_signal = Signal(object, list)  # installed items (None when the listing failed), the re-listed ids
+    def __init__(self, inventory, force=False, ids=None, upgrades=None):
+        super().__init__()
+        self.inventory = inventory
+        self.force = force
+        self.ids = ids
+        self.upgrades = upgrades
+        self.stop = threading.Event()  # kills the running winget listing; nothing is emitted
+
+    def run(self):
+        if self.ids is None:
+            items = self.inventory.get(self.force, self.stop)
+            if not self.stop.is_set():
+                self.loaded_signal.emit(items)
+            return
+        rows = winget_installed_rows(self.ids, self.stop)
+        if self.stop.is_set():
+            return
+        if rows is None:
+            self.patched_signal.emit(None, self.ids)
+            return
+        # `winget list` rows carry the Available column too
+        self.upgrades.patch(self.ids, [it for it in rows if it.get("Available")])
+        self.patched_signal.emit(self.inventory.patch(self.ids, rows), self.ids)
+
+
+class PlanThread(QThread):
+    """Diffs a desired state against the installed inventory and one `winget upgrade` listing"""
+    plan_signal = Signal(object)           # DeploymentPlan
+    def __init__(self, inventory, packages, absent=(), upgrades=None, depends=None):
+        super().__init__()
+        self.inventory = inventory
+        self.upgrades = upgrades  # UpgradeCache; None lists upgrades afresh
+        self.packages = packages
+        self.absent = absent
+        self.depends = depends    # lower-cased id -> ids it needs, see Catalog.dependencies
+        self.stop = threading.Event()
+
+    def run(self):
+        snapshot = {it["Id"].lower(): it for it in self.inventory.get(cancel=self.stop)}
+        if self.upgrades is not None:
+            listing = {it["Id"].lower(): it for it in self.upgrades.get(cancel=self.stop)}
+        else:
+            listing = winget_upgrade_listing(self.stop)
+        if self.stop.is_set():
+            return
+        try:
+            plan = plan_desired_state(self.packages, snapshot, listing, self.absent, self.depends)
+        except ValueError:
+            # a dependency cycle: install what was asked for, in the order given
+            plan = plan_desired_state(self.packages, snapshot, listing, self.absent)
+        self.plan_signal.emit(plan)
+
+
+class IndexThread(QThread):
+    refreshed_signal = Signal(int, int)    # packages upserted, removed
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def run(self):
+        self.refreshed_signal.emit(*self.index.refresh())
+
+
+class PrefetchThread(QThread):
+    """Downloads installers into the InstallerCache ahead of the install"""
+    done_signal = Signal(dict)             # app id -> "cached" / "downloaded" / "failed"
+    def __init__(self, cache, app_ids):
+        super().__init__()
+        self.cache = cache
+        self.app_ids = app_ids
+        self.stop = threading.Event()
+
+    def run(self):
+        self.done_signal.emit(prefetch_installers(self.cache, [(app_id, None) for app_id in self.app_ids],
+                                                  cancel=self.stop))
+
+
+# substring of a lower-cased, space/dot-less app name -> svg icon name
+APP_ICON_KEYS = {
+    "chrome": "chrome", "firefox": "firefox", "edge": "edge", "brave": "brave", "opera": "opera",
+    "whatsapp": "whatsapp", "telegram": "telegram", "discord": "discord", "zoom": "zoom", "skype": "skype", "slack": "slack",
+    "vlc": "vlc", "spotify": "spotify", "obs": "obs", "gimp": "gimp", "paint.net": "paint.net", "audacity": "audacity",
+    "krita": "krita", "inkscape": "inkscape", "blender": "blender",
+    "vscode": "vscode", "visualstudiocode": "vscode", "git": "git", "nodejs": "nodejs", "python": "python", "java": "java", "docker": "docker",
+    "postman": "postman", "intellij": "intellij", "pycharm": "pycharm",
+    "anaconda": "anaconda", "7zip": "7zip", "winrar": "winrar", "notepad++": "notepad++", "everything": "everything",
+    "ccleaner": "ccleaner", "sharex": "sharex", "powertoys": "powertoys", "libreoffice": "libreoffice",
+    "steam": "steam", "epicgames": "epicgames", "battle.net": "battle.net", "cpuz": "cpuz", "hwmonitor": "hwmonitor",
+}
+
+@lru_cache(maxsize=4096)
+def app_icon_key(app_name: str) -> str:
+    name_lower = app_name.lower().replace(" ", "").replace(".", "")
+    for key, icon in APP_ICON_KEYS.items():
+        if key in name_lower:
+            return icon
+    return "default"
+
+class IconCache:
+    """
+    Bounded LRU of rendered icons keyed by (icon name, size, background rgba, padding).
+    render(name, size, bg_color, padding) draws a miss. With an atlas path the cache can be
+    saved as one sprite sheet and reloaded on the next launch; sprites whose SVG changed
+    since (svg_hash(name) differs) are ignored.
+    """
+    def __init__(self, render, svg_hash, max_entries=ICON_CACHE_SIZE, atlas_path=None):
+        self.render = render
+        self.svg_hash = svg_hash
+        self.max_entries = max_entries
+        self.atlas_path = atlas_path
+        self.hits = 0
+        self.misses = 0
+        self._pixmaps = OrderedDict()
+
+    @staticmethod
+    def key(name, size, bg_color, padding):
+        return name, size, bg_color.rgba() if bg_color is not None and bg_color.alpha() else 0, padding
+
+    def pixmap(self, name, size=20, bg_color=None, padding=0):
+        key = self.key(name, size, bg_color, padding)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        self.misses += 1
+        pixmap = self.render(name, size, bg_color, padding)
+        self._store(key, pixmap)
+        return pixmap
+
+    def icon(self, name, size=20, bg_color=None, padding=0):
+        return QIcon(self.pixmap(name, size, bg_color, padding))
+
+    def preload(self, specs):
+        """Render (name, size[, bg_color, padding]) specs ahead of first use"""
+        for spec in specs:
+            self.pixmap(*spec)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._pixmaps),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def _store(self, key, pixmap):
+        self._pixmaps[key] = pixmap
+        while len(self._pixmaps) > self.max_entries:
+            self._pixmaps.popitem(last=False)
+
+    def save_atlas(self):
+        if not self.atlas_path or not self._pixmaps:
+            return
+        # one row per sprite height keeps packing trivial; icons come in a handful of sizes
+        width = max(p.width() for p in self._pixmaps.values())
+        height = sum(p.height() for p in self._pixmaps.values())
+        atlas = QPixmap(width, height)
+        atlas.fill(Qt.transparent)
+        painter = QPainter(atlas)
+        index, y = [], 0
+        for (name, size, bg, padding), pixmap in self._pixmaps.items():
+            painter.drawPixmap(0, y, pixmap)
+            index.append([name, size, bg, padding, self.svg_hash(name), y, pixmap.width(), pixmap.height()])
+            y += pixmap.height()
+        painter.end()
+        try:
+            os.makedirs(os.path.dirname(self.atlas_path), exist_ok=True)
+            if atlas.save(f"{self.atlas_path}.png", "PNG"):
+                write_json_atomic(f"{self.atlas_path}.json", index)
+        except OSError:
+            pass
+
+    def load_atlas(self):
+        if not self.atlas_path:
+            return
+        try:
+            with open(f"{self.atlas_path}.json", encoding="utf-8") as fh:
+                index = json.load(fh)
+        except (OSError, ValueError):
+            return
+        atlas = QPixmap(f"{self.atlas_path}.png")
+        if atlas.isNull():
+            return
+        for name, size, bg, padding, digest, y, w, h in index[-self.max_entries:]:
+            if digest == self.svg_hash(name):
+                self._store((name, size, bg, padding), atlas.copy(0, y, w, h))
+
+# --------------------------
+# Explore grid: one model, painted cards
+# --------------------------
+CARD_ICON_BG = QColor(255, 255, 255, 20)
+HeaderRole = Qt.UserRole + 1   # category name on header rows, None on app rows
+AppRole = Qt.UserRole + 2      # CatalogEntry on app rows
+
+class AppGridModel(QAbstractListModel):
+    """
+    Flat model behind the Explore grid: every category is a header row followed by its apps.
+    Check state is kept per app Id, so it survives filtering and collapsing.
+    A section of temporary rows (set_hits) can follow the last category.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []                  # category name (header row) or a CatalogEntry
+        self._counts = OrderedDict()     # category -> number of apps, in display order
+        self._hits_category = None       # header of the temporary section
+        self._hits = []                  # its entries, the last rows
+        self._checked = set()            # app ids
+        self._row_of = None              # app id -> row, rebuilt after inserts
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        header = row if isinstance(row, str) else None
+        if role == HeaderRole:
+            return header
+        if role == AppRole:
+            return None if header else row
+        if role == Qt.DisplayRole:
+            return header or row.name
+        if role == Qt.CheckStateRole and not header:
+            return Qt.Checked if row.id in self._checked else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled
+
+    def add_category(self, category):
+        if category in self._counts:
+            return
+        pos = len(self._rows) - self._hit_rows()
+        self.beginInsertRows(QModelIndex(), pos, pos)
+        self._rows.append(category)
+        self._counts[category] = 0
+        self._row_of = None
+        self.endInsertRows()
+
+    def add_apps(self, entries):
+        """Append catalog entries (already unique, see Catalog.add) to their category sections"""
+        by_cat = OrderedDict()
+        for entry in entries:
+            by_cat.setdefault(entry.category, []).append(entry)
+        for cat, cat_apps in by_cat.items():
+            self.add_category(cat)
+            start = self.category_range(cat)[1]
+            self.beginInsertRows(QModelIndex(), start, start + len(cat_apps) - 1)
+            self._rows[start:start] = cat_apps
+            self._counts[cat] += len(cat_apps)
+            self._row_of = None
+            self.endInsertRows()
+
+    def _hit_rows(self):
+        return len(self._hits) + 1 if self._hits else 0
+
+    def set_hits(self, category, entries):
+        """Replace the temporary section with entries listed under category; no entries removes it"""
+        if category == self._hits_category and [e.id for e in entries] == [e.id for e in self._hits]:
+            return
+        start = len(self._rows) - self._hit_rows()
+        if self._hits:
+            self.beginRemoveRows(QModelIndex(), start, len(self._rows) - 1)
+            del self._rows[start:]
+            self._hits = []
+            self._row_of = None
+            self.endRemoveRows()
+        self._hits_category = category
+        if entries:
+            self.beginInsertRows(QModelIndex(), start, start + len(entries))
+            self._hits = list(entries)
+            self._rows.append(category)
+            self._rows.extend(self._hits)
+            self._row_of = None
+            self.endInsertRows()
+
+    def row_of(self, app_id):
+        if self._row_of is None:
+            self._row_of = {row.id: i for i, row in enumerate(self._rows) if not isinstance(row, str)}
+        return self._row_of[app_id]
+
+    def category_range(self, category):
+        """(header row, end row) of a category section; app rows are header+1 .. end-1"""
+        pos = 0
+        for cat, count in self._counts.items():
+            if cat == category:
+                return pos, pos + 1 + count
+            pos += 1 + count
+        if self._hits and category == self._hits_category:
+            return pos, len(self._rows)
+        raise KeyError(category)
+
+    def app_at(self, row):
+        return self._rows[row]
+
+    def toggle_checked(self, row):
+        self._checked.symmetric_difference_update({self._rows[row].id})
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.CheckStateRole])
+
+    def is_checked(self, app_id):
+        return app_id in self._checked
+
+    def checked_ids(self):
+        return [row.id for row in self._rows if not isinstance(row, str) and row.id in self._checked]
+
+    def apps(self):
+        """(row, entry) for every app row"""
+        return [(i, row) for i, row in enumerate(self._rows) if not isinstance(row, str)]
+
+
+class AppCardDelegate(QStyledItemDelegate):
+    """Paints category headers and app cards; nothing exists per item beyond the model row"""
+    CARD_SIZE = QSize(196, 138)
+    HEADER_HEIGHT = 36
+
+    def __init__(self, view, app_pixmap, chevrons):
+        super().__init__(view)
+        self.view = view
+        self.app_pixmap = app_pixmap  # CatalogEntry -> QPixmap (50x50, background included)
+        self.chevrons = chevrons      # {"expanded": QPixmap, "collapsed": QPixmap}
+        self.collapsed = set()
+        self.name_font = QFont("Segoe UI")
+        self.name_font.setPointSizeF(11)
+        self.id_font = QFont("Segoe UI")
+        self.id_font.setPointSizeF(9)
+        self.header_font = QFont("Segoe UI")
+        self.header_font.setPointSizeF(13)
+        self.header_font.setBold(True)
+
+    # rows are read straight from the model, avoiding a QVariant round trip per role
+    def sizeHint(self, option, index):
+        if isinstance(index.model().app_at(index.row()), str):
+            # full width, so the header always starts a new row of cards
+            width = self.view.viewport().width() - 2 * self.view.spacing() - 1
+            return QSize(max(self.CARD_SIZE.width(), width), self.HEADER_HEIGHT)
+        return self.CARD_SIZE
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        row = index.model().app_at(index.row())
+        if isinstance(row, str):
+            self._paint_header(painter, option.rect, row)
+        else:
+            self._paint_card(painter, option, row, index.model().is_checked(row.id))
+        painter.restore()
+
+    def _paint_header(self, painter, rect, category):
+        chevron = self.chevrons["collapsed" if category in self.collapsed else "expanded"]
+        painter.drawPixmap(rect.left() + 3, rect.center().y() - 9, chevron)
+        painter.setFont(self.header_font)
+        painter.setPen(QColor("#9ad"))
+        painter.drawText(rect.adjusted(32, 0, 0, 0), Qt.AlignVCenter | Qt.AlignLeft, category)
+
+    def _paint_card(self, painter, option, app, checked):
+        rect = option.rect.adjusted(0, 0, -1, -1)
+        hover = bool(option.state & QStyle.State_MouseOver)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#333" if hover else "#2a2a2a"))
+        painter.drawRoundedRect(rect, 8, 8)
+
+        painter.drawPixmap(rect.center().x() - 25, rect.top() + 8, self.app_pixmap(app))
+
+        # checkbox + name
+        box = QRect(rect.left() + 10, rect.top() + 68, 16, 16)
+        painter.setPen(QPen(QColor("#1f6feb" if checked else "#888"), 1.5))
+        painter.setBrush(QColor("#1f6feb") if checked else Qt.NoBrush)
+        painter.drawRoundedRect(box, 3, 3)
+        if checked:
+            tick = QPainterPath()
+            tick.moveTo(box.left() + 3.5, box.center().y() + 0.5)
+            tick.lineTo(box.left() + 6.5, box.bottom() - 3.5)
+            tick.lineTo(box.right() - 3, box.top() + 4)
+            painter.setPen(QPen(QColor("white"), 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPath(tick)
+        painter.setFont(self.name_font)
+        painter.setPen(QColor("#eaeaea"))
+        name_rect = QRect(box.right() + 8, box.top() - 4, rect.right() - box.right() - 16, 24)
+        name = QFontMetrics(self.name_font).elidedText(app.name, Qt.ElideRight, name_rect.width())
+        painter.drawText(name_rect, Qt.AlignVCenter | Qt.AlignLeft, name)
+
+        painter.setFont(self.id_font)
+        painter.setPen(QColor("#aaa"))
+        id_rect = QRect(rect.left() + 10, rect.top() + 92, rect.width() - 20, rect.bottom() - rect.top() - 96)
+        painter.drawText(id_rect, Qt.AlignTop | Qt.AlignLeft | Qt.TextWrapAnywhere, app.id)
+
+
+# --------------------------
+# Installed tab: keyed model
+# --------------------------
+# looked up once: the view asks for every role of every cell, and Qt enum attributes are slow to read
+DISPLAY_ROLE = Qt.DisplayRole
+
+class InstalledModel(QAbstractTableModel):
+    """
+    Installed packages keyed by lower-cased Id, sorted outdated first, then by name. apply()
+    turns a new listing into row inserts, removals, one re-sort and dataChanged for just the
+    rows that differ, so the view keeps its selection, scroll position and hidden (filtered) rows.
+    """
+    COLUMNS = ("Name", "Id", "Version", "Available")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cols = {}    # key -> [name, id, version, available]
+        self._order = []   # sort keys in row order, see _sort_key
+
+    @staticmethod
+    def _sort_key(key, cols):
+        return (not cols[3], cols[0].lower(), key)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=DISPLAY_ROLE):
+        if role != DISPLAY_ROLE or not index.isValid():
+            return None
+        return self._cols[self._order[index.row()][2]][index.column()]
+
+    def headerData(self, section, orientation, role=DISPLAY_ROLE):
+        if orientation == Qt.Horizontal and role == DISPLAY_ROLE:
+            return self.COLUMNS[section]
+        return None
+
+    def keys(self):
+        return self._cols.keys()
+
+    def columns(self, key):
+        return self._cols[key]
+
+    def app_id(self, row):
+        return self._cols[self._order[row][2]][1]
+
+    def row_of(self, key):
+        return bisect_left(self._order, self._sort_key(key, self._cols[key]))
+
+    def outdated(self):
+        """Ids with a newer version, in row order (outdated rows come first)"""
+        ids = []
+        for _, _, key in self._order:
+            cols = self._cols[key]
+            if not cols[3]:
+                break
+            ids.append(cols[1])
+        return ids
+
+    def reset(self, rows):
+        """Replace everything with rows (key -> columns): one reset instead of per-row signals"""
+        self.beginResetModel()
+        self._cols = {key: list(cols) for key, cols in rows.items()}
+        self._order = sorted(self._sort_key(key, cols) for key, cols in self._cols.items())
+        self.endResetModel()
+
+    def apply(self, rows, keys=None):
+        """
+        Bring the rows under keys (default: every key, old or new) in line with rows (key ->
+        columns); returns the keys whose row was inserted or changed.
+        """
+        keys = set(self._cols).union(rows) if keys is None else set(keys)
+        removed = sorted((self.row_of(key) for key in keys if key in self._cols and key not in rows), reverse=True)
+        added = [key for key in keys if key in rows and key not in self._cols]
+        changed = [key for key in keys if key in rows and key in self._cols and rows[key] != self._cols[key]]
+        for row in removed:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._cols[self._order.pop(row)[2]]
+            self.endRemoveRows()
+        for key in added:
+            sort_key = self._sort_key(key, rows[key])
+            row = bisect_left(self._order, sort_key)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._order.insert(row, sort_key)
+            self._cols[key] = list(rows[key])
+            self.endInsertRows()
+        moved = [key for key in changed if self._sort_key(key, rows[key]) != self._sort_key(key, self._cols[key])]
+        if moved:
+            # one re-sort with the persistent indexes (selection, hidden rows) carried to the new rows,
+            # instead of a move per row that each walk all of them
+            self.layoutAboutToBeChanged.emit()
+            persistent = self.persistentIndexList()
+            held = [(self._order[i.row()][2], i.column()) for i in persistent]
+            for key in changed:
+                self._cols[key] = list(rows[key])
+            self._order = sorted(self._sort_key(key, cols) for key, cols in self._cols.items())
+            self.changePersistentIndexList(persistent, [self.createIndex(self.row_of(key), column)
+                                                        for key, column in held])
+            self.layoutChanged.emit()
+        else:
+            for key in changed:
+                self._cols[key] = list(rows[key])
+        last = len(self.COLUMNS) - 1
+        for key in changed:
+            row = self.row_of(key)
+            self.dataChanged.emit(self.createIndex(row, 0), self.createIndex(row, last))
+        return set(added).union(changed)
 
 
 # --------------------------
@@ -249,7 +806,7 @@ class AppManager(QWidget):
                 color: #f0f0f0;
                 border-bottom: none;
             }
-            QLineEdit, QTextEdit {
+            QLineEdit, QTextEdit, QPlainTextEdit {
                 background-color: #2a2a2a;
                 color: #ffffff;
                 border: 1px solid #444;
@@ -277,14 +834,14 @@ class AppManager(QWidget):
                 border: none;
                 background-color: transparent;
             }
-            QTreeWidget {
+            QTreeView {
                 background-color: #1e1e1e;
                 color: #e8e8e8;
                 border: 1px solid #333;
                 border-radius: 8px;
                 padding: 5px;
             }
-            QTreeWidget::item {
+            QTreeView::item {
                 padding: 5px 0;
             }
             QHeaderView::section {
@@ -293,44 +850,88 @@ class AppManager(QWidget):
                 padding: 5px;
                 border: 1px solid #444;
             }
-            .category-header {
-                font-weight: bold;
-                font-size: 13pt;
-                color:#9ad;
-                padding: 5px;
-            }
-            .app-card {
-                background-color:#2a2a2a;
-                border-radius:8px;
-                padding:8px;
-            }
-            .app-card:hover {
-                background-color:#333;
-            }
-            .icon-background {
-                background-color: rgba(255, 255, 255, 0.1);
-                border-radius: 10px;
-                padding: 5px;
-            }
         """)
-        self.task_queue = []
         self.worker = None
+        self._deferred = []  # work queued while the last batch was finishing
+        self._plan_priority = PRIORITY_USER
+        self._pending_plans = []  # start_plan calls made while a plan was being worked out
+        self.icons = IconCache(self.render_named_icon, self.svg_hash,
+                               atlas_path=os.path.join(DATA_DIR, "icon_atlas") if ICON_ATLAS else None)
+        self.icons.load_atlas()
+        # glyphs shared by the tab bar, buttons, category headers and app cards
+        self.icons.preload([("search", 20), ("explore", 20), ("installed", 20), ("progress", 20),
+                            ("search", 16), ("installed", 16), ("update", 16), ("refresh", 16),
+                            ("uninstall", 16), ("expanded", 18), ("collapsed", 18),
+                            ("default", 40, CARD_ICON_BG, 5)])
+        self.catalog = Catalog(APPS)
+        self.inventory = InventoryCache()
+        self.inventory_thread = None
+        self._inventory_pending = False
+        self.upgrades = UpgradeCache()
+        self.upgrades_thread = None
+        self._upgrades_pending = False
+        self._outdated = []  # ids of installed packages with a newer version, as shown
+        self.search_thread = None
+        self._search_explicit = False
+        self.inject_thread = None
+        self.plan_thread = None
+        self.search_cache = SearchCache()  # shared by Winget Search and "Add from Winget"
+        self.package_index = PackageIndex()
+        self.index_thread = None
+        self.installer_cache = InstallerCache() if INSTALLER_CACHE_DIR else None
+        self.prefetch_thread = None
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(PREFETCH_DELAY_MS)
+        self.prefetch_timer.timeout.connect(self.prefetch_checked)
+        self._search_threads = set()  # keeps cancelled searches alive until their thread exits
 
         root = QVBoxLayout(self)
         self.tabs = QTabWidget()
         root.addWidget(self.tabs)
 
-        self.setup_winget_tab()
-        self.setup_explore_tab()
-        self.setup_installed_tab()
-        self.setup_progress_tab()
-        self.tabs.setTabIcon(0, self.get_svg_icon(self.get_svg_string("search")))
-        self.tabs.setTabIcon(1, self.get_svg_icon(self.get_svg_string("explore")))
-        self.tabs.setTabIcon(2, self.get_svg_icon(self.get_svg_string("installed")))
-        self.tabs.setTabIcon(3, self.get_svg_icon(self.get_svg_string("progress")))
+        # tabs start as empty pages; only the default one is filled before the first paint,
+        # the others when first shown or in idle time after startup (see ensure_tab)
+        self._tab_builders = {}
+        for name, title, icon, build in (
+                ("winget", "Winget Search", "search", self.setup_winget_tab),
+                ("explore", "Explore / Browse", "explore", self.setup_explore_tab),
+                ("installed", "Installed • Update / Uninstall", "installed", self.setup_installed_tab),
+                ("progress", "Progress", "progress", self.setup_progress_tab)):
+            page = QWidget()
+            setattr(self, f"tab_{name}", page)
+            self.tabs.addTab(page, self.icons.icon(icon), title)
+            self._tab_builders[page] = build
 
         # Set "Explore / Browse" as the default tab
-        self.tabs.setCurrentIndex(1)
+        self.ensure_tab(self.tab_explore)
+        self.tabs.setCurrentWidget(self.tab_explore)
+        self.tabs.currentChanged.connect(lambda i: self.ensure_tab(self.tabs.widget(i)))
+
+    def ensure_tab(self, page):
+        """Build a tab's widgets if that has not happened yet"""
+        build = self._tab_builders.pop(page, None)
+        if build:
+            build()
+
+    def tab_built(self, page):
+        return page not in self._tab_builders
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._tab_builders:
+            # leave the first frames to the default tab
+            QTimer.singleShot(IDLE_TAB_DELAY_MS, self._build_idle_tab)
+        if self.index_thread is None and self.package_index.source and self.package_index.stale:
+            self.index_thread = IndexThread(self.package_index)
+            QTimer.singleShot(IDLE_TAB_DELAY_MS, self.index_thread.start)
+
+    def _build_idle_tab(self):
+        """Build one pending tab per event loop pass, so input is never held up for long"""
+        if self._tab_builders:
+            self.ensure_tab(next(iter(self._tab_builders)))
+        if self._tab_builders:
+            QTimer.singleShot(0, self._build_idle_tab)
 
 
     def get_svg_string(self, name):
@@ -393,40 +994,38 @@ class AppManager(QWidget):
         return svg_icons.get(name, svg_icons["default"])
 
     def get_svg_icon(self, svg_string: str, size: int = 20, bg_color: QColor = QColor("transparent"), padding: int = 0):
+        return QIcon(self.render_svg_pixmap(svg_string, size, bg_color, padding))
+
+    def render_svg_pixmap(self, svg_string: str, size: int = 20, bg_color: QColor = None, padding: int = 0):
         # Create a pixmap for the final icon
         pixmap_size = size + 2 * padding
         pixmap = QPixmap(pixmap_size, pixmap_size)
         pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
 
         # Draw the background if a color is provided
-        if bg_color.isValid() and bg_color.alpha() > 0:
-            painter = QPainter(pixmap)
-            painter.setRenderHint(QPainter.Antialiasing)
+        if bg_color is not None and bg_color.isValid() and bg_color.alpha() > 0:
             painter.setBrush(QBrush(bg_color))
             painter.setPen(QPen(Qt.NoPen))
             painter.drawRoundedRect(0, 0, pixmap_size, pixmap_size, 10, 10)
-            painter.end()
 
-        # Render the SVG on top
+        # Render the SVG on top, in the same pass. QtSvg is imported on first use: with a
+        # warm icon atlas nothing is rendered at startup and the module is never loaded
+        from PySide6.QtSvg import QSvgRenderer
         renderer = QSvgRenderer(svg_string.encode('utf-8'))
-        icon_pixmap = QPixmap(size, size)
-        icon_pixmap.fill(Qt.transparent)
-        painter = QPainter(icon_pixmap)
-        renderer.render(painter)
+        renderer.render(painter, QRectF(padding, padding, size, size))
         painter.end()
+        return pixmap
 
-        # Combine background and icon
-        final_painter = QPainter(pixmap)
-        final_painter.drawPixmap(padding, padding, icon_pixmap)
-        final_painter.end()
-        
-        return QIcon(pixmap)
+    def render_named_icon(self, name, size, bg_color, padding):
+        return self.render_svg_pixmap(self.get_svg_string(name), size, bg_color, padding)
+
+    def svg_hash(self, name):
+        return hashlib.sha1(self.get_svg_string(name).encode("utf-8")).hexdigest()[:12]
 
     # ---------------- Winget Search Tab ----------------
     def setup_winget_tab(self):
-        self.tab_winget = QWidget()
-        self.tabs.addTab(self.tab_winget, "Winget Search")
-        
         l = QVBoxLayout(self.tab_winget)
         top = QHBoxLayout()
         self.search_winget = QLineEdit()
@@ -434,11 +1033,11 @@ class AppManager(QWidget):
         
         self.btn_winget_search = QPushButton("Search")
         self.btn_winget_search.setProperty("class", "secondary")
-        self.btn_winget_search.setIcon(self.get_svg_icon(self.get_svg_string("search"), 16))
+        self.btn_winget_search.setIcon(self.icons.icon("search", 16))
         self.btn_winget_search.clicked.connect(self.on_winget_search)
 
         self.btn_winget_install = QPushButton("Install Selected")
-        self.btn_winget_install.setIcon(self.get_svg_icon(self.get_svg_string("installed"), 16))
+        self.btn_winget_install.setIcon(self.icons.icon("installed", 16))
         self.btn_winget_install.clicked.connect(self.on_winget_install_selected)
         
         top.addWidget(self.search_winget, 1)
@@ -451,19 +1050,62 @@ class AppManager(QWidget):
         self.tree_winget.setSelectionMode(QTreeWidget.MultiSelection)
         l.addWidget(self.tree_winget, 1)
 
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(lambda: self.start_winget_search(explicit=False))
+        self.search_winget.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_winget.returnPressed.connect(self.on_winget_search)
+
+    def start_search_thread(self, previous, query, on_item=None, on_done=None):
+        """Cancel the previous search of the same kind and start a new one"""
+        if previous:
+            previous.cancel()
+        th = SearchThread(query, self.search_cache, index=self.package_index)
+        if on_item:
+            th.item_signal.connect(on_item)
+        if on_done:
+            th.done_signal.connect(on_done)
+        self._search_threads.add(th)
+        th.finished.connect(lambda: self._search_threads.discard(th))
+        th.start()
+        return th
+
     def on_winget_search(self):
         q = self.search_winget.text().strip()
         if not q:
             QMessageBox.information(self, "Info", "Type something to search.")
             return
+        self.start_winget_search(explicit=True)
+
+    def start_winget_search(self, explicit):
+        self.search_timer.stop()
+        q = self.search_winget.text().strip()
         self.tree_winget.clear()
-        apps = winget_search_apps(q)
-        if not apps:
-            QMessageBox.information(self, "Info", "No results.")
+        if not q:
+            if self.search_thread:
+                self.search_thread.cancel()
+                self.search_thread = None
+            return
+        self._search_explicit = explicit
+        self.search_thread = self.start_search_thread(self.search_thread, q,
+                                                      self.on_winget_search_item, self.on_winget_search_done)
+
+    def on_winget_search_item(self, a):
+        if self.sender() is not self.search_thread:
             return
-        for a in apps:
-            node = QTreeWidgetItem([a["Name"], a["Id"]])
-            self.tree_winget.addTopLevelItem(node)
+        node = QTreeWidgetItem([a["Name"], a["Id"]])
+        self.tree_winget.addTopLevelItem(node)
+
+    def on_winget_search_done(self, apps):
+        if self.sender() is not self.search_thread:
+            return
+        st = self.search_cache.stats()
+        self.search_winget.setToolTip(f"Search cache: {st['hits']} hits, {st['misses']} misses, "
+                                      f"{st['entries']} entries ({st['hit_rate']:.0%} hit rate)")
+        # only an explicit search pops up a dialog, not every pause while typing
+        if not apps and self._search_explicit:
+            QMessageBox.information(self, "Info", "No results.")
 
     def on_winget_install_selected(self):
         sel = self.tree_winget.selectedItems()
@@ -471,14 +1113,10 @@ class AppManager(QWidget):
             QMessageBox.information(self, "Info", "Select items first.")
             return
         ids = [it.text(1) for it in sel]
-        self.task_queue.append(("Installing/Updating", ids))
-        self.process_task_queue()
+        self.queue_tasks(ACTION_LABELS["install"], ids)
 
     # ---------------- Explore Tab (categories + integrated winget-inject) ----------------
     def setup_explore_tab(self):
-        self.tab_explore = QWidget()
-        self.tabs.addTab(self.tab_explore, "Explore / Browse")
-
         v = QVBoxLayout(self.tab_explore)
         top = QHBoxLayout()
         self.search_explore = QLineEdit()
@@ -486,196 +1124,258 @@ class AppManager(QWidget):
         
         self.btn_add_winget = QPushButton("Add from Winget")
         self.btn_add_winget.setProperty("class", "secondary")
-        self.btn_add_winget.setIcon(self.get_svg_icon(self.get_svg_string("search"), 16))
+        self.btn_add_winget.setIcon(self.icons.icon("search", 16))
         self.btn_add_winget.clicked.connect(self.inject_winget_search_into_grid)
         
         self.btn_install_update = QPushButton("Install/Update Selected")
-        self.btn_install_update.setIcon(self.get_svg_icon(self.get_svg_string("update"), 16))
+        self.btn_install_update.setIcon(self.icons.icon("update", 16))
         self.btn_install_update.clicked.connect(self.install_selected_from_grid)
+
+        self.btn_save_profile = QPushButton("Save Profile")
+        self.btn_save_profile.setProperty("class", "secondary")
+        self.btn_save_profile.clicked.connect(self.save_profile)
+
+        self.btn_apply_profile = QPushButton("Apply Profile")
+        self.btn_apply_profile.setProperty("class", "secondary")
+        self.btn_apply_profile.clicked.connect(self.apply_profile)
         
         top.addWidget(self.search_explore, 1)
         top.addWidget(self.btn_add_winget)
+        top.addWidget(self.btn_save_profile)
+        top.addWidget(self.btn_apply_profile)
         top.addWidget(self.btn_install_update)
         v.addLayout(top)
 
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        container = QWidget()
-        self.grid = QVBoxLayout(container)
-        self.grid.setSpacing(18)
-        self.grid.addStretch(1) # Stretch at the bottom to push content up
-        scroll.setWidget(container)
-        v.addWidget(scroll, 1)
-
-        self.app_cards = []
-        self.category_blocks = {}
-
-        categories = sorted({a["Category"] for a in APPS})
-        for cat in categories:
-            self._create_category_block(cat)
-
-        for app in APPS:
-            self._add_app_card(app)
-
-        self.search_explore.textChanged.connect(self.filter_explore_grid)
-        
-    def _create_category_block(self, category_name):
-        block_frame = QFrame()
-        block_frame.setObjectName("categoryBlockFrame")
-        block_frame.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-        block_layout = QVBoxLayout(block_frame)
-        block_layout.setContentsMargins(0, 0, 0, 0)
-        
-        header_widget = QWidget()
-        header_layout = QHBoxLayout(header_widget)
-        header_layout.setContentsMargins(0, 0, 0, 0)
-
-        toggle = QToolButton()
-        toggle.setObjectName("categoryToggle")
-        toggle.setCheckable(True)
-        toggle.setChecked(True)
-        toggle.setFixedSize(24, 24)
-        toggle.setIconSize(QSize(18, 18))
-        toggle.setIcon(self.get_svg_icon(self.get_svg_string("expanded"), 18))
-
-        header_label = QLabel(category_name)
-        header_label.setProperty("class", "category-header")
-
-        header_layout.addWidget(toggle)
-        header_layout.addWidget(header_label)
-        header_layout.addStretch()
-
-        cards_container = QWidget()
-        cards_layout = QGridLayout(cards_container)
-        cards_layout.setSpacing(10)
-        cards_container._cards_layout = cards_layout
-        
-        block_layout.addWidget(header_widget)
-        block_layout.addWidget(cards_container)
-        
-        def on_toggle(checked):
-            cards_container.setVisible(checked)
-            toggle.setIcon(self.get_svg_icon(self.get_svg_string("expanded" if checked else "collapsed"), 18))
-        
-        toggle.clicked.connect(on_toggle)
-        header_widget.mousePressEvent = lambda event: toggle.click()
-
-        self.grid.insertWidget(self.grid.count() - 1, block_frame)
-        self.category_blocks[category_name] = {
-            "frame": block_frame,
-            "cards_container": cards_container,
-            "layout": cards_layout,
-            "next_pos": (0, 0),
-            "header": header_widget
-        }
-
-    def _add_app_card(self, app):
-        cat = app.get("Category", "Other")
-        if cat not in self.category_blocks:
-            self._create_category_block(cat)
-        block = self.category_blocks[cat]
-        layout = block["layout"]
-        r, c = block["next_pos"]
-
-        card = QFrame()
-        card.setProperty("class", "app-card")
-        card_layout = QVBoxLayout(card)
-        
-        icon_bg_label = QLabel()
-        icon_bg_label.setFixedSize(50, 50)
-        icon_bg_label.setStyleSheet("background-color: rgba(255, 255, 255, 0.1); border-radius: 10px;")
-        icon_bg_layout = QHBoxLayout(icon_bg_label)
-        icon_bg_layout.setContentsMargins(0, 0, 0, 0)
-        
-        icon_label = QLabel()
-        icon_label.setFixedSize(40, 40)
-        icon_label.setPixmap(self.get_app_icon(app["Name"]).pixmap(40, 40))
-        icon_bg_layout.addWidget(icon_label, alignment=Qt.AlignCenter)
-        
-        card_layout.addWidget(icon_bg_label, alignment=Qt.AlignCenter)
-        
-        chk = QCheckBox(app["Name"])
-        chk.setStyleSheet("font-size:11pt; color: #eaeaea;")
-        chk.app_id = app["Id"]
-        
-        lbl_id = QLabel(app["Id"])
-        lbl_id.setStyleSheet("font-size:9pt; color:#aaa;")
-        lbl_id.setWordWrap(True)
-
-        card_layout.addWidget(chk)
-        card_layout.addWidget(lbl_id)
-
-        card._checkbox = chk
-        card._app = app
-
-        layout.addWidget(card, r, c)
-        self.app_cards.append(card)
-        self.category_blocks[cat]["next_pos"] = (r, c + 1) if c + 1 < 4 else (r + 1, 0)
+        self.app_model = AppGridModel(self)
+        chevrons = {name: self.icons.pixmap(name, 18) for name in ("expanded", "collapsed")}
+        self.grid_view = QListView()
+        self.grid_view.setViewMode(QListView.IconMode)
+        self.grid_view.setFlow(QListView.LeftToRight)
+        self.grid_view.setWrapping(True)
+        self.grid_view.setResizeMode(QListView.Adjust)
+        self.grid_view.setMovement(QListView.Static)
+        self.grid_view.setSpacing(6)
+        self.grid_view.setLayoutMode(QListView.Batched)  # lay out large catalogs in slices
+        self.grid_view.setBatchSize(500)
+        self.grid_view.setSelectionMode(QListView.NoSelection)
+        self.grid_view.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.grid_view.setMouseTracking(True)
+        self.grid_view.viewport().setAttribute(Qt.WA_Hover)
+        self.grid_view.setStyleSheet("QListView { border: none; }")
+        self.grid_delegate = AppCardDelegate(self.grid_view, self.app_pixmap, chevrons)
+        self.grid_view.setItemDelegate(self.grid_delegate)
+        self.grid_view.setModel(self.app_model)
+        self.grid_view.clicked.connect(self.on_grid_clicked)
+        v.addWidget(self.grid_view, 1)
+
+        self._explore_matches = None  # app ids matching the filter, None when it is empty
+        self._index_hits = {}         # lower-cased id -> package index row shown for the filter, not in the catalog
+        for cat in sorted(self.catalog.categories()):
+            self.app_model.add_category(cat)
+        self.app_model.add_apps(self.catalog)
+
+        self.explore_filter_timer = QTimer(self)
+        self.explore_filter_timer.setSingleShot(True)
+        self.explore_filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.explore_filter_timer.timeout.connect(lambda: self.filter_explore_grid(self.search_explore.text()))
+        self.search_explore.textChanged.connect(lambda _: self.explore_filter_timer.start())
+
+    def _add_grid_apps(self, apps, category=None):
+        """Merge winget rows into the catalog and show the ones it did not know yet"""
+        added = self.catalog.add_many(apps, category)
+        self.app_model.add_apps(added)
+        return added
+
+    def on_grid_clicked(self, index):
+        row = self.app_model.app_at(index.row())
+        if isinstance(row, str):
+            self.toggle_category(row)
+        else:
+            self.app_model.toggle_checked(index.row())
+            if self.installer_cache is not None and PREFETCH_DELAY_MS:
+                self.prefetch_timer.start()
+
+    def prefetch_checked(self):
+        """Fill the installer cache with the checked apps while the user is still picking"""
+        if self.prefetch_thread and self.prefetch_thread.isRunning():
+            self.prefetch_timer.start()  # try again once this round is done
+            return
+        missing = [app_id for app_id in self.app_model.checked_ids() if self.installer_cache.lookup(app_id) is None]
+        if missing:
+            self.prefetch_thread = PrefetchThread(self.installer_cache, missing)
+            self.prefetch_thread.start()
+
+    def toggle_category(self, category):
+        collapsed = self.grid_delegate.collapsed
+        collapsed.symmetric_difference_update({category})
+        header, end = self.app_model.category_range(category)
+        self._update_rows(range(header + 1, end))
+        self.grid_view.update(self.app_model.index(header))
+
+    def _update_rows(self, rows):
+        """Re-apply collapse and filter state to the given app rows"""
+        model = self.app_model
+        matches = self._explore_matches
+        collapsed = self.grid_delegate.collapsed
+        for row in rows:
+            app = model.app_at(row)
+            visible = (app.category not in collapsed
+                       and (matches is None or app.id in matches or app.category == PACKAGE_INDEX_CATEGORY))
+            if self.grid_view.isRowHidden(row) == visible:
+                self.grid_view.setRowHidden(row, not visible)
+
+    def app_pixmap(self, app):
+        return self.icons.pixmap(app_icon_key(app.name), 40, CARD_ICON_BG, 5)
 
     def get_app_icon(self, app_name):
-        name_lower = app_name.lower().replace(" ", "").replace(".", "")
-        icon_dict = {
-            "chrome": "chrome", "firefox": "firefox", "edge": "edge", "brave": "brave", "opera": "opera",
-            "whatsapp": "whatsapp", "telegram": "telegram", "discord": "discord", "zoom": "zoom", "skype": "skype", "slack": "slack",
-            "vlc": "vlc", "spotify": "spotify", "obs": "obs", "gimp": "gimp", "paint.net": "paint.net", "audacity": "audacity",
-            "krita": "krita", "inkscape": "inkscape", "blender": "blender",
-            "vscode": "vscode", "visualstudiocode": "vscode", "git": "git", "nodejs": "nodejs", "python": "python", "java": "java", "docker": "docker",
-            "postman": "postman", "intellij": "intellij", "pycharm": "pycharm",
-            "anaconda": "anaconda", "7zip": "7zip", "winrar": "winrar", "notepad++": "notepad++", "everything": "everything",
-            "ccleaner": "ccleaner", "sharex": "sharex", "powertoys": "powertoys", "libreoffice": "libreoffice",
-            "steam": "steam", "epicgames": "epicgames", "battle.net": "battle.net", "cpuz": "cpuz", "hwmonitor": "hwmonitor",
-        }
-        
-        icon_key = ""
-        for key in icon_dict:
-            if key in name_lower:
-                icon_key = icon_dict[key]
-                break
-
-        svg_string = self.get_svg_string(icon_key if icon_key else "default")
-        return self.get_svg_icon(svg_string, size=40, bg_color=QColor(255, 255, 255, 20), padding=5)
+        return self.icons.icon(app_icon_key(app_name), 40, CARD_ICON_BG, 5)
 
     def inject_winget_search_into_grid(self):
         term = self.search_explore.text().strip()
         if not term:
             QMessageBox.information(self, "Info", "Type a search term in the filter box to add results from Winget.")
             return
-        apps = winget_search_apps(term)
+        self.inject_thread = self.start_search_thread(self.inject_thread, term,
+                                                      on_done=self.on_inject_search_done)
+
+    def on_inject_search_done(self, apps):
+        if self.sender() is not self.inject_thread:
+            return
         if not apps:
             QMessageBox.information(self, "Info", "No winget results.")
             return
         
-        cat = "Search Results"
-        if cat not in self.category_blocks:
-            self._create_category_block(cat)
-        
-        for a in apps:
-            already = any(card._app.get("Id") == a["Id"] for card in self.app_cards)
-            if already:
-                continue
-            self._add_app_card(a)
+        # ids already in the catalog are merged, not added twice
+        self._drop_index_hits(a["Id"] for a in apps)
+        added = self._add_grid_apps(apps, "Search Results")
+        if self._explore_matches is not None:
+            self._explore_matches |= self.catalog.index.filter(self.search_explore.text())
+        self._update_rows(self.app_model.row_of(e.id) for e in added)
 
     def filter_explore_grid(self, text):
-        q = text.strip().lower()
-        for card in self.app_cards:
-            name = card._checkbox.text().lower()
-            aid = (card._app.get("Id") or "").lower()
-            visible = (q in name) or (q in aid) or (q == "")
-            card.setVisible(visible)
+        with TRACER.span("filter explore", "ui", text=text):
+            self._filter_explore_grid(text)
+
+    def _filter_explore_grid(self, text):
+        previous = self._explore_matches
+        found = []
+        if len(text.strip()) >= 2 and self.package_index.fresh:
+            # the offline index also lists matching packages the catalog does not know
+            found = self.package_index.search(text, PACKAGE_INDEX_FILTER_LIMIT)
+        hits = {self.catalog.get(a["Id"]).id for a in found if a["Id"] in self.catalog}
+        self._set_index_hits([a for a in found if a["Id"] not in self.catalog])
+        current = self.catalog.index.filter(text) | hits if text.strip() else None
+        self._explore_matches = current
+        # only rows whose match state flips (or that were just added) are touched
+        if previous is None and current is None:
+            return
+        if previous is None or current is None:
+            changed = {e.id for e in self.catalog} - (previous if current is None else current)
+        else:
+            changed = previous ^ current
+        row_of = self.app_model.row_of
+        self._update_rows(sorted(row_of(app_id) for app_id in changed))
+
+    def _set_index_hits(self, rows):
+        """Show package index rows in the temporary section below the catalog, replacing the previous ones"""
+        self._index_hits = {a["Id"].lower(): a for a in rows}
+        entries = [CatalogEntry(a["Id"], a.get("Name") or a["Id"], PACKAGE_INDEX_CATEGORY,
+                                a.get("Version", ""), a.get("Source", "")) for a in self._index_hits.values()]
+        self.app_model.set_hits(PACKAGE_INDEX_CATEGORY, entries)
+        if entries:
+            header, end = self.app_model.category_range(PACKAGE_INDEX_CATEGORY)
+            self._update_rows(range(header + 1, end))
+
+    def _drop_index_hits(self, ids):
+        """Take ids out of the temporary section, e.g. before they are added to the catalog"""
+        drop = {app_id.lower() for app_id in ids}
+        if drop & self._index_hits.keys():
+            self._set_index_hits([a for key, a in self._index_hits.items() if key not in drop])
+
+    def _keep_index_hits(self, ids):
+        """Add the package index rows among ids to the catalog, where they stay after the filter changes"""
+        rows = [self._index_hits[app_id.lower()] for app_id in ids if app_id.lower() in self._index_hits]
+        if not rows:
+            return
+        self._drop_index_hits(a["Id"] for a in rows)
+        added = self._add_grid_apps(rows, "Search Results")
+        if self._explore_matches is not None:
+            self._explore_matches |= {e.id for e in added}
+        self._update_rows(self.app_model.row_of(e.id) for e in added)
 
     def install_selected_from_grid(self):
-        selected = [card._checkbox.app_id for card in self.app_cards if card._checkbox.isChecked()]
+        selected = self.app_model.checked_ids()
         if not selected:
             QMessageBox.information(self, "Info", "Select apps first.")
             return
-        self.task_queue.append(("Installing/Updating", selected))
-        self.process_task_queue()
+        self._keep_index_hits(selected)
+        self.start_plan([(app_id, None) for app_id in selected])
+
+    # ---------------- Profiles / desired state ----------------
+    def start_plan(self, packages, absent=(), priority=PRIORITY_USER):
+        """Work out in the background what the packages actually need, then confirm that plan"""
+        if self.plan_thread and self.plan_thread.isRunning():
+            # one plan at a time: this one is worked out (and confirmed) after the running one
+            self._pending_plans.append((packages, absent, priority))
+            return
+        self._plan_priority = priority
+        self.btn_install_update.setEnabled(False)
+        self.btn_install_update.setText("Planning...")
+        self.btn_apply_profile.setEnabled(False)
+        self.plan_thread = PlanThread(self.inventory, packages, absent, self.upgrades, self.catalog.dependencies())
+        self.plan_thread.plan_signal.connect(self.on_plan_thread_ready)
+        self.plan_thread.start()
+
+    def on_plan_thread_ready(self, plan):
+        self.on_plan_ready(plan)
+        if self._pending_plans:
+            self.plan_thread.wait()  # it emits last thing: isRunning() may still be true for a moment
+            self.start_plan(*self._pending_plans.pop(0))
+            return
+        self.btn_install_update.setEnabled(True)
+        self.btn_install_update.setText("Install/Update Selected")
+        self.btn_apply_profile.setEnabled(True)
+
+    def on_plan_ready(self, plan, priority=None):
+        if not plan:
+            QMessageBox.information(self, "Info", f"Nothing to do: {plan.summary()}.")
+            return
+        box = QMessageBox(QMessageBox.Question, "Confirm changes", f"{plan.summary()}.\n\nApply these changes?",
+                          QMessageBox.Yes | QMessageBox.No, self)
+        box.setDetailedText("\n".join(plan.describe()))
+        if box.exec() != QMessageBox.Yes:
+            return
+        priority = self._plan_priority if priority is None else priority
+        if plan.install or plan.upgrade:
+            self.queue_tasks(ACTION_LABELS["install"], plan.install + plan.upgrade, plan, priority)
+        if plan.remove:
+            self.queue_tasks(ACTION_LABELS["uninstall"], plan.remove)
+
+    def save_profile(self):
+        selected = self.app_model.checked_ids()
+        if not selected:
+            QMessageBox.information(self, "Info", "Select the apps the profile should contain first.")
+            return
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path, _ = QFileDialog.getSaveFileName(self, "Save Profile", os.path.join(PROFILE_DIR, "profile.json"),
+                                              "Profiles (*.json)")
+        if path:
+            write_profile(path, [(app_id, None) for app_id in selected])
+
+    def apply_profile(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Apply Profile", PROFILE_DIR,
+                                              "Profiles (*.json *.txt);;All files (*)")
+        if not path:
+            return
+        try:
+            packages, absent = read_profile(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            QMessageBox.warning(self, "Profile", f"Cannot read {path}: {e}")
+            return
+        self.start_plan(packages, absent, PRIORITY_BULK)
 
     # ---------------- Installed Tab ----------------
     def setup_installed_tab(self):
-        self.tab_installed = QWidget()
-        self.tabs.addTab(self.tab_installed, "Installed • Update / Uninstall")
-        
         v = QVBoxLayout(self.tab_installed)
         top = QHBoxLayout()
         self.search_installed = QLineEdit()
@@ -683,73 +1383,221 @@ class AppManager(QWidget):
         
         self.btn_refresh_installed = QPushButton("Refresh")
         self.btn_refresh_installed.setProperty("class", "secondary")
-        self.btn_refresh_installed.setIcon(self.get_svg_icon(self.get_svg_string("refresh"), 16))
+        self.btn_refresh_installed.setIcon(self.icons.icon("refresh", 16))
         
         self.btn_update_selected = QPushButton("Update Selected")
-        self.btn_update_selected.setIcon(self.get_svg_icon(self.get_svg_string("update"), 16))
+        self.btn_update_selected.setIcon(self.icons.icon("update", 16))
         
         self.btn_uninstall_selected = QPushButton("Uninstall Selected")
-        self.btn_uninstall_selected.setIcon(self.get_svg_icon(self.get_svg_string("uninstall"), 16))
+        self.btn_uninstall_selected.setIcon(self.icons.icon("uninstall", 16))
+
+        self.btn_upgrade_outdated = QPushButton("Upgrade All Outdated")
+        self.btn_upgrade_outdated.setIcon(self.icons.icon("update", 16))
+        self.btn_upgrade_outdated.setEnabled(False)
 
         top.addWidget(self.search_installed, 1)
         top.addWidget(self.btn_refresh_installed)
+        top.addWidget(self.btn_upgrade_outdated)
         top.addWidget(self.btn_update_selected)
         top.addWidget(self.btn_uninstall_selected)
         v.addLayout(top)
 
-        self.tree_installed = QTreeWidget()
-        self.tree_installed.setHeaderLabels(["Name", "Id", "Version", "Available"])
-        self.tree_installed.setSelectionMode(QTreeWidget.MultiSelection)
+        self.installed_model = InstalledModel(self)
+        self.tree_installed = QTreeView()
+        self.tree_installed.setModel(self.installed_model)
+        self.tree_installed.setRootIsDecorated(False)
+        self.tree_installed.setUniformRowHeights(True)
+        self.tree_installed.setSelectionMode(QTreeView.MultiSelection)
+        self.tree_installed.setSelectionBehavior(QTreeView.SelectRows)
         v.addWidget(self.tree_installed, 1)
 
-        self.btn_refresh_installed.clicked.connect(self.populate_installed)
+        self.btn_refresh_installed.clicked.connect(lambda: self.refresh_installed(force=True))
         self.btn_update_selected.clicked.connect(self.update_selected_installed)
+        self.btn_upgrade_outdated.clicked.connect(self.upgrade_all_outdated)
         self.btn_uninstall_selected.clicked.connect(self.uninstall_selected_installed)
-        self.search_installed.textChanged.connect(self.filter_installed)
-        self.populate_installed()
-    
-    def populate_installed(self):
-        self.tree_installed.clear()
-        items = winget_list_installed()
+        self.installed_index = SearchIndex()
+        self._installed_matches = None  # keys (lower-cased ids) matching the filter, None when empty
+        self.installed_filter_timer = QTimer(self)
+        self.installed_filter_timer.setSingleShot(True)
+        self.installed_filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.installed_filter_timer.timeout.connect(lambda: self.filter_installed(self.search_installed.text()))
+        self.search_installed.textChanged.connect(lambda _: self.installed_filter_timer.start())
+        # show the cached list right away, revalidate it off the GUI thread
+        self.populate_installed(self.inventory.items)
+        self.refresh_installed()
+
+    def refresh_installed(self, force=False):
+        self.refresh_upgrades(force)
+        if not force and not self.inventory.stale:
+            return
+        if self.inventory_thread and self.inventory_thread.isRunning():
+            # results of the running listing may predate the latest batch
+            self._inventory_pending = True
+            return
+        self.btn_refresh_installed.setEnabled(False)
+        self.inventory_thread = InventoryThread(self.inventory, force)
+        self.inventory_thread.loaded_signal.connect(self.on_inventory_loaded)
+        self.inventory_thread.start()
+
+    def patch_installed(self, ids):
+        """Re-list only ids (e.g. a finished batch's packages) and update just their rows"""
+        if self.inventory_thread and self.inventory_thread.isRunning():
+            self.inventory.invalidate()
+            self.upgrades.invalidate()
+            self.refresh_installed(force=True)
+            return
+        self.inventory_thread = InventoryThread(self.inventory, ids=ids, upgrades=self.upgrades)
+        self.inventory_thread.patched_signal.connect(self.on_inventory_patched)
+        self.inventory_thread.start()
+
+    def on_inventory_patched(self, items, ids):
+        if items is None:
+            # listing the packages failed: list everything instead
+            self.inventory_thread.wait()
+            self.inventory.invalidate()
+            self.upgrades.invalidate()
+            if self.tab_built(self.tab_installed):
+                self.refresh_installed(force=True)
+            return
+        if self.tab_built(self.tab_installed):
+            self.on_inventory_loaded(items, ids)
+
+    def on_inventory_loaded(self, items, ids=None):
+        self.btn_refresh_installed.setEnabled(True)
+        self.populate_installed(items, ids)
+        if self._inventory_pending:
+            self._inventory_pending = False
+            self.inventory_thread.wait()
+            self.refresh_installed(force=True)
+
+    def refresh_upgrades(self, force=False):
+        """One background `winget upgrade` fills the Available column for every row"""
+        if not force and not self.upgrades.stale:
+            return
+        if self.upgrades_thread and self.upgrades_thread.isRunning():
+            self._upgrades_pending = force
+            return
+        self.upgrades_thread = InventoryThread(self.upgrades, force)
+        self.upgrades_thread.loaded_signal.connect(self.on_upgrades_loaded)
+        self.upgrades_thread.start()
+
+    def on_upgrades_loaded(self, items):
+        self.populate_installed(self.inventory.items)
+        if self._upgrades_pending:
+            self._upgrades_pending = False
+            self.upgrades_thread.wait()
+            self.refresh_upgrades(force=True)
+
+    def populate_installed(self, items, ids=None):
+        with TRACER.span("populate installed", "ui", rows=len(items), patched=ids is not None) as sp:
+            sp.args["changed"] = self._populate_installed(items, ids)
+
+    def _populate_installed(self, items, ids=None):
+        """Show items; with ids, only those packages' rows are compared. Returns the number of rows updated"""
+        keys = None if ids is None else {app_id.lower() for app_id in ids}
+        available = self.upgrades.available()
+        rows = {}
         for it in items:
-            row = QTreeWidgetItem([it.get("Name", ""), it.get("Id", ""), "", ""])
-            self.tree_installed.addTopLevelItem(row)
-        for i in range(self.tree_installed.columnCount()):
-            self.tree_installed.resizeColumnToContents(i)
+            app_id = it.get("Id", "")
+            key = app_id.lower()
+            if keys is None or key in keys:
+                newer = available.get(key) or it.get("Available", "")
+                rows[key] = [it.get("Name", ""), app_id, it.get("Version", ""), newer]
+        model = self.installed_model
+        if not model.rowCount():
+            # first fill: one reset, then size the columns to it
+            model.reset(rows)
+            touched = set(rows)
+            self.installed_index.clear()
+            self._installed_matches = None
+            for i in range(model.columnCount()):
+                self.tree_installed.resizeColumnToContents(i)
+        else:
+            present = set(model.keys())
+            gone = (present if keys is None else keys & present) - set(rows)
+            if self._installed_matches is not None and len(gone) + len(set(rows) - present) > 16:
+                # every inserted / removed row walks the hidden ones: show them all and filter again after
+                for key in present - self._installed_matches:
+                    self.tree_installed.setRowHidden(model.row_of(key), QModelIndex(), False)
+                self._installed_matches = None
+            touched = model.apply(rows, keys)
+            for key in gone:
+                self.installed_index.discard(key)
+        for key in touched:
+            self.installed_index.discard(key)
+            self.installed_index.add(key, *model.columns(key))
+        self._outdated = model.outdated()
+        self.btn_upgrade_outdated.setEnabled(bool(self._outdated))
+        self.btn_upgrade_outdated.setText(f"Upgrade All Outdated ({len(self._outdated)})" if self._outdated
+                                          else "Upgrade All Outdated")
+        self._filter_installed(self.search_installed.text(), touched)
+        return len(touched)
 
     def filter_installed(self, text):
-        q = text.strip().lower()
-        for i in range(self.tree_installed.topLevelItemCount()):
-            r = self.tree_installed.topLevelItem(i)
-            visible = any(q in r.text(c).lower() for c in range(r.columnCount()))
-            r.setHidden(not visible)
+        with TRACER.span("filter installed", "ui", text=text):
+            self._filter_installed(text)
+
+    def _filter_installed(self, text, touched=()):
+        """Hide / show the rows whose match changed, and the touched ones (new or moved)"""
+        model = self.installed_model
+        previous = self._installed_matches
+        current = self.installed_index.filter(text) if text.strip() else None
+        self._installed_matches = current
+        if previous is None and current is None:
+            changed = set()
+        elif previous is None or current is None:
+            changed = set(model.keys()) - (previous if current is None else current)
+        else:
+            changed = previous ^ current
+        present = model.keys()
+        for key in changed.union(touched):
+            if key in present:
+                hidden = current is not None and key not in current
+                self.tree_installed.setRowHidden(model.row_of(key), QModelIndex(), hidden)
+
+    def selected_installed(self):
+        rows = self.tree_installed.selectionModel().selectedRows()
+        return [self.installed_model.app_id(index.row()) for index in rows]
 
     def update_selected_installed(self):
-        selected = self.tree_installed.selectedItems()
-        if not selected:
+        ids = self.selected_installed()
+        if not ids:
             QMessageBox.information(self, "Info", "Select installed apps first.")
             return
-        ids = [r.text(1) for r in selected]
-        self.task_queue.append(("Installing/Updating", ids))
-        self.process_task_queue()
+        self.queue_tasks(ACTION_LABELS["install"], ids)
+
+    def upgrade_all_outdated(self):
+        if not self._outdated:
+            return
+        # both listings are already at hand: plan right away instead of in a PlanThread
+        snapshot = {it["Id"].lower(): it for it in self.inventory.items}
+        listing = {it["Id"].lower(): it for it in self.upgrades.items}
+        self.on_plan_ready(plan_desired_state([(app_id, None) for app_id in self._outdated], snapshot, listing),
+                           PRIORITY_BULK)
 
     def uninstall_selected_installed(self):
-        selected = self.tree_installed.selectedItems()
-        if not selected:
+        ids = self.selected_installed()
+        if not ids:
             QMessageBox.information(self, "Info", "Select installed apps first.")
             return
-        ids = [r.text(1) for r in selected]
-        self.task_queue.append(("Uninstalling", ids))
-        self.process_task_queue()
+        self.queue_tasks(ACTION_LABELS["uninstall"], ids)
 
     # ---------------- Progress Tab ----------------
     def setup_progress_tab(self):
-        self.tab_progress = QWidget()
-        self.tabs.addTab(self.tab_progress, "Progress")
-        
         v = QVBoxLayout(self.tab_progress)
-        self.progress_log = QTextEdit()
+        # plain text ring buffer: appends stay cheap and memory bounded however long the session
+        self.progress_log = QPlainTextEdit()
         self.progress_log.setReadOnly(True)
+        self.progress_log.setMaximumBlockCount(PROGRESS_LOG_BLOCKS)
+        self.progress_log.setUndoRedoEnabled(False)
+        self.progress_file = RotatingLog(PROGRESS_LOG_PATH)
+        # worker messages are collected here and shown at most every PROGRESS_FLUSH_MS
+        self._log_pending = []
+        self._bar_pending = None      # (percent, format) of the latest update
+        self.progress_flush_timer = QTimer(self)
+        self.progress_flush_timer.setSingleShot(True)
+        self.progress_flush_timer.setInterval(PROGRESS_FLUSH_MS)
+        self.progress_flush_timer.timeout.connect(self.flush_progress)
         self.progress_bar = QProgressBar()
         self.progress_bar.setStyleSheet("""
             QProgressBar {
@@ -766,49 +1614,203 @@ class AppManager(QWidget):
 
         self.btn_cancel_progress = QPushButton("Cancel")
         self.btn_cancel_progress.setProperty("class", "secondary")
+        self.btn_export_trace = QPushButton("Export Trace")
+        self.btn_export_trace.setProperty("class", "secondary")
         h = QHBoxLayout()
         h.addWidget(self.progress_bar, 1)
         h.addWidget(self.btn_cancel_progress)
+        h.addWidget(self.btn_export_trace)
+
+        # pending tasks of the running batch, in the order they will run
+        self.queue_list = QListWidget()
+        self.queue_list.setMaximumHeight(140)
+        self.btn_queue_up = QPushButton("Move Up")
+        self.btn_queue_down = QPushButton("Move Down")
+        self.btn_queue_remove = QPushButton("Remove")
+        for btn in (self.btn_queue_up, self.btn_queue_down, self.btn_queue_remove):
+            btn.setProperty("class", "secondary")
+        queue_buttons = QVBoxLayout()
+        queue_buttons.addWidget(self.btn_queue_up)
+        queue_buttons.addWidget(self.btn_queue_down)
+        queue_buttons.addWidget(self.btn_queue_remove)
+        queue_buttons.addStretch(1)
+        queue_row = QHBoxLayout()
+        queue_row.addWidget(self.queue_list, 1)
+        queue_row.addLayout(queue_buttons)
+
         v.addWidget(self.progress_log, 1)
+        v.addWidget(QLabel("Queued"))
+        v.addLayout(queue_row)
         v.addLayout(h)
 
         self.btn_cancel_progress.clicked.connect(self.cancel_worker)
-
-    def process_task_queue(self):
-        if self.worker and getattr(self.worker, "isRunning", None) and self.worker.isRunning():
+        self.btn_export_trace.clicked.connect(self.export_trace)
+        self.btn_queue_up.clicked.connect(lambda: self.move_queued(-1))
+        self.btn_queue_down.clicked.connect(lambda: self.move_queued(1))
+        self.btn_queue_remove.clicked.connect(self.remove_queued)
+        self.refresh_queue_view()
+
+    def refresh_queue_view(self):
+        current = self.queue_list.currentItem()
+        keep = current.data(Qt.UserRole) if current else None
+        self.queue_list.clear()
+        for task in (self.worker.scheduler.pending() if self.worker else []):
+            verb = "Uninstall" if task.action == "uninstall" else "Install/Update"
+            waiting = self.worker.scheduler.waiting_for(task.app_id) if task.action == "install" else []
+            after = f", after {', '.join(waiting)}" if waiting else ""
+            item = QListWidgetItem(f"{verb}  {task.app_id}    ({PRIORITY_NAMES.get(task.priority, task.priority)}"
+                                   f"{after})")
+            item.setData(Qt.UserRole, task.app_id)
+            self.queue_list.addItem(item)
+            if task.app_id == keep:
+                self.queue_list.setCurrentItem(item)
+        for args in self._deferred:
+            self.queue_list.addItem(f"{args[0]}  {len(args[1])} app(s)    (next batch)")
+
+    def _selected_queued(self):
+        item = self.queue_list.currentItem()
+        return item.data(Qt.UserRole) if item and self.worker else None
+
+    def move_queued(self, offset):
+        app_id = self._selected_queued()
+        if app_id:
+            self.worker.scheduler.move(app_id, offset)
+
+    def remove_queued(self):
+        app_id = self._selected_queued()
+        if app_id:
+            self.worker.scheduler.remove(app_id)
+
+    def export_trace(self):
+        """Save this session's spans as Chrome trace JSON and a metrics summary next to it"""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Trace", os.path.join(DATA_DIR, "trace.json"),
+                                              "Chrome trace (*.json)")
+        if not path:
             return
-        if not self.task_queue:
+        metrics = TRACER.metrics()
+        try:
+            TRACER.export_chrome_trace(path)
+            write_json_atomic(os.path.splitext(path)[0] + ".metrics.json", metrics)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Trace", f"Cannot write {path}: {e}")
             return
-        action_label, ids = self.task_queue.pop(0)
-        self.start_worker(ids, action_label)
+        self.log_progress(f"Trace saved to {path} (open it in chrome://tracing or ui.perfetto.dev)")
+        for name, m in metrics.items():
+            self.log_progress(f"  {name}: {m['count']}x  p50 {m['p50_ms']:.1f} ms  p95 {m['p95_ms']:.1f} ms")
+
+    def queue_tasks(self, action_label, ids, plan=None, priority=None):
+        """
+        Queue ids on the running batch, which takes them as soon as its installer is free
+        (ids already queued are coalesced there), or start a batch for them.
+        """
+        if self.worker is None:
+            self.start_worker(ids, action_label, plan, priority)
+            return
+        if self.worker.add(ids, action_label, plan, priority) is None:
+            # the batch is wrapping up: these start the next one
+            self._deferred.append((action_label, ids, plan, priority))
+            self.refresh_queue_view()
+        self.tabs.setCurrentWidget(self.tab_progress)
 
-    def start_worker(self, ids, action_label):
-        self.progress_log.clear()
-        self.progress_bar.setValue(0)
-        self.worker = WorkerThread(ids, action_label)
+    def start_worker(self, ids, action_label, plan=None, priority=None):
+        self.ensure_tab(self.tab_progress)
+        # earlier batches stay in the log above this one
+        self.log_progress(f"---- {action_label} {len(ids)} app(s) ----")
+        self._bar_pending = (0, "%p%")
+        self.flush_progress()
+        # reuse the Installed tab's inventory rather than listing again for this batch
+        self.worker = WorkerThread(ids, action_label, snapshot=self.inventory.snapshot(), plan=plan,
+                                   priority=priority, cache=self.installer_cache)
         self.worker.progress_signal.connect(self.on_worker_progress)
+        self.worker.package_progress_signal.connect(self.on_package_progress)
+        self.worker.queue_signal.connect(self.refresh_queue_view)
         self.worker.finished_signal.connect(self.on_worker_finished)
         self.worker.start()
+        self.refresh_queue_view()
         self.tabs.setCurrentWidget(self.tab_progress)
 
+    def log_progress(self, message):
+        self._log_pending.append(message)
+        if not self.progress_flush_timer.isActive():
+            self.progress_flush_timer.start()
+
+    def flush_progress(self):
+        """Show everything that arrived since the last flush: one append, one progress bar update"""
+        if self._log_pending:
+            lines, self._log_pending = self._log_pending, []
+            self.progress_log.appendPlainText("\n".join(lines))
+            self.progress_file.write(lines)
+        if self._bar_pending is not None:
+            percent, fmt = self._bar_pending
+            self._bar_pending = None
+            self.progress_bar.setFormat(fmt)
+            self.progress_bar.setValue(percent)
+
     def on_worker_progress(self, message, percent):
-        self.progress_log.append(message)
         try:
             p = max(0, min(100, int(percent)))
         except Exception:
             p = 0
-        self.progress_bar.setValue(p)
+        self._bar_pending = (p, self._bar_pending[1] if self._bar_pending else self.progress_bar.format())
+        self.log_progress(message)
+
+    def on_package_progress(self, app_id, package_percent, total_percent):
+        shown = self._bar_pending[0] if self._bar_pending else self.progress_bar.value()
+        self._bar_pending = (max(shown, total_percent), f"{app_id}: {package_percent}%  |  total %p%")
+        if not self.progress_flush_timer.isActive():
+            self.progress_flush_timer.start()
 
     def on_worker_finished(self, summary):
-        self.progress_log.append(f"Worker finished: {summary}")
+        percent = self._bar_pending[0] if self._bar_pending else self.progress_bar.value()
+        self._bar_pending = (percent, "%p%")
+        self.log_progress(f"Worker finished: {summary}")
+        touched = self.worker.touched()
         self.worker = None
-        self.populate_installed()
-        self.process_task_queue()
+        if touched and len(touched) <= INVENTORY_PATCH_MAX and self.inventory.items and not self.inventory.stale:
+            # re-list just this batch's packages; the cached rows of the others are still right
+            self.patch_installed(touched)
+        elif touched:
+            self.inventory.invalidate()
+            self.upgrades.invalidate()
+            if self.tab_built(self.tab_installed):
+                # otherwise the tab lists afresh when it is built
+                self.refresh_installed(force=True)
+        deferred, self._deferred = self._deferred, []
+        for args in deferred:
+            self.queue_tasks(*args)
+        self.refresh_queue_view()
 
     def cancel_worker(self):
         if self.worker:
             self.worker.cancel()
 
+    def closeEvent(self, event):
+        # background threads must not outlive their QThread objects
+        if self.worker:
+            # kills the running downloads and installer; the rest of the batch is not started
+            self.worker.cancel()
+            self.worker.wait()
+        for th in list(self._search_threads):
+            th.cancel()
+            th.wait()
+        for th in (self.inventory_thread, self.plan_thread, self.upgrades_thread):
+            if th:
+                # kills a `winget list` / `winget upgrade` that could otherwise run to its timeout
+                th.stop.set()
+                th.wait()
+        if self.prefetch_thread:
+            self.prefetch_thread.stop.set()
+            self.prefetch_thread.wait()
+        if self.index_thread:
+            self.package_index.stop.set()
+            self.index_thread.wait()
+        if self.tab_built(self.tab_progress):
+            self.flush_progress()
+            self.progress_file.close()
+        self.icons.save_atlas()
+        get_backend().close()
+        super().closeEvent(event)
+
 
 # --------------------------
 # Run
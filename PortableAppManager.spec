@@ -6,7 +6,7 @@ a = Analysis(
     ['PortableAppManager.py'],
     pathex=[],
     binaries=[],
-    datas=[('/assets/headIcon.ico', '.')],
+    datas=[('/assets/headIcon.ico', '.'), ('pam_helper.ps1', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
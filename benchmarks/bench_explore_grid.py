@@ -0,0 +1,166 @@
+"""
+Explore grid build time and memory for N catalog entries, on the offscreen Qt platform.
+
+    python benchmarks/bench_explore_grid.py --apps 10000
+
+"model" is the current AppGridModel + painted delegate; "widgets" rebuilds the previous
+one-QFrame-per-card layout for comparison (skip it with --no-widgets, it is slow at 10k).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fake_winget  # noqa: E402
+
+fake_winget.use_fake_winget()
+
+from PySide6.QtCore import Qt  # noqa: E402
+from PySide6.QtWidgets import (  # noqa: E402
+    QApplication, QCheckBox, QFrame, QGridLayout, QHBoxLayout, QLabel, QScrollArea, QVBoxLayout, QWidget,
+)
+
+import PortableAppManager as pam  # noqa: E402
+
+
+def rss_mb():
+    """Current resident set size (Linux), 0 elsewhere"""
+    try:
+        with open("/proc/self/status") as fh:
+            for ln in fh:
+                if ln.startswith("VmRSS:"):
+                    return int(ln.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def synthetic_apps(n, categories=20):
+    return [{"Name": f"Package {i} Desktop", "Id": f"Publisher{i % 97}.Package{i}",
+             "Category": f"Category {i % categories:02d}"} for i in range(n)]
+
+
+def settle(app, widget):
+    app.processEvents()
+    widget.grab()  # forces layout and one full paint of the visible area
+
+
+TYPED = "package 123"
+
+
+def bench_model(app, window, apps):
+    before = rss_mb()
+    t0 = time.perf_counter()
+    window._add_grid_apps(apps)
+    window.grid_view.doItemsLayout()
+    settle(app, window)
+    seconds = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    window.search_explore.setText("package 12")
+    # run the debounced filter now instead of waiting for its timer
+    window.explore_filter_timer.stop()
+    window.filter_explore_grid("package 12")
+    settle(app, window)
+    filter_seconds = time.perf_counter() - t1
+    # typing one more character only touches the rows that stop matching
+    t2 = time.perf_counter()
+    window.filter_explore_grid("package 123")
+    settle(app, window)
+    refine_seconds = time.perf_counter() - t2
+    window.filter_explore_grid("")
+    settle(app, window)
+    # one filter per keystroke, as if the debounce fired after every character
+    keystrokes = []
+    for i in range(1, len(TYPED) + 1):
+        t3 = time.perf_counter()
+        window.filter_explore_grid(TYPED[:i])
+        settle(app, window)
+        keystrokes.append(time.perf_counter() - t3)
+    window.search_explore.setText("")
+    window.explore_filter_timer.stop()
+    window.filter_explore_grid("")
+    return {"seconds": seconds, "rss_mb": rss_mb() - before, "filter_seconds": filter_seconds,
+            "refine_seconds": refine_seconds, "keystroke_p50_seconds": statistics.median(keystrokes),
+            "keystroke_max_seconds": max(keystrokes)}
+
+
+def bench_widgets(app, window, apps):
+    """The previous implementation: a QFrame, two QLabels and a QCheckBox per card"""
+    before = rss_mb()
+    t0 = time.perf_counter()
+    scroll = QScrollArea()
+    scroll.setWidgetResizable(True)
+    container = QWidget()
+    outer = QVBoxLayout(container)
+    grids, pos = {}, {}
+    for a in apps:
+        cat = a["Category"]
+        if cat not in grids:
+            block = QWidget()
+            grids[cat] = QGridLayout(block)
+            pos[cat] = (0, 0)
+            outer.addWidget(QLabel(cat))
+            outer.addWidget(block)
+        card = QFrame()
+        card_layout = QVBoxLayout(card)
+        icon_bg = QLabel()
+        icon_bg.setFixedSize(50, 50)
+        icon_bg.setStyleSheet("background-color: rgba(255, 255, 255, 0.1); border-radius: 10px;")
+        QHBoxLayout(icon_bg).setContentsMargins(0, 0, 0, 0)
+        icon = QLabel()
+        icon.setFixedSize(40, 40)
+        icon.setPixmap(window.get_app_icon(a["Name"]).pixmap(40, 40))
+        icon_bg.layout().addWidget(icon, alignment=Qt.AlignCenter)
+        card_layout.addWidget(icon_bg, alignment=Qt.AlignCenter)
+        chk = QCheckBox(a["Name"])
+        chk.setStyleSheet("font-size:11pt; color: #eaeaea;")
+        lbl = QLabel(a["Id"])
+        lbl.setStyleSheet("font-size:9pt; color:#aaa;")
+        lbl.setWordWrap(True)
+        card_layout.addWidget(chk)
+        card_layout.addWidget(lbl)
+        r, c = pos[cat]
+        grids[cat].addWidget(card, r, c)
+        pos[cat] = (r, c + 1) if c + 1 < 4 else (r + 1, 0)
+    scroll.setWidget(container)
+    scroll.resize(window.size())
+    scroll.show()
+    settle(app, scroll)
+    return {"seconds": time.perf_counter() - t0, "rss_mb": rss_mb() - before}
+
+
+def run(apps=10000, widgets=True):
+    app = QApplication.instance() or QApplication([])
+    window = pam.AppManager()
+    window.resize(1100, 700)
+    window.show()
+    settle(app, window)
+    catalog = synthetic_apps(apps)
+    results = {"model": bench_model(app, window, catalog)}
+    if widgets:
+        results["widgets"] = bench_widgets(app, window, catalog)
+    window.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--apps", type=int, default=10000)
+    parser.add_argument("--no-widgets", action="store_true")
+    args = parser.parse_args(argv)
+    for key, r in run(args.apps, not args.no_widgets).items():
+        extra = (f"  filter {r['filter_seconds'] * 1000:7.1f} ms  refine {r['refine_seconds'] * 1000:6.1f} ms"
+                 f"  keystroke p50 {r['keystroke_p50_seconds'] * 1000:6.1f} ms"
+                 f" max {r['keystroke_max_seconds'] * 1000:6.1f} ms"
+                 if "filter_seconds" in r else "")
+        print(f"{key:8s} {args.apps:>6d} apps  build {r['seconds'] * 1000:8.1f} ms  RSS +{r['rss_mb']:6.1f} MB{extra}")
+
+
+if __name__ == "__main__":
+    main()
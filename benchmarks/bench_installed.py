@@ -0,0 +1,91 @@
+"""
+Installed tab refresh time for N installed packages, on the offscreen Qt platform: the first
+fill, a full listing that differs in a few rows, and the patch after a batch of a few packages,
+each with the filter empty and with a filter hiding most rows.
+
+    python benchmarks/bench_installed.py --packages 3000 --changed 10
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fake_winget  # noqa: E402
+
+fake_winget.use_fake_winget()
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+import PortableAppManager as pam  # noqa: E402
+from pam_core import set_backend  # noqa: E402
+
+
+def synthetic_installed(n):
+    return [{"Name": f"Package {i}", "Id": f"Publisher{i % 97}.Package{i}", "Version": "1.0.0", "Available": ""}
+            for i in range(n)]
+
+
+def after_batch(items, changed):
+    """items after a batch over `changed` of them: upgrades, a removal and a new install"""
+    touched = [it["Id"] for it in items[::max(1, len(items) // changed)][:changed]]
+    out = [dict(it) for it in items if it["Id"] != touched[-1]]
+    for it in out:
+        if it["Id"] in touched:
+            it["Version"] = "2.0.0"
+    out.append({"Name": "Package new", "Id": "Publisher.New", "Version": "1.0.0", "Available": ""})
+    return out, touched + ["Publisher.New"]
+
+
+def timed(app, fn):
+    t0 = time.perf_counter()
+    fn()
+    app.processEvents()
+    return time.perf_counter() - t0
+
+
+def run(packages=3000, changed=10):
+    app = QApplication.instance() or QApplication([])
+    set_backend(fake_winget.FakeBackend())
+    window = pam.AppManager()
+    window.ensure_tab(window.tab_installed)
+    for th in (window.inventory_thread, window.upgrades_thread):
+        if th:
+            th.wait()
+    app.processEvents()
+    window.upgrades.items = []
+    window.resize(1100, 700)
+    window.show()
+    items = synthetic_installed(packages)
+    updated, touched = after_batch(items, changed)
+    results = {}
+    for label, text in (("unfiltered", ""), ("filtered", "package 12")):
+        window.installed_model.reset({})
+        window.search_installed.setText(text)
+        window.installed_filter_timer.stop()
+        window._installed_matches = None
+        fill = timed(app, lambda: window.populate_installed(items))
+        full = timed(app, lambda: window.populate_installed(updated))
+        window.populate_installed(items)
+        patch = timed(app, lambda: window.populate_installed(updated, touched))
+        results[label] = {"fill_seconds": fill, "full_diff_seconds": full, "patch_seconds": patch}
+    window.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--packages", type=int, default=3000)
+    parser.add_argument("--changed", type=int, default=10)
+    args = parser.parse_args(argv)
+    for key, r in run(args.packages, args.changed).items():
+        print(f"{key:10s} {args.packages:>6d} packages  fill {r['fill_seconds'] * 1000:7.1f} ms"
+              f"  full diff {r['full_diff_seconds'] * 1000:7.1f} ms  patch {r['patch_seconds'] * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
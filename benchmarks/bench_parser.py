@@ -0,0 +1,83 @@
+"""
+Parser throughput over recorded winget output (benchmarks/data), tiled up to --rows data rows.
+
+    python benchmarks/bench_parser.py --rows 20000
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from pam_core import iter_winget_table, parse_winget_search_output  # noqa: E402
+
+
+def load_recording(name, rows):
+    """Recorded output with its data rows repeated until there are `rows` of them"""
+    with open(os.path.join(HERE, "data", f"winget_{name}.txt"), encoding="utf-8") as fh:
+        lines = fh.read().splitlines()
+    sep = next(i for i, ln in enumerate(lines) if ln.startswith("-----"))
+    id_col = lines[sep - 1].index("Id")
+    body = [ln for ln in lines[sep + 1:] if len(ln) > id_col]
+    trailer = [ln for ln in lines[sep + 1:] if len(ln) <= id_col]
+    out = lines[:sep + 1]
+    out.extend(body[i % len(body)] for i in range(rows))
+    out.extend(trailer)
+    return "\n".join(out) + "\n"
+
+
+def legacy_parse(output):
+    """The previous per-line regex parser, kept for comparison"""
+    items = []
+    for ln in output.splitlines():
+        ln = ln.rstrip()
+        if not ln:
+            continue
+        m = re.match(r'^(?P<name>.+?)\s{2,}(?P<id>\S+)(?:\s.*)?$', ln)
+        if m:
+            items.append({"Name": m.group('name').strip(), "Id": m.group('id').strip(), "Category": "Winget"})
+    return items
+
+
+def best_of(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(rows=10000, repeat=5):
+    results = {}
+    for name in ("list", "search"):
+        text = load_recording(name, rows)
+        cases = {
+            "legacy_regex": lambda: legacy_parse(text),
+            "parse_winget_search_output": lambda: parse_winget_search_output(text),
+            # streaming from a file object, as SearchThread does with the process pipe
+            "iter_winget_table_stream": lambda: sum(1 for _ in iter_winget_table(io.StringIO(text))),
+        }
+        for case, fn in cases.items():
+            seconds, out = best_of(repeat, fn)
+            count = out if isinstance(out, int) else len(out)
+            results[f"{name}/{case}"] = {"seconds": seconds, "rows": count, "rows_per_s": count / seconds}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    for key, r in run(args.rows, args.repeat).items():
+        print(f"{key:45s} {r['rows']:>7d} rows  {r['seconds'] * 1000:8.1f} ms  {r['rows_per_s']:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Search round trip against the fake winget: one blocking `winget search` + parse
+(winget_search_apps), and SearchThread streaming rows to the UI thread on the offscreen
+Qt platform (time to the first row and to the last).
+
+    python benchmarks/bench_search.py --rows 100 1000 --latency 0.3
+
+Latency is the fake winget's delay before it prints; the process start-up of the stand-in
+itself is part of every measurement. "helper" is the same search through HelperBackend and
+the fake's helper mode, which pays process start-up and `latency` (the index load) once, in
+"helper/startup", and FAKE_WINGET_HELPER_DELAY per search.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fake_winget  # noqa: E402
+
+fake_winget.use_fake_winget()
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+import PortableAppManager as pam  # noqa: E402
+from pam_core import HelperBackend, set_backend, winget_search_apps  # noqa: E402
+
+
+def blocking_search(query):
+    t0 = time.perf_counter()
+    rows = winget_search_apps(query)
+    return {"seconds": time.perf_counter() - t0, "rows": len(rows)}
+
+
+def streamed_search(app, query):
+    """SearchThread with no cache or index, so every run asks winget"""
+    th = pam.SearchThread(query)
+    seen = {"first": None, "rows": 0, "done": None}
+    t0 = time.perf_counter()
+
+    def on_item(item):
+        if seen["first"] is None:
+            seen["first"] = time.perf_counter() - t0
+        seen["rows"] += 1
+
+    def on_done(items):
+        seen["done"] = time.perf_counter() - t0
+
+    th.item_signal.connect(on_item)
+    th.done_signal.connect(on_done)
+    th.start()
+    while seen["done"] is None:
+        app.processEvents()
+        time.sleep(0.001)
+    th.wait()
+    return {"seconds": seen["done"], "first_row_seconds": seen["first"] or seen["done"], "rows": seen["rows"]}
+
+
+def run(rows=(100, 1000), latency=0.3, repeat=3):
+    app = QApplication.instance() or QApplication([])
+    os.environ["FAKE_WINGET_SEARCH_DELAY"] = str(latency)
+    os.environ["FAKE_WINGET_HELPER_START"] = str(latency)
+    results = {}
+    for n in rows:
+        os.environ["FAKE_WINGET_SEARCH_ROWS"] = str(n)
+        blocking = [blocking_search("vlc") for _ in range(repeat)]
+        streamed = [streamed_search(app, "vlc") for _ in range(repeat)]
+        helper = HelperBackend()
+        previous = set_backend(helper)
+        try:
+            startup = blocking_search("vlc")
+            warm = [blocking_search("vlc") for _ in range(repeat)]
+        finally:
+            set_backend(previous)
+            helper.close()
+        results[f"blocking/{n}"] = {"seconds": statistics.median(r["seconds"] for r in blocking),
+                                    "rows": blocking[-1]["rows"]}
+        results[f"streamed/{n}"] = {"seconds": statistics.median(r["seconds"] for r in streamed),
+                                    "first_row_seconds": statistics.median(r["first_row_seconds"] for r in streamed),
+                                    "rows": streamed[-1]["rows"]}
+        results[f"helper/startup/{n}"] = startup
+        results[f"helper/{n}"] = {"seconds": statistics.median(r["seconds"] for r in warm), "rows": warm[-1]["rows"]}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    for key, r in run(args.rows, args.latency, args.repeat).items():
+        first = f"  first row {r['first_row_seconds'] * 1000:7.1f} ms" if "first_row_seconds" in r else ""
+        print(f"{key:20s} {r['rows']:>6d} rows  done {r['seconds'] * 1000:7.1f} ms{first}")
+
+
+if __name__ == "__main__":
+    main()
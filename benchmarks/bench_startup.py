@@ -0,0 +1,99 @@
+"""
+Startup time on the offscreen Qt platform: module import, AppManager construction and
+time to the first painted frame of the Explore grid, each run in a fresh interpreter.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --cold     # empty data dir (no icon atlas) every run
+
+winget is replaced by benchmarks/fake_winget.py, so nothing touches the real system.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# runs in the child interpreter; prints one JSON line
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import PortableAppManager as pam
+t1 = time.perf_counter()
+from PySide6.QtCore import QObject, QEvent
+from PySide6.QtWidgets import QApplication
+app = QApplication([])
+t2 = time.perf_counter()
+w = pam.AppManager()
+t3 = time.perf_counter()
+
+class FirstPaint(QObject):
+    seen = False
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            FirstPaint.seen = True
+        return False
+
+probe = FirstPaint()
+w.grid_view.viewport().installEventFilter(probe)
+w.show()
+while not FirstPaint.seen:
+    app.processEvents()
+t4 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0,
+    "qapplication_s": t2 - t1,
+    "construct_s": t3 - t2,
+    "first_frame_s": t4 - t0,
+    "tabs_built": sum(w.tab_built(w.tabs.widget(i)) for i in range(w.tabs.count())),
+    "qtsvg_loaded": "PySide6.QtSvg" in sys.modules,
+}))
+w.close()
+"""
+
+METRICS = ("import_s", "qapplication_s", "construct_s", "first_frame_s")
+
+
+def run_once(data_dir):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PAM_DATA_DIR=data_dir,
+               PAM_WINGET=f'"{sys.executable}" "{os.path.join(HERE, "fake_winget.py")}"')
+    out = subprocess.run([sys.executable, "-c", PROBE, ROOT], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(runs=5, cold=False):
+    samples = []
+    with tempfile.TemporaryDirectory() as shared:
+        if not cold:
+            run_once(shared)  # writes the icon atlas the measured runs start from
+        for _ in range(runs):
+            if cold:
+                with tempfile.TemporaryDirectory() as fresh:
+                    samples.append(run_once(fresh))
+            else:
+                samples.append(run_once(shared))
+    result = {m: statistics.median(s[m] for s in samples) for m in METRICS}
+    result["tabs_built"] = samples[-1]["tabs_built"]
+    result["qtsvg_loaded"] = samples[-1]["qtsvg_loaded"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cold", action="store_true")
+    args = parser.parse_args(argv)
+    r = run(args.runs, args.cold)
+    print(f"{'cold' if args.cold else 'warm'} start, median of {args.runs} runs")
+    for m in METRICS:
+        print(f"  {m:16s} {r[m] * 1000:8.1f} ms")
+    print(f"  tabs built before first frame: {r['tabs_built']}, QtSvg loaded: {r['qtsvg_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
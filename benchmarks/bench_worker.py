@@ -0,0 +1,70 @@
+"""
+Batch throughput of WorkerThread against the fake winget: N packages downloaded in
+parallel and installed one at a time, on the offscreen Qt platform.
+
+    python benchmarks/bench_worker.py --packages 20 --workers 1 4 --download 0.3 --install 0.05
+
+The fake winget's delays stand in for network and installer time, so packages/s shows how
+well downloads overlap installs rather than how fast a real machine is.
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fake_winget  # noqa: E402
+
+fake_winget.use_fake_winget()
+
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+import PortableAppManager as pam  # noqa: E402
+
+
+def run_batch(app, ids, workers):
+    # an empty snapshot: every package is a fresh install, no `winget list` in the measurement
+    worker = pam.WorkerThread(ids, "Installing/Updating", max_workers=workers, snapshot={})
+    state = {"summary": None, "messages": 0, "progress": 0}
+    worker.progress_signal.connect(lambda message, percent: state.__setitem__("messages", state["messages"] + 1))
+    worker.package_progress_signal.connect(lambda *a: state.__setitem__("progress", state["progress"] + 1))
+    worker.finished_signal.connect(lambda summary: state.__setitem__("summary", summary))
+    t0 = time.perf_counter()
+    worker.start()
+    while state["summary"] is None:
+        app.processEvents()
+        time.sleep(0.001)
+    seconds = time.perf_counter() - t0
+    worker.wait()
+    outcomes = worker.scheduler.results
+    return {"seconds": seconds, "packages": len(ids), "packages_per_s": len(ids) / seconds,
+            "done": sum(1 for v in outcomes.values() if v == "done"),
+            "signals": state["messages"] + state["progress"]}
+
+
+def run(packages=20, workers=(1, 4), download=0.3, install=0.05):
+    app = QApplication.instance() or QApplication([])
+    os.environ["FAKE_WINGET_DOWNLOAD_DELAY"] = str(download)
+    os.environ["FAKE_WINGET_INSTALL_DELAY"] = str(install)
+    ids = [f"Bench.Package{i}" for i in range(packages)]
+    return {f"workers/{n}": run_batch(app, ids, n) for n in workers}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--packages", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--download", type=float, default=0.3, help="fake download seconds per package")
+    parser.add_argument("--install", type=float, default=0.05, help="fake install seconds per package")
+    args = parser.parse_args(argv)
+    for key, r in run(args.packages, args.workers, args.download, args.install).items():
+        print(f"{key:10s} {r['packages']:>4d} packages ({r['done']} done)  {r['seconds']:6.2f} s  "
+              f"{r['packages_per_s']:6.2f} packages/s  {r['signals']} signals")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Stand-in for winget, so the manager can be exercised on machines without it (e.g. Linux CI).
+
+Point the app at it with:
+    PAM_WINGET="python benchmarks/fake_winget.py"
+
+`search`, `list` and the `upgrade` listing print the recordings in benchmarks/data, their
+rows repeated (with ids suffixed .2, .3, ...) up to the requested row count. Behaviour is
+tuned with environment variables:
+    FAKE_WINGET_DOWNLOAD_DELAY  seconds spent in `download` (default 0.5)
+    FAKE_WINGET_INSTALL_DELAY   seconds spent in `install` / `upgrade` / `uninstall` (default 0.2)
+    FAKE_WINGET_SEARCH_DELAY    seconds before `search` prints (default 0.3)
+    FAKE_WINGET_LIST_DELAY      seconds before `list` / `upgrade` print (default 0.3)
+    FAKE_WINGET_ROW_DELAY       seconds between printed rows (default 0)
+    FAKE_WINGET_SEARCH_ROWS     rows printed by `search` (default: as recorded)
+    FAKE_WINGET_LIST_ROWS       rows printed by `list` (default: as recorded)
+    FAKE_WINGET_FLAKY           downloads of each id that fail with a network error first (default 0)
+    FAKE_WINGET_FAIL            comma-separated ids whose install / upgrade always fails with 1603
+    FAKE_WINGET_STATE           directory holding the install lock and flaky counters (default: temp dir)
+
+`search` ignores its query. `list --id X` prints X's row when X is in the `list` table and
+"No installed package found" otherwise; the `upgrade` listing is the rows of the `list`
+table that have an Available version. Nothing changes when a package is installed.
+
+Like Windows Installer, only one install may run at a time: a second concurrent
+install exits with 1618 (ERROR_INSTALL_ALREADY_RUNNING).
+
+`helper` answers pam_core.HelperBackend's line-delimited JSON on stdin / stdout instead
+(PAM_HELPER="python benchmarks/fake_winget.py helper"), from the same tables and delays:
+    FAKE_WINGET_HELPER_START    seconds before the helper reads its first request (default 1.0)
+    FAKE_WINGET_HELPER_DELAY    seconds per request, replacing the search / list delays (default 0.02)
+FakeBackend does all of it in-process, without starting anything.
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+ERROR_INSTALL_ALREADY_RUNNING = 1618
+ERROR_INSTALL_FAILURE = 1603
+APPINSTALLER_CLI_ERROR_DOWNLOAD_FAILED = 0x8A150008
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+# command line that runs this stand-in, e.g. for PAM_WINGET
+COMMAND = f'"{sys.executable}" "{os.path.abspath(__file__)}"'
+
+
+def use_fake_winget():
+    """Point pam_core at this stand-in and at a throwaway data dir, unless the caller chose others"""
+    os.environ.setdefault("PAM_WINGET", COMMAND)
+    os.environ.setdefault("PAM_HELPER", f"{COMMAND} helper")
+    if "PAM_DATA_DIR" not in os.environ:
+        os.environ["PAM_DATA_DIR"] = tempfile.mkdtemp(prefix="pam-bench-")
+
+
+def _delay(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _rows(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def recording(name):
+    """data/winget_<name>.txt split into (header lines, data rows, trailer lines, Id column)"""
+    with open(os.path.join(HERE, "data", f"winget_{name}.txt"), encoding="utf-8") as fh:
+        lines = fh.read().splitlines()
+    sep = next(i for i, ln in enumerate(lines) if ln.startswith("-----"))
+    id_col = lines[sep - 1].index("Id")
+    body = [ln for ln in lines[sep + 1:] if len(ln) > id_col]
+    trailer = [ln for ln in lines[sep + 1:] if len(ln) <= id_col]
+    return lines[:sep + 1], body, trailer, id_col
+
+
+def row_id(line, id_col):
+    """Id of a recorded row, None where wide characters shifted the column"""
+    if line[id_col - 1] != " " or line[id_col] == " ":
+        return None
+    return line[id_col:].split(" ", 1)[0]
+
+
+def _renamed(line, id_col, suffix):
+    """line with suffix appended to its Id, taken out of the column padding; unchanged if it has no room"""
+    app_id = row_id(line, id_col)
+    if app_id is None:
+        return line
+    end = id_col + len(app_id)
+    if line[end:end + len(suffix) + 1].strip():
+        return line
+    return line[:end] + suffix + line[end + len(suffix):]
+
+
+def table(name, rows=None):
+    """Recorded table with its data rows repeated up to `rows` (default: as recorded)"""
+    header, body, trailer, id_col = recording(name)
+    rows = len(body) if rows is None else rows
+    out = []
+    for i in range(rows):
+        line = body[i % len(body)]
+        rnd = i // len(body)
+        out.append(_renamed(line, id_col, f".{rnd + 1}") if rnd else line)
+    return header, out, trailer, id_col
+
+
+def _print_table(header, rows, trailer, delay_name, default_delay):
+    time.sleep(_delay(delay_name, default_delay))
+    row_delay = _delay("FAKE_WINGET_ROW_DELAY", 0)
+    print("\n".join(header), flush=True)
+    if row_delay:
+        for ln in rows:
+            time.sleep(row_delay)
+            print(ln, flush=True)
+    elif rows:
+        print("\n".join(rows))
+    for ln in trailer:
+        print(ln)
+    return 0
+
+
+def _state_dir():
+    path = os.environ.get("FAKE_WINGET_STATE") or os.path.join(tempfile.gettempdir(), "fake-winget")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _progress_bar(seconds, size_mb=40.0, steps=20):
+    """Sleep for `seconds` while redrawing a winget-style byte counter"""
+    for i in range(1, steps + 1):
+        time.sleep(seconds / steps)
+        done = size_mb * i / steps
+        bar = "\u2588" * (i * 30 // steps)
+        sys.stdout.write(f"\r  {bar:<30}  {done:.1f} MB / {size_mb:.1f} MB")
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+
+
+def _flaky(app_id):
+    """True while app_id still has failures left from FAKE_WINGET_FLAKY"""
+    failures = int(os.environ.get("FAKE_WINGET_FLAKY", "0"))
+    if not failures:
+        return False
+    counter = os.path.join(_state_dir(), f"flaky-{app_id}")
+    seen = os.path.getsize(counter) if os.path.exists(counter) else 0
+    if seen >= failures:
+        return False
+    with open(counter, "a") as fh:
+        fh.write("x")
+    return True
+
+
+_NETWORK_ERROR = ("An unexpected error occurred while executing the command:\n"
+                  "InternetOpenUrl() failed.\n"
+                  "0x80072efd : The server connection could not be established")
+
+
+def _write_download(app_id, directory, version=None):
+    """Write app_id's installer and manifest into directory; returns the installer path"""
+    os.makedirs(directory, exist_ok=True)
+    installer = os.path.join(directory, f"{app_id}.exe")
+    # the "installer" re-enters this script, so installs started from a download are locked too
+    with open(installer, "w") as fh:
+        fh.write(f"#!/bin/sh\nexec \"{sys.executable}\" \"{os.path.abspath(__file__)}\" install --id \"{app_id}\"\n")
+    os.chmod(installer, 0o755)
+    with open(installer, "rb") as fh:
+        sha256 = hashlib.sha256(fh.read()).hexdigest().upper()
+    with open(os.path.join(directory, f"{app_id}.yaml"), "w") as fh:
+        fh.write(f"PackageIdentifier: {app_id}\nPackageVersion: {version or '1.0.0'}\nInstallers:\n"
+                 f"- InstallerType: exe\n  InstallerSha256: {sha256}\n  InstallerSwitches:\n    Silent: /S\n")
+    return installer
+
+
+def cmd_download(args):
+    if _flaky(args.id):
+        print(_NETWORK_ERROR)
+        return APPINSTALLER_CLI_ERROR_DOWNLOAD_FAILED & 0xFF  # POSIX exit status is 8 bits
+    _progress_bar(_delay("FAKE_WINGET_DOWNLOAD_DELAY", 0.5))
+    installer = _write_download(args.id, args.download_directory, args.version)
+    print(f"Installer downloaded: {installer}")
+    return 0
+
+
+def _lock_install():
+    """File descriptor holding the install lock, None when another install has it"""
+    lock = os.path.join(_state_dir(), "install.lock")
+    if fcntl is None:
+        try:
+            return os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+    # an flock goes away with its process, like the Windows Installer mutex when an install is killed
+    fd = os.open(lock, os.O_CREAT | os.O_WRONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _failing(app_id, command):
+    """True when FAKE_WINGET_FAIL makes installing app_id fail"""
+    failing = {i.strip().lower() for i in os.environ.get("FAKE_WINGET_FAIL", "").split(",") if i.strip()}
+    return command != "uninstall" and (app_id or "").lower() in failing
+
+
+def cmd_install(args):
+    fd = _lock_install()
+    if fd is None:
+        print("Another installation is already in progress.")
+        return ERROR_INSTALL_ALREADY_RUNNING
+    try:
+        time.sleep(_delay("FAKE_WINGET_INSTALL_DELAY", 0.2))
+        if _failing(args.id, args.command):
+            print(f"Installer failed with exit code: {ERROR_INSTALL_FAILURE}")
+            return ERROR_INSTALL_FAILURE & 0xFF  # POSIX exit status is 8 bits
+        print(f"Successfully completed {args.command} for {args.id}")
+        return 0
+    finally:
+        os.close(fd)
+        if fcntl is None:
+            os.remove(os.path.join(_state_dir(), "install.lock"))
+
+
+def cmd_list(args):
+    header, rows, trailer, id_col = table("list", _rows("FAKE_WINGET_LIST_ROWS"))
+    if args.id:
+        rows = [ln for ln in rows if row_id(ln, id_col) == args.id]
+        if not rows:
+            time.sleep(_delay("FAKE_WINGET_LIST_DELAY", 0.3))
+            print("No installed package found matching input criteria.")
+            return 0
+        trailer = []
+    return _print_table(header, rows, trailer, "FAKE_WINGET_LIST_DELAY", 0.3)
+
+
+def cmd_search(args):
+    header, rows, trailer, _ = table("search", _rows("FAKE_WINGET_SEARCH_ROWS"))
+    return _print_table(header, rows, trailer, "FAKE_WINGET_SEARCH_DELAY", 0.3)
+
+
+def _outdated(header, rows):
+    """The rows of a `list` table that have an Available version"""
+    available = header[-2].index("Available")
+    return [ln for ln in rows if len(ln) > available and ln[available] != " "]
+
+
+def cmd_upgrade(args):
+    if args.id:
+        return cmd_install(args)
+    header, rows, _, _ = table("list", _rows("FAKE_WINGET_LIST_ROWS"))
+    # the upgrade listing only has the rows with an Available version
+    outdated = _outdated(header, rows)
+    return _print_table(header, outdated, [f"{len(outdated)} upgrades available."],
+                        "FAKE_WINGET_LIST_DELAY", 0.3)
+
+
+def parsed_table(name, rows=None, upgrades=False):
+    """A recorded table as pam_core rows (dicts), as a backend returns them"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from pam_core import parse_winget_search_output
+    header, body, trailer, _ = table(name, rows)
+    if upgrades:
+        body, trailer = _outdated(header, body), []
+    return parse_winget_search_output("\n".join(header + body + trailer))
+
+
+class FakeBackend:
+    """
+    pam_core backend answering from the recordings in-process: no shell, no processes, the
+    same FAKE_WINGET_* tables, delays, flaky downloads and install lock as the command line.
+    Install with it via pam_core.set_backend(FakeBackend()).
+    """
+    name = "fake"
+    streams_search = False
+
+    def __init__(self):
+        self.calls = {}  # operation -> times called, for tests that count round trips
+
+    def _count(self, op):
+        self.calls[op] = self.calls.get(op, 0) + 1
+
+    @staticmethod
+    def _sleep(seconds, cancel=None):
+        """Sleep for seconds; False when cancel was set first"""
+        return not (cancel.wait(seconds) if cancel is not None else time.sleep(seconds))
+
+    @staticmethod
+    def _result(op, code, out):
+        return subprocess.CompletedProcess(f"fake {op}", code, out, "")
+
+    def search(self, query, source=None):
+        self._count("search")
+        self._sleep(_delay("FAKE_WINGET_SEARCH_DELAY", 0.3))
+        return parsed_table("search", _rows("FAKE_WINGET_SEARCH_ROWS"))
+
+    def list_installed(self, cancel=None):
+        self._count("list")
+        if not self._sleep(_delay("FAKE_WINGET_LIST_DELAY", 0.3), cancel):
+            raise TimeoutError("list cancelled")
+        return parsed_table("list", _rows("FAKE_WINGET_LIST_ROWS"))
+
+    def list_upgrades(self, cancel=None):
+        self._count("upgrades")
+        if not self._sleep(_delay("FAKE_WINGET_LIST_DELAY", 0.3), cancel):
+            raise TimeoutError("upgrade listing cancelled")
+        return parsed_table("list", _rows("FAKE_WINGET_LIST_ROWS"), upgrades=True)
+
+    def is_installed(self, app_id, cancel=None):
+        self._count("is_installed")
+        self._sleep(_delay("FAKE_WINGET_LIST_DELAY", 0.3), cancel)
+        _, rows, _, id_col = table("list", _rows("FAKE_WINGET_LIST_ROWS"))
+        return any(row_id(ln, id_col) == app_id for ln in rows)
+
+    def installed_rows(self, app_ids, cancel=None):
+        self._count("installed_rows")
+        wanted = {app_id.lower() for app_id in app_ids}
+        if not self._sleep(_delay("FAKE_WINGET_LIST_DELAY", 0.3) * len(wanted), cancel):  # a `list --id` per package
+            raise TimeoutError("list cancelled")
+        return [it for it in parsed_table("list", _rows("FAKE_WINGET_LIST_ROWS")) if it["Id"].lower() in wanted]
+
+    def download(self, app_id, directory, on_progress=None, version=None, cancel=None):
+        self._count("download")
+        if _flaky(app_id):
+            return self._result("download", APPINSTALLER_CLI_ERROR_DOWNLOAD_FAILED & 0xFF, _NETWORK_ERROR)
+        seconds, steps = _delay("FAKE_WINGET_DOWNLOAD_DELAY", 0.5), 20
+        for i in range(1, steps + 1):
+            if not self._sleep(seconds / steps, cancel):
+                return self._result("download", 1223, "")  # ERROR_CANCELLED
+            if on_progress:
+                on_progress(i / steps)
+        return self._result("download", 0, f"Installer downloaded: {_write_download(app_id, directory, version)}")
+
+    def _install(self, op, app_id, cancel):
+        self._count(op)
+        fd = _lock_install()
+        if fd is None:
+            return self._result(op, ERROR_INSTALL_ALREADY_RUNNING, "Another installation is already in progress.")
+        try:
+            if not self._sleep(_delay("FAKE_WINGET_INSTALL_DELAY", 0.2), cancel):
+                return self._result(op, 1223, "")
+            if _failing(app_id, op):
+                return self._result(op, ERROR_INSTALL_FAILURE, f"Installer failed with exit code: {ERROR_INSTALL_FAILURE}")
+            return self._result(op, 0, f"Successfully completed {op} for {app_id}")
+        finally:
+            os.close(fd)
+            if fcntl is None:
+                os.remove(os.path.join(_state_dir(), "install.lock"))
+
+    def install(self, app_id, installed=False, on_progress=None, version=None, cancel=None):
+        return self._install("upgrade" if installed else "install", app_id, cancel)
+
+    def uninstall(self, app_id, on_progress=None, cancel=None):
+        return self._install("uninstall", app_id, cancel)
+
+    def close(self):
+        pass
+
+
+def cmd_helper(args):
+    """Serve HelperBackend requests on stdin until it is closed; replies may overtake each other"""
+    time.sleep(_delay("FAKE_WINGET_HELPER_START", 1.0))
+    # the tables are built once, as a real helper keeps winget's index loaded
+    os.environ.update(FAKE_WINGET_SEARCH_DELAY="0", FAKE_WINGET_LIST_DELAY="0")
+    backend = FakeBackend()
+    delay = _delay("FAKE_WINGET_HELPER_DELAY", 0.02)
+    out = threading.Lock()
+
+    def answer(req):
+        time.sleep(delay)
+        op = req.get("op")
+        try:
+            if op == "search":
+                reply = {"rows": backend.search(req.get("query"), req.get("source"))}
+            elif op == "list":
+                reply = {"rows": backend.list_installed()}
+            elif op == "upgrades":
+                reply = {"rows": backend.list_upgrades()}
+            elif op == "is_installed":
+                reply = {"installed": backend.is_installed(req["app_id"])}
+            else:
+                reply = {"error": f"unknown operation {op!r}"}
+        except Exception as e:
+            reply = {"error": str(e)}
+        reply["id"] = req.get("id")
+        with out:
+            sys.stdout.write(json.dumps(reply) + "\n")
+            sys.stdout.flush()
+
+    for ln in sys.stdin:
+        try:
+            req = json.loads(ln)
+        except ValueError:
+            continue
+        threading.Thread(target=answer, args=(req,), daemon=True).start()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="winget")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("helper")
+    for name in ("download", "install", "upgrade", "uninstall", "list", "search"):
+        p = sub.add_parser(name)
+        p.add_argument("query", nargs="?")
+        p.add_argument("--id")
+        p.add_argument("--version")
+        p.add_argument("--exact", action="store_true")
+        p.add_argument("--silent", action="store_true")
+        p.add_argument("--download-directory", default=".")
+        p.add_argument("--accept-package-agreements", action="store_true")
+        p.add_argument("--accept-source-agreements", action="store_true")
+    args = parser.parse_args(argv)
+    handlers = {
+        "download": cmd_download,
+        "install": cmd_install,
+        "upgrade": cmd_upgrade,
+        "uninstall": cmd_install,
+        "list": cmd_list,
+        "search": cmd_search,
+        "helper": cmd_helper,
+    }
+    return handlers[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
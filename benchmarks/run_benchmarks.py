@@ -0,0 +1,141 @@
+"""
+Runs the benchmark suite against the fake winget on the offscreen Qt platform, saves the
+results as JSON and compares them with an earlier run.
+
+    python benchmarks/run_benchmarks.py                   # everything, compared with the last saved run
+    python benchmarks/run_benchmarks.py --quick --only parser grid
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/20260101-120000.json --threshold 0.2
+
+Results go to benchmarks/results/<time>.json (--results-dir to change). Exit status is 1
+when a timing got slower, or a throughput lower, than the baseline by more than --threshold.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import fake_winget  # noqa: E402
+
+fake_winget.use_fake_winget()
+
+import bench_explore_grid  # noqa: E402
+import bench_installed  # noqa: E402
+import bench_parser  # noqa: E402
+import bench_search  # noqa: E402
+import bench_startup  # noqa: E402
+import bench_worker  # noqa: E402
+from pam_core import TRACER  # noqa: E402
+
+# name -> (full run, --quick run)
+SUITE = {
+    "parser": (lambda: bench_parser.run(rows=20000), lambda: bench_parser.run(rows=2000, repeat=3)),
+    "search": (lambda: bench_search.run(rows=(100, 1000, 5000)), lambda: bench_search.run(rows=(100,), repeat=1)),
+    "grid": (lambda: bench_explore_grid.run(apps=10000, widgets=False),
+             lambda: bench_explore_grid.run(apps=1000, widgets=False)),
+    "installed": (lambda: bench_installed.run(packages=5000), lambda: bench_installed.run(packages=1000)),
+    "worker": (lambda: bench_worker.run(packages=20), lambda: bench_worker.run(packages=6, download=0.1)),
+    "startup": (lambda: bench_startup.run(runs=5), lambda: bench_startup.run(runs=1)),
+}
+
+
+def flatten(results, prefix=""):
+    """{"parser": {"list/x": {"seconds": 1}}} -> {"parser/list/x/seconds": 1}, numbers only"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def direction(metric):
+    """+1 when bigger is better, -1 when smaller is better, 0 for counts"""
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("seconds", "_s")):
+        return -1
+    return 0
+
+
+def compare(current, baseline, threshold):
+    """Prints the change of every timing / throughput; returns the regressed metric names"""
+    regressions = []
+    for metric, value in sorted(current.items()):
+        sign = direction(metric)
+        old = baseline.get(metric)
+        if not sign or not old:
+            continue
+        change = (value - old) / old
+        worse = -sign * change > threshold
+        if worse:
+            regressions.append(metric)
+        print(f"  {metric:60s} {old:12.4f} -> {value:12.4f}  {change:+7.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITE), help="run only these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast check")
+    parser.add_argument("--results-dir", default=os.path.join(HERE, "results"))
+    parser.add_argument("--baseline", help="result file to compare with (default: the latest in --results-dir)")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline_path = args.baseline
+    if baseline_path is None:
+        saved = sorted(glob.glob(os.path.join(args.results_dir, "*.json")))
+        baseline_path = saved[-1] if saved else None
+
+    results = {}
+    for name in args.only or SUITE:
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = SUITE[name][1 if args.quick else 0]()
+    record = {
+        "time": time.time(), "revision": git_revision(), "quick": args.quick,
+        "python": platform.python_version(), "platform": platform.platform(),
+        "results": results, "metrics": flatten(results), "trace": TRACER.metrics(),
+    }
+    for metric, value in sorted(record["metrics"].items()):
+        print(f"  {metric:60s} {value:12.4f}")
+    if not args.no_save:
+        os.makedirs(args.results_dir, exist_ok=True)
+        path = os.path.join(args.results_dir, time.strftime("%Y%m%d-%H%M%S") + ".json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(record, fh, indent=2)
+        print(f"saved {path}")
+    if not baseline_path:
+        return 0
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if baseline.get("quick") != args.quick:
+        print(f"note: baseline {baseline_path} was a {'quick' if baseline.get('quick') else 'full'} run")
+    print(f"compared with {baseline_path} ({baseline.get('revision')})")
+    regressions = compare(record["metrics"], baseline["metrics"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Headless Portable App Manager: install or uninstall the packages of a manifest with the same
+scheduler as the GUI, and write a JSON report. Does not import PySide6.
+
+    python pam_cli.py install packages.txt --workers 6 --report report.json
+    python pam_cli.py uninstall packages.json
+    python pam_cli.py apply profile.json --dry-run
+    python pam_cli.py install packages.txt --trace trace.json
+    python pam_cli.py prefetch packages.txt --cache \\\\server\\share\\pam-installers
+
+A manifest is either a text file with one package per line ("Id" or "Id==version", "!Id" for
+a package that must be absent, "#" starts a comment) or JSON: a list of ids / {"id": ...,
+"version": ..., "depends": [...]} objects, or such a list under a "packages" key with an
+optional "absent" list. A package's "depends" are installed first (and added when missing);
+when one of them fails, the packages needing it are reported "blocked" instead of attempted.
+`apply` compares the manifest with what is installed and only installs, upgrades and removes
+what differs. Exit status: 0 when every package is done or already up to date, 1 when any
+failed or was blocked, 2 for an unreadable manifest or a dependency cycle. The report's
+"metrics" holds p50 / p95 times per operation (winget download, installer, parse table...);
+--trace also saves every span as Chrome trace-event JSON.
+
+Installers are kept in a content-addressed cache (PAM_INSTALLER_CACHE, or --cache) and
+installed from there when present; `prefetch` only fills the cache. Pointing every machine
+at the same shared folder downloads each installer once.
+
+--backend helper (or PAM_BACKEND=helper) answers the installed / upgrade listings from one
+long-lived pam_helper.ps1 process instead of starting winget for each.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+from pam_core import (
+    ACTION_LABELS, BACKEND, BACKENDS, DOWNLOAD_WORKERS, INSTALLER_CACHE_DIR, TRACER, BatchScheduler, InstallerCache,
+    get_backend, dependency_order, prefetch_installers, plan_desired_state, read_profile, set_backend,
+    winget_installed_snapshot, winget_upgrade_listing,
+)
+
+
+def run_scheduler(scheduler):
+    """Run a BatchScheduler to completion; returns one report row per package"""
+    # the scheduler runs in a thread so Ctrl+C reaches this one and can cancel it
+    runner = threading.Thread(target=scheduler.run, name="pam-batch", daemon=True)
+    runner.start()
+    while runner.is_alive():
+        try:
+            runner.join(0.2)
+        except KeyboardInterrupt:
+            scheduler.cancel()
+    rows = []
+    for app_id in scheduler.tasks:
+        outcome = scheduler.results.get(app_id, "cancelled" if scheduler.cancelled else "not run")
+        rows.append(dict({"id": app_id, "version": scheduler.versions.get(app_id),
+                          "plan": scheduler.plan.get(app_id), "outcome": outcome},
+                         **scheduler.details.get(app_id, {})))
+    return rows
+
+
+def run_prefetch(cache, packages, workers, log=None):
+    """Download the manifest's installers into cache; report rows with "cached" / "downloaded" / "failed" """
+    cancel = threading.Event()
+    results = {}
+    # in a thread so Ctrl+C reaches this one and can cancel it
+    runner = threading.Thread(target=lambda: results.update(prefetch_installers(cache, packages, workers, log,
+                                                                                cancel)),
+                              name="pam-prefetch", daemon=True)
+    runner.start()
+    while runner.is_alive():
+        try:
+            runner.join(0.2)
+        except KeyboardInterrupt:
+            cancel.set()
+    return [{"id": app_id, "version": version, "outcome": results.get(app_id, "cancelled")}
+            for app_id, version in packages], cancel.is_set()
+
+
+def run_batch(packages, action="install", workers=DOWNLOAD_WORKERS, log=None, absent=(), dry_run=False,
+              cache=None, depends=None):
+    """Run a manifest; returns the report dict. depends: lower-cased id -> ids it needs"""
+    started = time.time()
+    versions = {app_id: version for app_id, version in packages if version}
+    report = {"action": action, "workers": workers, "started": started, "cache": cache and cache.root}
+    rows = []
+    cancelled = False
+    batches = []
+    if action == "prefetch":
+        if cache is None:
+            raise ValueError("prefetch needs an installer cache")
+        rows, cancelled = run_prefetch(cache, packages, workers, log)
+    elif action == "apply":
+        if log:
+            log("Reading installed packages and available upgrades...", 0)
+        plan = plan_desired_state(packages, winget_installed_snapshot(), winget_upgrade_listing(), absent, depends)
+        report["plan"] = plan.to_dict()
+        if log:
+            log(plan.summary(), 0)
+            for line in plan.describe():
+                log(line, 0)
+        batches = [] if dry_run else [
+            BatchScheduler(plan.install + plan.upgrade, ACTION_LABELS["install"], workers, report=log,
+                           versions=versions, plan=plan.actions(), cache=cache, depends=plan.depends),
+            BatchScheduler(plan.remove, ACTION_LABELS["uninstall"], workers, report=log),
+        ]
+        rows.extend({"id": app_id, "version": versions.get(app_id), "plan": "skip", "outcome": "skipped"}
+                    for app_id in plan.unchanged)
+        if dry_run:
+            planned = dict(plan.actions(), **{app_id: "remove" for app_id in plan.remove})
+            rows.extend({"id": app_id, "version": versions.get(app_id), "plan": step, "outcome": "planned"}
+                        for app_id, step in planned.items())
+    elif action == "install" and depends:
+        batches = [BatchScheduler(dependency_order([app_id for app_id, _ in packages], depends), ACTION_LABELS[action],
+                                  workers, report=log, versions=versions, cache=cache, depends=depends)]
+    else:
+        batches = [BatchScheduler([app_id for app_id, _ in packages], ACTION_LABELS[action], workers, report=log,
+                                  versions=versions, cache=cache)]
+    for scheduler in batches:
+        if cancelled or not scheduler.tasks:
+            continue
+        rows.extend(run_scheduler(scheduler))
+        cancelled = scheduler.cancelled
+    finished = time.time()
+    summary = {}
+    for row in rows:
+        summary[row["outcome"]] = summary.get(row["outcome"], 0) + 1
+    report.update({"finished": finished, "duration_s": round(finished - started, 3), "cancelled": cancelled,
+                   "dry_run": dry_run, "summary": summary, "packages": rows, "metrics": TRACER.metrics()})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("action", choices=sorted(ACTION_LABELS) + ["apply", "prefetch"])
+    parser.add_argument("manifest")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS,
+                        help=f"parallel downloads (default {DOWNLOAD_WORKERS}); installers run one at a time")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    parser.add_argument("--dry-run", action="store_true", help="apply: only compute and report the plan")
+    parser.add_argument("--cache", default=INSTALLER_CACHE_DIR,
+                        help=f"installer cache directory, e.g. a network share (default {INSTALLER_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="always download, cache nothing")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=BACKEND,
+                        help="cli: one winget process per call; helper: listings from one long-lived helper "
+                             f"(default {BACKEND})")
+    parser.add_argument("--trace", help="write every span as Chrome trace-event JSON here")
+    parser.add_argument("--quiet", action="store_true", help="no progress messages on stderr")
+    args = parser.parse_args(argv)
+    if args.backend not in BACKENDS:
+        # argparse checks choices only for values given on the command line, not for the PAM_BACKEND default
+        print(f"Unknown backend {args.backend!r} (PAM_BACKEND): use one of {', '.join(sorted(BACKENDS))}",
+              file=sys.stderr)
+        return 2
+    depends = {}
+    try:
+        packages, absent = read_profile(args.manifest, depends)
+        dependency_order([app_id for app_id, _ in packages], depends)  # rejects a cycle up front
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Cannot read manifest {args.manifest}: {e}", file=sys.stderr)
+        return 2
+    log = None if args.quiet else (lambda message, percent: print(f"[{percent:3d}%] {message}", file=sys.stderr))
+    cache = None if args.no_cache or not args.cache else InstallerCache(args.cache)
+    if args.action == "prefetch" and cache is None:
+        print("prefetch needs an installer cache (--cache)", file=sys.stderr)
+        return 2
+    set_backend(BACKENDS[args.backend]())
+    try:
+        report = run_batch(packages, args.action, args.workers, log, absent, args.dry_run, cache, depends)
+    finally:
+        get_backend().close()
+    if args.trace:
+        TRACER.export_chrome_trace(args.trace)
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    ok = all(row["outcome"] in ("done", "skipped", "planned", "cached", "downloaded") for row in report["packages"])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2427 @@
+"""
+Portable App Manager without the GUI: winget helpers and output parsing, the caches and
+indexes, and the batch scheduler. Nothing here imports PySide6, so scripts and the headless
+CLI (pam_cli.py) can use it on machines without a display.
+"""
+import os
+import json
+import logging
+import logging.handlers
+import time
+import subprocess
+import shlex
+import re
+import signal
+import sqlite3
+import contextlib
+import shutil
+import hashlib
+import tempfile
+import threading
+import heapq
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --------------------------
+# Configuration
+# --------------------------
+# winget executable; override with e.g. "python benchmarks/fake_winget.py" to run without Windows
+WINGET = os.environ.get("PAM_WINGET", "winget")
+WINGET_AGREEMENTS = "--accept-package-agreements --accept-source-agreements"
+# number of packages downloaded at the same time; installers always run one at a time
+DOWNLOAD_WORKERS = int(os.environ.get("PAM_DOWNLOAD_WORKERS", "4"))
+# per-user state (caches) lives here
+DATA_DIR = os.environ.get("PAM_DATA_DIR") or os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.expanduser("~/.cache"), "PortableAppManager")
+# seconds before the cached installed list / available upgrades are revalidated against winget
+INVENTORY_TTL = 300
+UPGRADES_TTL = 3600
+# after a batch of at most this many packages only their rows are re-listed, not the whole inventory
+INVENTORY_PATCH_MAX = 25
+# winget search results kept across launches (entries, seconds)
+SEARCH_CACHE_SIZE = 200
+SEARCH_CACHE_TTL = 6 * 3600
+# minimum seconds between two per-package progress updates sent to the UI
+PROGRESS_INTERVAL = 0.1
+# optional offline package index, built from a winget-pkgs style manifest directory or a
+# JSON Lines export (one {"Id", "Name", "Publisher", "Version", "Tags", "Moniker"} per line)
+PACKAGE_SOURCE = os.environ.get("PAM_PACKAGE_SOURCE", "")
+# seconds after its last refresh that the index answers searches instead of `winget search`
+PACKAGE_INDEX_TTL = 24 * 3600
+# ranked index results returned per search
+PACKAGE_INDEX_LIMIT = 200
+# spans kept by the tracer (oldest dropped first); PAM_TRACE=0 turns tracing off
+TRACE_MAX_SPANS = 20000
+# seconds before a command is killed with everything it started, by span name (see command_name)
+COMMAND_TIMEOUTS = {
+    "winget search": 60,
+    "winget list": 120,
+    "winget download": 1800,
+    "winget install": 3600,
+    "winget upgrade": 3600,
+    "winget uninstall": 1800,
+    "installer": 3600,
+}
+COMMAND_TIMEOUT_DEFAULT = 600
+# tries of a command that failed transiently, and the first wait between them (doubled each time, capped)
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 2.0
+RETRY_BACKOFF_MAX = 30.0
+# content-addressed store of downloaded installers; point PAM_INSTALLER_CACHE at a shared folder
+# to reuse downloads across machines, or set it to "off"
+INSTALLER_CACHE_DIR = os.environ.get("PAM_INSTALLER_CACHE") or os.path.join(DATA_DIR, "installers")
+if INSTALLER_CACHE_DIR.lower() == "off":
+    INSTALLER_CACHE_DIR = None
+INSTALLER_CACHE_BYTES = int(os.environ.get("PAM_INSTALLER_CACHE_MB", "20480")) << 20
+# an unpinned install reuses the newest cached version for this long, then downloads (and caches) again
+INSTALLER_CACHE_TTL = 24 * 3600
+# how winget is driven: "cli" (a process per call) or "helper" (queries go to one long-lived
+# HELPER_COMMAND process speaking line-delimited JSON, see HelperBackend)
+BACKEND = os.environ.get("PAM_BACKEND", "cli")
+HELPER_COMMAND = os.environ.get("PAM_HELPER") or (
+    'powershell -NoLogo -NoProfile -ExecutionPolicy Bypass -File '
+    f'"{os.path.join(os.path.dirname(os.path.abspath(__file__)), "pam_helper.ps1")}"')
+# the progress log on disk rolls over at this size, keeping this many older files
+PROGRESS_LOG_BYTES = 1 << 20
+PROGRESS_LOG_BACKUPS = 5
+
+# --------------------------
+# Tracing
+# --------------------------
+class Span:
+    """One timed operation; put results (exit code, bytes, rows...) into args before it ends"""
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NullSpan:
+    """What a disabled tracer hands out: accepts args, records nothing"""
+    args = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class Tracer:
+    """
+    Spans of winget calls, parsing, batches and UI updates, kept in a bounded buffer.
+    Recording is a deque append, cheap enough to stay on; export with chrome_trace()
+    (chrome://tracing, Perfetto) or summarize with metrics().
+    """
+    def __init__(self, max_spans=TRACE_MAX_SPANS, enabled=True):
+        self.enabled = enabled
+        self._spans = deque(maxlen=max_spans)  # (name, cat, start_ns, end_ns, thread id, args)
+        self._threads = {}                     # thread id -> name, for the trace viewer
+        self._origin_ns = time.perf_counter_ns()
+        self._null = _NullSpan()
+
+    def span(self, name, cat="app", **args):
+        if not self.enabled:
+            return self._null
+        return Span(self, name, cat, args)
+
+    def record(self, name, cat, start_ns, end_ns, args=None):
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = threading.current_thread().name
+        self._spans.append((name, cat, start_ns, end_ns, ident, args or {}))
+
+    def clear(self):
+        self._spans.clear()
+
+    def spans(self):
+        return list(self._spans)
+
+    def chrome_trace(self):
+        """Trace Event Format dict: complete ("X") events in microseconds, plus thread names"""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": ident, "args": {"name": name}}
+                  for ident, name in list(self._threads.items())]
+        for name, cat, start, end, ident, args in self.spans():
+            events.append({"name": name, "cat": cat, "ph": "X", "pid": pid, "tid": ident,
+                           "ts": (start - self._origin_ns) / 1000, "dur": (end - start) / 1000, "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.chrome_trace(), fh)
+
+    def metrics(self):
+        """Per span name: count, total, p50, p95 and max duration in milliseconds"""
+        durations = defaultdict(list)
+        for name, _, start, end, _, _ in self.spans():
+            durations[name].append((end - start) / 1e6)
+        summary = {}
+        for name, values in sorted(durations.items()):
+            values.sort()
+            n = len(values)
+            summary[name] = {
+                "count": n,
+                "total_ms": round(sum(values), 3),
+                # nearest-rank percentiles
+                "p50_ms": round(values[max(0, -(-n * 50 // 100) - 1)], 3),
+                "p95_ms": round(values[max(0, -(-n * 95 // 100) - 1)], 3),
+                "max_ms": round(values[-1], 3),
+            }
+        return summary
+
+
+TRACER = Tracer(enabled=os.environ.get("PAM_TRACE", "1") != "0")
+
+def command_name(cmd: str) -> str:
+    """Span name of a command: "winget list", "winget download"... or "installer" for anything else"""
+    if cmd.startswith(WINGET):
+        verb = cmd[len(WINGET):].split(None, 1)
+        return f"winget {verb[0]}" if verb else "winget"
+    return "installer"
+
+# --------------------------
+# Winget helpers (robust parsing)
+# --------------------------
+def run_cmd(cmd: str, timeout=None, cancel=None):
+    """
+    Run a command line and return CompletedProcess. The command and its children are
+    killed after timeout seconds (default COMMAND_TIMEOUTS) or as soon as the cancel
+    Event is set; the exit code is then EXIT_TIMEOUT / EXIT_CANCELLED.
+    """
+    name = command_name(cmd)
+    with TRACER.span(name, "process", cmd=cmd) as sp:
+        proc = popen_cmd(cmd, stderr=subprocess.PIPE)
+        with ProcessWatch(proc, command_timeout(name, timeout), cancel) as watch:
+            out, err = proc.communicate()
+        res = subprocess.CompletedProcess(cmd, watch.exit_code(proc.returncode), out, err)
+        sp.args["exit_code"] = res.returncode
+        sp.args["bytes"] = len(out or "")
+    return res
+
+def shell_quote(arg: str) -> str:
+    """Quote one argument for popen_cmd: CreateProcess command-line rules on Windows, POSIX shell elsewhere"""
+    if os.name == "nt":
+        return subprocess.list2cmdline([arg])
+    return shlex.quote(arg)
+
+def popen_cmd(cmd: str, stderr=subprocess.DEVNULL):
+    """
+    Start a command line with piped stdout, in its own process group so it can be killed as a tree.
+    On Windows it goes straight to CreateProcess: cmd.exe would act on & | ^ < > and %VAR% even
+    in an argument quoted by shell_quote.
+    """
+    if os.name == "nt":
+        group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group = {"start_new_session": True}
+    return subprocess.Popen(cmd, shell=os.name != "nt", stdout=subprocess.PIPE, stderr=stderr,
+                            text=True, errors="replace", **group)
+
+# winget redraws its progress bar with \r: "  ██████▌   12.0 MB / 45.3 MB" or "  ████   45%"
+_BYTES_PROGRESS = re.compile(r'([\d.]+)\s*([KMGT]?B)\s*/\s*([\d.]+)\s*([KMGT]?B)')
+_PERCENT_PROGRESS = re.compile(r'(?<![\d.])(\d{1,3})\s*%')
+_UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+
+def parse_progress_line(ln: str):
+    """Fraction 0..1 from a winget progress line, or None"""
+    m = _BYTES_PROGRESS.search(ln)
+    if m:
+        total = float(m.group(3)) * _UNITS[m.group(4)]
+        if total > 0:
+            return min(1.0, float(m.group(1)) * _UNITS[m.group(2)] / total)
+    m = _PERCENT_PROGRESS.search(ln)
+    if m:
+        return min(100, int(m.group(1))) / 100
+    return None
+
+def run_cmd_streaming(cmd: str, on_progress=None, tail_lines=200, timeout=None, cancel=None):
+    """
+    Run a command line reading its output as it is produced and return CompletedProcess.
+    on_progress(fraction) is called for every progress line; only the last tail_lines
+    lines are kept for the result, so long installer logs are not held in memory.
+    timeout and cancel as for run_cmd.
+    """
+    name = command_name(cmd)
+    with TRACER.span(name, "process", cmd=cmd) as sp:
+        proc = popen_cmd(cmd, stderr=subprocess.STDOUT)
+        tail = deque(maxlen=tail_lines)
+        size = 0
+        with ProcessWatch(proc, command_timeout(name, timeout), cancel) as watch:
+            # text mode reads \r as a line end, so every progress redraw arrives as its own line
+            for ln in proc.stdout:
+                size += len(ln)
+                ln = ln.rstrip()
+                if not ln:
+                    continue
+                fraction = parse_progress_line(ln)
+                if fraction is None:
+                    tail.append(ln)
+                elif on_progress:
+                    on_progress(fraction)
+            proc.wait()
+        if watch.reason:
+            tail.append(watch.describe())
+        res = subprocess.CompletedProcess(cmd, watch.exit_code(proc.returncode), "\n".join(tail), "")
+        sp.args["exit_code"] = res.returncode
+        sp.args["bytes"] = size
+    return res
+
+def kill_process_tree(proc):
+    """Kill a process started by popen_cmd together with everything it spawned (shell, winget, installer)"""
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(f"taskkill /F /T /PID {proc.pid}", shell=True, capture_output=True)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        proc.kill()
+
+# Windows' ERROR_TIMEOUT and ERROR_CANCELLED, reported for commands killed by ProcessWatch
+EXIT_TIMEOUT = 1460
+EXIT_CANCELLED = 1223
+# how often a ProcessWatch looks at its cancel Event
+WATCH_INTERVAL = 0.05
+
+def command_timeout(name: str, timeout=None):
+    return timeout if timeout is not None else COMMAND_TIMEOUTS.get(name, COMMAND_TIMEOUT_DEFAULT)
+
+class ProcessWatch:
+    """
+    Context manager around a popen_cmd process: a daemon thread kills its whole tree once
+    timeout seconds pass or the cancel Event is set. reason is then "timeout" / "cancelled".
+    """
+    def __init__(self, proc, timeout=None, cancel=None):
+        self.proc = proc
+        self.timeout = timeout
+        self.cancel = cancel
+        self.reason = None
+        self._done = threading.Event()
+
+    def __enter__(self):
+        if self.timeout or self.cancel is not None:
+            threading.Thread(target=self._watch, name="pam-watch", daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._done.set()
+        if exc_type is not None:
+            kill_process_tree(self.proc)
+        return False
+
+    def _watch(self):
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while True:
+            wait = WATCH_INTERVAL if self.cancel is not None else deadline - time.monotonic()
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+            if self._done.wait(max(0.0, wait)):
+                return
+            if self.cancel is not None and self.cancel.is_set():
+                self.reason = "cancelled"
+            elif deadline is not None and time.monotonic() >= deadline:
+                self.reason = "timeout"
+            else:
+                continue
+            kill_process_tree(self.proc)
+            return
+
+    def exit_code(self, returncode):
+        if self.reason == "timeout":
+            return EXIT_TIMEOUT
+        if self.reason == "cancelled":
+            return EXIT_CANCELLED
+        return returncode
+
+    def describe(self):
+        return f"Timed out after {self.timeout:g} s" if self.reason == "timeout" else "Cancelled"
+
+# exit codes worth another try: another installer is running (1618), winget download failed,
+# WinINet timeout / name not resolved / cannot connect / connection aborted
+TRANSIENT_EXIT_CODES = {1618, 0x8A150008, 0x80072EE2, 0x80072EE7, 0x80072EFD, 0x80072EFE}
+# winget's own messages for a failed source update or WinINet request, for exit codes that do not say so
+_TRANSIENT_OUTPUT = re.compile(r'failed to update source|failed when (?:opening|searching) source|'
+                               r'InternetOpenUrl\(\) failed|0x80072ee[27]|0x80072ef[de]', re.I)
+
+def is_transient_failure(res) -> bool:
+    """True for a failed CompletedProcess that may well succeed when run again"""
+    if res.returncode in (0, EXIT_TIMEOUT, EXIT_CANCELLED):
+        return False
+    if res.returncode & 0xFFFFFFFF in TRANSIENT_EXIT_CODES:
+        return True
+    return bool(_TRANSIENT_OUTPUT.search(f"{res.stdout or ''}\n{res.stderr or ''}"))
+
+def run_with_retry(run, attempts=RETRY_ATTEMPTS, cancel=None, on_retry=None):
+    """
+    Call run() (returning a CompletedProcess) until it succeeds or fails for good, up to
+    attempts times, waiting RETRY_BACKOFF seconds, then twice that, ... in between.
+    on_retry(res, attempt, delay) is told about every retry; setting cancel ends the wait.
+    """
+    delay = RETRY_BACKOFF
+    for attempt in range(1, attempts + 1):
+        res = run()
+        if attempt == attempts or not is_transient_failure(res):
+            return res
+        if on_retry:
+            on_retry(res, attempt, delay)
+        if cancel is not None:
+            if cancel.wait(delay):
+                return res
+        else:
+            time.sleep(delay)
+        delay = min(delay * 2, RETRY_BACKOFF_MAX)
+    return res
+
+# column names winget prints in English; others are kept as printed
+WINGET_COLUMNS = ("Name", "Id", "Version", "Available", "Match", "Source")
+# East Asian wide / fullwidth ranges: winget pads these as two columns
+_WIDE_CHARS = re.compile('[\u1100-\u115f\u2e80-\u303e\u3041-\u33ff\u3400-\u4dbf\u4e00-\u9fff'
+                         '\ua000-\ua4cf\uac00-\ud7a3\uf900-\ufaff\ufe30-\ufe4f\uff00-\uff60'
+                         '\uffe0-\uffe6\U0001f300-\U0001f64f\U00020000-\U0003fffd]')
+
+def _char_index(col: int, wide) -> int:
+    """String index of display column col, given the indexes of the wide characters"""
+    shift = 0
+    for w in wide:
+        if w + shift >= col:
+            break
+        shift += 1
+    return col - shift
+
+def _parse_header(header: str):
+    """Column names and (start, end) display offsets of a winget table header"""
+    words = list(re.finditer(r'\S+', header))
+    wide = [m.start() for m in _WIDE_CHARS.finditer(header)]
+    # a wide character before a label pushes its display column right
+    starts = [m.start() + sum(1 for w in wide if w < m.start()) for m in words]
+    names = []
+    for i, m in enumerate(words):
+        label = m.group()
+        if label in WINGET_COLUMNS:
+            names.append(label)
+        elif i < 3:
+            # localized header: the first three columns are always Name, Id, Version
+            names.append(WINGET_COLUMNS[i])
+        elif i == len(words) - 1:
+            names.append("Source")
+        else:
+            names.append(label)
+    return names, list(zip(starts, starts[1:] + [None]))
+
+def _table_row(ln: str, names, bounds):
+    """Slice one data row at the header offsets; None for lines that are not rows"""
+    wide = not ln.isascii() and [m.start() for m in _WIDE_CHARS.finditer(ln)]
+    if wide:
+        bounds = [(_char_index(a, wide), b and _char_index(b, wide)) for a, b in bounds]
+    row = {name: ln[a:b].strip() for name, (a, b) in zip(names, bounds)}
+    app_id = row.get("Id")
+    if not app_id or " " in app_id:
+        return None
+    row["Category"] = "Winget"
+    return row
+
+def iter_winget_table(lines):
+    """
+    Yields one dict per data row of winget's tabular output (search, list, upgrade).
+    Column boundaries are read once from the header, recognised by the dash line under it,
+    and every row is sliced at those offsets, so names may contain any spacing.
+    Spinner / progress lines before the header and summary lines after the table are skipped.
+    A header line can only be told apart from data by the separator that follows it, so each
+    line is held back until the next one is seen.
+    """
+    names = bounds = None
+    held = None
+    for ln in lines:
+        ln = ln.rstrip()
+        if ln[:3] == "---" and not ln.strip("-"):
+            if held:
+                names, bounds = _parse_header(held)
+                if len(bounds) < 2:
+                    names = bounds = None
+            held = None
+            continue
+        if held and bounds:
+            row = _table_row(held, names, bounds)
+            if row:
+                yield row
+        held = ln
+    if held and bounds:
+        row = _table_row(held, names, bounds)
+        if row:
+            yield row
+
+def parse_winget_search_output(output: str):
+    """Parses whole winget search / list output, see iter_winget_table"""
+    with TRACER.span("parse table", "parse", bytes=len(output)) as sp:
+        rows = list(iter_winget_table(output.splitlines()))
+        sp.args["rows"] = len(rows)
+    return rows
+
+def winget_search_cmd(query: str, source: str = None):
+    cmd = f'{WINGET} search {shell_quote(query)}'
+    if source:
+        cmd += f' --source {shell_quote(source)}'
+    return cmd
+
+def winget_search_apps(query: str, source: str = None, cache=None, index=None):
+    """Search rows for query; a fresh PackageIndex answers instead of the winget source"""
+    if index is not None and index.fresh and source in (None, "winget"):
+        return index.search(query)
+    if cache is not None:
+        items = cache.get(query, source)
+        if items is not None:
+            return items
+    try:
+        items = get_backend().search(query, source)
+    except Exception:
+        return []
+    if cache is not None and items:
+        cache.put(query, items, source)
+    return items
+
+def winget_list_installed(cancel=None):
+    try:
+        return get_backend().list_installed(cancel)
+    except Exception:
+        return []
+
+def winget_is_installed(app_id: str, cancel=None) -> bool:
+    return get_backend().is_installed(app_id, cancel)
+
+def winget_installed_rows(app_ids, cancel=None):
+    """`winget list` rows of just these ids (the ones not installed are missing), None on failure"""
+    try:
+        return get_backend().installed_rows(app_ids, cancel)
+    except Exception:
+        return None
+
+def winget_installed_snapshot():
+    """One `winget list` for a whole batch, keyed by lower-cased Id"""
+    return {it["Id"].lower(): it for it in winget_list_installed()}
+
+def winget_list_upgrades(cancel=None):
+    """Rows of one `winget upgrade`: installed packages with a newer version. None if winget could not run"""
+    try:
+        return get_backend().list_upgrades(cancel)
+    except Exception:
+        return None
+
+def winget_upgrade_listing(cancel=None):
+    """winget_list_upgrades keyed by lower-cased Id"""
+    return {it["Id"].lower(): it for it in winget_list_upgrades(cancel) or []}
+
+def classify_package(app_id: str, snapshot: dict, version: str = None) -> str:
+    """
+    "install", "upgrade" or "skip" (installed and no newer version listed). With a pinned
+    version, only that exact installed version is skipped.
+    """
+    row = snapshot.get(app_id.lower())
+    if row is None:
+        return "install"
+    if version:
+        return "skip" if row.get("Version") == version else "upgrade"
+    if row.get("Version") and not row.get("Available"):
+        return "skip"
+    return "upgrade"
+
+def _version_arg(version: str = None) -> str:
+    return f' --version {shell_quote(version)}' if version else ''
+
+def winget_download(app_id: str, directory: str, on_progress=None, version: str = None, cancel=None):
+    """Download the installer and merged manifest of app_id into directory"""
+    return get_backend().download(app_id, directory, on_progress, version, cancel)
+
+# silent switches for installer types whose manifest does not spell them out
+SILENT_SWITCHES = {
+    "nullsoft": "/S",
+    "inno": "/VERYSILENT /SUPPRESSMSGBOXES /NORESTART /SP-",
+    "burn": "/quiet /norestart",
+}
+
+def read_manifest_installers(path: str):
+    """
+    (top-level fields, [fields of each Installers entry]) of a winget manifest, from a flat
+    `Key: value` scan of each scope (first occurrence wins, nested keys such as Silent under
+    InstallerSwitches included).
+    """
+    top, installers = {}, []
+    in_installers, item_indent = False, None
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        for ln in fh:
+            text = ln.strip()
+            if not text or text.startswith("#"):
+                continue
+            indent = len(ln) - len(ln.lstrip(" "))
+            if indent == 0 and not text.startswith("- "):
+                in_installers = text.partition(":")[0].strip() == "Installers"
+                if in_installers:
+                    continue
+            fields = top
+            if in_installers:
+                if text.startswith("- ") and item_indent in (None, indent):
+                    item_indent = indent
+                    installers.append({})
+                if not installers:
+                    continue
+                fields = installers[-1]
+            key, sep, value = text.lstrip("- ").partition(":")
+            key = key.strip()
+            if sep and value.strip() and key not in fields:
+                fields[key] = value.strip().strip("'\"")
+    return top, installers
+
+def find_downloaded_installer(directory: str):
+    """
+    Return (installer path, manifest fields) from a `winget download` directory. The fields
+    are those of the manifest's installer entry for the downloaded file, over the top-level
+    defaults; None when the manifest lists several installers and none has the file's hash.
+    """
+    installer, manifest = None, None
+    if not os.path.isdir(directory):
+        return installer, {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.lower().endswith((".yaml", ".yml")):
+            manifest = path
+        elif os.path.isfile(path):
+            installer = path
+    if manifest is None:
+        return installer, {}
+    top, installers = read_manifest_installers(manifest)
+    if len(installers) <= 1:
+        return installer, dict(top, **(installers[0] if installers else {}))
+    sha256 = installer and file_sha256(installer)
+    for entry in installers:
+        if (entry.get("InstallerSha256") or "").lower() == sha256:
+            return installer, dict(top, **entry)
+    return installer, None
+
+def installer_command(installer: str, fields: dict):
+    """Silent command line for a downloaded installer, or None if it cannot be run unattended"""
+    kind = (fields.get("InstallerType") or os.path.splitext(installer)[1].lstrip(".")).lower()
+    if kind in ("msi", "wix"):
+        return f'msiexec /i "{installer}" /qn /norestart'
+    if kind in ("msix", "appx"):
+        return f'powershell -NoProfile -Command Add-AppxPackage -Path "{installer}"'
+    switches = fields.get("Silent") or SILENT_SWITCHES.get(kind)
+    if not switches:
+        return None
+    return f'"{installer}" {switches}'
+
+def winget_install_or_update(app_id: str, installer_dir: str = None, installed: bool = None, on_progress=None,
+                             version: str = None, cancel=None):
+    # run install or upgrade, return CompletedProcess
+    # installed comes from the batch snapshot; None falls back to a per-package `winget list`
+    if installer_dir:
+        # installer already fetched by the download phase: run it directly, unless the manifest
+        # cannot say which of its installers it is (winget then picks and checks one itself)
+        installer, fields = find_downloaded_installer(installer_dir)
+        cmd = installer and fields is not None and installer_command(installer, fields)
+        if cmd:
+            return run_cmd_streaming(cmd, on_progress, cancel=cancel)
+    if installed is None:
+        installed = winget_is_installed(app_id, cancel)
+    return get_backend().install(app_id, installed, on_progress, version, cancel)
+
+def winget_uninstall(app_id: str, on_progress=None, cancel=None):
+    return get_backend().uninstall(app_id, on_progress, cancel)
+
+# --------------------------
+# Package manager backends
+# --------------------------
+class WingetBackend:
+    """
+    The winget CLI, one process per call. Search / list rows are dicts keyed by the
+    WINGET_COLUMNS plus Category; download / install / uninstall return CompletedProcess.
+    Other backends subclass it and override what they do better.
+    """
+    name = "cli"
+    # SearchThread may read `winget search` output itself, showing rows as they arrive
+    streams_search = True
+
+    def search(self, query, source=None):
+        res = run_with_retry(lambda: run_cmd(winget_search_cmd(query, source)))
+        return parse_winget_search_output(res.stdout)
+
+    def list_installed(self, cancel=None):
+        res = run_with_retry(lambda: run_cmd(f'{WINGET} list', cancel=cancel), cancel=cancel)
+        if res.returncode in (EXIT_TIMEOUT, EXIT_CANCELLED):
+            raise TimeoutError(f"winget list: {res.returncode}")
+        return parse_winget_search_output(res.stdout)
+
+    def list_upgrades(self, cancel=None):
+        # a listing, not an upgrade: it gets the list timeout
+        res = run_with_retry(lambda: run_cmd(f'{WINGET} upgrade --accept-source-agreements',
+                                             timeout=COMMAND_TIMEOUTS["winget list"], cancel=cancel), cancel=cancel)
+        if res.returncode in (EXIT_TIMEOUT, EXIT_CANCELLED):
+            # a cut-off listing is not "nothing to upgrade"
+            raise TimeoutError(f"winget upgrade: {res.returncode}")
+        return [it for it in parse_winget_search_output(res.stdout) if it.get("Available")]
+
+    def is_installed(self, app_id, cancel=None):
+        res = run_with_retry(lambda: run_cmd(f'{WINGET} list --id {shell_quote(app_id)} --exact', cancel=cancel),
+                             cancel=cancel)
+        return app_id.lower() in (res.stdout or "").lower()
+
+    def installed_rows(self, app_ids, cancel=None):
+        rows = []
+        for app_id in app_ids:
+            res = run_with_retry(lambda: run_cmd(f'{WINGET} list --id {shell_quote(app_id)} --exact',
+                                                 cancel=cancel), cancel=cancel)
+            if res.returncode in (EXIT_TIMEOUT, EXIT_CANCELLED):
+                raise TimeoutError(f"winget list --id {app_id}: {res.returncode}")
+            rows.extend(it for it in parse_winget_search_output(res.stdout) if it["Id"].lower() == app_id.lower())
+        return rows
+
+    def download(self, app_id, directory, on_progress=None, version=None, cancel=None):
+        return run_cmd_streaming(f'{WINGET} download --id {shell_quote(app_id)} --exact{_version_arg(version)} '
+                                 f'--download-directory {shell_quote(directory)} {WINGET_AGREEMENTS}', on_progress,
+                                 cancel=cancel)
+
+    def install(self, app_id, installed=False, on_progress=None, version=None, cancel=None):
+        verb = "upgrade" if installed else "install"
+        return run_cmd_streaming(f'{WINGET} {verb} --id {shell_quote(app_id)} --exact{_version_arg(version)} '
+                                 f'--silent {WINGET_AGREEMENTS}', on_progress, cancel=cancel)
+
+    def uninstall(self, app_id, on_progress=None, cancel=None):
+        return run_cmd_streaming(f'{WINGET} uninstall --id {shell_quote(app_id)} --exact --silent', on_progress,
+                                 cancel=cancel)
+
+    def close(self):
+        pass
+
+
+class HelperBackend(WingetBackend):
+    """
+    Searches and listings answered by one long-lived helper process (HELPER_COMMAND, by
+    default pam_helper.ps1 on the Microsoft.WinGet.Client module), so they skip process
+    start-up and winget's source reload. Downloads, installs and uninstalls run for minutes
+    anyway and stay on the CLI, as does any query the helper cannot answer: when it does not
+    start, dies, times out or reports an error.
+
+    Line-delimited JSON, one object per line each way; answers may come in any order:
+        -> {"id": 7, "op": "search", "query": "vlc", "source": null}
+        -> {"id": 8, "op": "list"}    {"op": "upgrades"}    {"op": "is_installed", "app_id": "Git.Git"}
+        <- {"id": 7, "rows": [{"Name": ..., "Id": ..., "Version": ..., "Available": ..., "Source": ...}]}
+        <- {"id": 8, "installed": true}    {"id": 9, "error": "message"}
+    """
+    name = "helper"
+    streams_search = False
+
+    def __init__(self, command=None):
+        self.command = command or HELPER_COMMAND
+        self.disabled = False  # the helper could not be started, or never answered: CLI from now on
+        self._answered = False
+        self._proc = None
+        self._lock = threading.Lock()
+        self._pending = {}     # request id -> [Event, response]
+        self._next_id = 0
+
+    def _ensure_started(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+        try:
+            proc = subprocess.Popen(self.command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, encoding="utf-8", errors="replace",
+                                    bufsize=1, **group)
+        except OSError:
+            self.disabled = True
+            raise
+        self._proc = proc
+        threading.Thread(target=self._read, args=(proc,), name="pam-helper", daemon=True).start()
+        return proc
+
+    def _read(self, proc):
+        for ln in proc.stdout:
+            try:
+                msg = json.loads(ln)
+            except ValueError:
+                continue  # helpers may print banners; only replies count
+            with self._lock:
+                slot = self._pending.pop(msg.get("id"), None)
+            if slot is not None:
+                self._answered = True
+                slot[1] = msg
+                slot[0].set()
+        with self._lock:
+            if not self._answered:
+                self.disabled = True  # e.g. PowerShell without the WinGet module
+            # the helper exited: whoever still waits gets no answer
+            pending, self._pending = self._pending, {}
+            if self._proc is proc:
+                self._proc = None
+        for event, _ in pending.values():
+            event.set()
+
+    def request(self, op, timeout=None, cancel=None, **args):
+        """The helper's answer to one request; OSError / TimeoutError / RuntimeError when there is none"""
+        if self.disabled:
+            raise OSError("helper unavailable")
+        with TRACER.span(f"helper {op}", "process", **args) as sp:
+            with self._lock:
+                proc = self._ensure_started()
+                self._next_id += 1
+                rid = self._next_id
+                slot = self._pending[rid] = [threading.Event(), None]
+                try:
+                    proc.stdin.write(json.dumps(dict(args, id=rid, op=op)) + "\n")
+                    proc.stdin.flush()
+                except OSError:
+                    self._pending.pop(rid, None)
+                    raise
+            deadline = time.monotonic() + (timeout or COMMAND_TIMEOUT_DEFAULT)
+            while not slot[0].wait(WATCH_INTERVAL):
+                if (cancel is not None and cancel.is_set()) or time.monotonic() >= deadline:
+                    with self._lock:
+                        self._pending.pop(rid, None)
+                    if not (cancel is not None and cancel.is_set()):
+                        self.close()  # a stuck helper is restarted by the next request
+                    raise TimeoutError(f"helper {op} gave no answer")
+            msg = slot[1]
+            if msg is None:
+                raise OSError("helper exited")
+            if "error" in msg:
+                sp.args["error"] = msg["error"]
+                raise RuntimeError(msg["error"])
+            sp.args["rows"] = len(msg.get("rows") or ())
+            return msg
+
+    @staticmethod
+    def _rows(msg):
+        rows = []
+        for row in msg.get("rows") or ():
+            row = {k: str(v) for k, v in row.items() if v not in (None, "")}
+            if row.get("Id"):
+                row.setdefault("Name", row["Id"])
+                row["Category"] = "Winget"
+                rows.append(row)
+        return rows
+
+    def search(self, query, source=None):
+        try:
+            return self._rows(self.request("search", COMMAND_TIMEOUTS["winget search"], query=query, source=source))
+        except (OSError, RuntimeError):
+            return super().search(query, source)
+
+    def list_installed(self, cancel=None):
+        try:
+            return self._rows(self.request("list", COMMAND_TIMEOUTS["winget list"], cancel))
+        except (OSError, RuntimeError):
+            return super().list_installed(cancel)
+
+    def list_upgrades(self, cancel=None):
+        try:
+            rows = self._rows(self.request("upgrades", COMMAND_TIMEOUTS["winget list"], cancel))
+        except (OSError, RuntimeError):
+            return super().list_upgrades(cancel)
+        return [it for it in rows if it.get("Available")]
+
+    def is_installed(self, app_id, cancel=None):
+        try:
+            return bool(self.request("is_installed", COMMAND_TIMEOUTS["winget list"], cancel, app_id=app_id)
+                        .get("installed"))
+        except (OSError, RuntimeError):
+            return super().is_installed(app_id, cancel)
+
+    def installed_rows(self, app_ids, cancel=None):
+        # one listing from the helper costs less than a `winget list --id` per package
+        wanted = {app_id.lower() for app_id in app_ids}
+        try:
+            rows = self._rows(self.request("list", COMMAND_TIMEOUTS["winget list"], cancel))
+        except (OSError, RuntimeError):
+            return super().installed_rows(app_ids, cancel)
+        return [it for it in rows if it["Id"].lower() in wanted]
+
+    def close(self):
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()  # the helper exits at the end of its input
+            proc.wait(1)
+        except (OSError, subprocess.TimeoutExpired):
+            kill_process_tree(proc)
+
+
+BACKENDS = {"cli": WingetBackend, "helper": HelperBackend}
+_backend = None
+
+def get_backend():
+    """The backend every winget_* helper goes through, made from PAM_BACKEND on first use"""
+    global _backend
+    if _backend is None:
+        _backend = BACKENDS.get(BACKEND, WingetBackend)()
+    return _backend
+
+def set_backend(backend):
+    """Use backend from now on (e.g. a fake for benchmarks); returns the previous one"""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+# --------------------------
+# Filter index
+# --------------------------
+class SearchIndex:
+    """
+    Trigram index over the lower-cased text of keyed entries (e.g. name and Id), built as
+    entries are added. matches(q) returns the keys whose text contains q, the same result
+    as a substring scan but only verifying entries that share all of q's trigrams.
+    """
+    def __init__(self):
+        self._text = {}                   # key -> lower-cased fields joined by "\n"
+        self._grams = defaultdict(set)    # trigram -> keys
+
+    def __len__(self):
+        return len(self._text)
+
+    def add(self, key, *fields):
+        text = "\n".join(f.lower() for f in fields if f)
+        self._text[key] = text
+        grams = self._grams
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            grams[gram].add(key)
+
+    def discard(self, key):
+        text = self._text.pop(key, None)
+        if text is None:
+            return
+        grams = self._grams
+        for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+            grams[gram].discard(key)
+            if not grams[gram]:
+                del grams[gram]
+
+    def clear(self):
+        self._text.clear()
+        self._grams.clear()
+
+    def matches(self, query):
+        q = query.strip().lower()
+        if len(q) < 3:
+            return {k for k, text in self._text.items() if q in text}
+        postings = sorted((self._grams.get(q[i:i + 3], ()) for i in range(len(q) - 2)), key=len)
+        if not postings[0]:
+            return set()
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {k for k in candidates if q in self._text[k]}
+
+    def fuzzy_matches(self, query):
+        """Keys whose text contains the characters of query in order (e.g. "vsc" -> "visual studio code")"""
+        q = "".join(query.lower().split())
+        if not q:
+            return set(self._text)
+        pattern = re.compile(".*?".join(map(re.escape, q)))
+        return {k for k, text in self._text.items() if pattern.search(text)}
+
+    def filter(self, query):
+        """Substring matches, or fuzzy ones when nothing contains the query verbatim"""
+        found = self.matches(query)
+        if not found and len(query.strip()) >= 2:
+            found = self.fuzzy_matches(query)
+        return found
+
+# --------------------------
+# Catalog
+# --------------------------
+def normalize_name(name: str) -> str:
+    """"Node.js LTS" -> "nodejslts": case, spacing and punctuation do not tell packages apart"""
+    return re.sub(r"[\W_]+", "", name.lower())
+
+
+class CatalogEntry:
+    __slots__ = ("id", "name", "category", "version", "source", "depends")
+
+    def __init__(self, app_id, name, category="Other", version="", source="", depends=()):
+        self.id = app_id
+        self.name = name
+        self.category = category
+        self.version = version
+        self.source = source
+        self.depends = tuple(depends)  # ids that must be installed first
+
+    def __repr__(self):
+        return f"CatalogEntry({self.id!r}, {self.name!r}, {self.category!r})"
+
+
+class Catalog:
+    """
+    Every app the Explore grid knows about, curated (APPS) or added from winget search.
+    Entries are unique by Id (case-insensitive, like winget); adding a known Id merges
+    into the existing entry instead of creating a second one.
+    """
+    def __init__(self, apps=()):
+        self._by_id = {}                         # id.lower() -> entry, in insertion order
+        self._by_category = OrderedDict()        # category -> [entry]
+        self._by_name = defaultdict(list)        # normalize_name(name) -> [entry]
+        self.index = SearchIndex()               # entry id -> name and Id text
+        self.add_many(apps)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __contains__(self, app_id):
+        return app_id.lower() in self._by_id
+
+    def get(self, app_id):
+        return self._by_id.get(app_id.lower())
+
+    def categories(self):
+        return list(self._by_category)
+
+    def in_category(self, category):
+        return list(self._by_category.get(category, ()))
+
+    def by_name(self, name):
+        return list(self._by_name.get(normalize_name(name), ()))
+
+    def add(self, app, category=None):
+        """
+        Add a row dict as printed by winget / listed in APPS ("Name", "Id", optionally
+        "Category", "Version", "Source", "Depends"). Returns the new entry, or None when the Id
+        was already known; then only blank Version / Source / Depends fields of the existing
+        entry are filled.
+        """
+        key = app["Id"].lower()
+        entry = self._by_id.get(key)
+        if entry is not None:
+            entry.version = entry.version or app.get("Version", "")
+            entry.source = entry.source or app.get("Source", "")
+            entry.depends = entry.depends or tuple(app.get("Depends", ()))
+            return None
+        entry = CatalogEntry(app["Id"], app.get("Name") or app["Id"],
+                             category or app.get("Category") or "Other",
+                             app.get("Version", ""), app.get("Source", ""), app.get("Depends", ()))
+        self._by_id[key] = entry
+        self._by_category.setdefault(entry.category, []).append(entry)
+        self._by_name[normalize_name(entry.name)].append(entry)
+        self.index.add(entry.id, entry.name, entry.id)
+        return entry
+
+    def add_many(self, apps, category=None):
+        """Add rows in order; returns the entries that were new"""
+        added = []
+        for app in apps:
+            entry = self.add(app, category)
+            if entry is not None:
+                added.append(entry)
+        return added
+
+    def search(self, query):
+        """Entries whose name or Id matches the filter text (see SearchIndex.filter)"""
+        return [self.get(app_id) for app_id in self.index.filter(query)]
+
+    def dependencies(self):
+        """lower-cased id -> ids it needs, for the entries that declare any (see dependency_order)"""
+        return {key: list(entry.depends) for key, entry in self._by_id.items() if entry.depends}
+
+# --------------------------
+# Installed inventory cache
+# --------------------------
+def write_json_atomic(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+class InventoryCache:
+    """
+    Last known `winget list` result with its timestamp, persisted to disk so the
+    installed list can be shown immediately at startup and revalidated later.
+    """
+    def __init__(self, path=None, ttl=INVENTORY_TTL):
+        self.path = path or os.path.join(DATA_DIR, "installed.json")
+        self.ttl = ttl
+        self.items = []
+        self.timestamp = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def stale(self):
+        return time.time() - self.timestamp > self.ttl
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self.items = list(data["items"])
+            self.timestamp = float(data["timestamp"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save(self):
+        try:
+            write_json_atomic(self.path, {"timestamp": self.timestamp, "items": self.items})
+        except OSError:
+            pass
+
+    def refresh(self, cancel=None):
+        """Re-run `winget list`; keeps the previous items if winget returns nothing or is cancelled"""
+        items = winget_list_installed(cancel)
+        with self._lock:
+            if items:
+                self.items = items
+                self.timestamp = time.time()
+                self.save()
+            return self.items
+
+    def get(self, force=False, cancel=None):
+        if force or self.stale:
+            return self.refresh(cancel)
+        return self.items
+
+    def invalidate(self):
+        self.timestamp = 0.0
+
+    def patch(self, app_ids, rows):
+        """Replace the entries of app_ids with rows (theirs from a fresh listing); the others stay as they were"""
+        wanted = {app_id.lower() for app_id in app_ids}
+        with self._lock:
+            self.items = [it for it in self.items if it["Id"].lower() not in wanted] + list(rows)
+            self.save()
+            return self.items
+
+    def snapshot(self):
+        """Inventory in the winget_installed_snapshot format, or None when stale"""
+        if self.stale or not self.items:
+            return None
+        return {it["Id"].lower(): it for it in self.items}
+
+class UpgradeCache(InventoryCache):
+    """Last `winget upgrade` listing, cached and persisted like the inventory"""
+    def __init__(self, path=None, ttl=UPGRADES_TTL):
+        super().__init__(path or os.path.join(DATA_DIR, "upgrades.json"), ttl)
+
+    def refresh(self, cancel=None):
+        # unlike `winget list`, an empty listing is a real answer: everything is current
+        items = winget_list_upgrades(cancel)
+        with self._lock:
+            if items is not None:
+                self.items = items
+                self.timestamp = time.time()
+                self.save()
+            return self.items
+
+    def available(self):
+        """lower-cased Id -> newer version, whether or not the listing is stale"""
+        return {it["Id"].lower(): it["Available"] for it in self.items}
+
+
+class SearchCache:
+    """
+    Size-bounded LRU of winget search results with a per-entry TTL, persisted to disk.
+    Keys are (normalized query, source). hits / misses are counted for tuning.
+    """
+    def __init__(self, path=None, max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL):
+        self.path = path or os.path.join(DATA_DIR, "search_cache.json")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (timestamp, items), least recently used first
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def key(query, source=None):
+        return " ".join(query.lower().split()), (source or "").lower()
+
+    def get(self, query, source=None):
+        key = self.key(query, source)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query, items, source=None):
+        with self._lock:
+            key = self.key(query, source)
+            self._entries[key] = (time.time(), list(items))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self.save()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                rows = json.load(fh)
+            now = time.time()
+            for query, source, timestamp, items in rows[-self.max_entries:]:
+                if now - timestamp <= self.ttl:
+                    self._entries[(query, source)] = (timestamp, items)
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def save(self):
+        with self._lock:
+            rows = [[q, src, ts, items] for (q, src), (ts, items) in self._entries.items()]
+        try:
+            write_json_atomic(self.path, rows)
+        except OSError:
+            pass
+
+# --------------------------
+# Offline package index
+# --------------------------
+def _version_key(version: str):
+    """Sort key for dotted versions: "1.10.2" > "1.9", numbers before labels"""
+    return [(int(p), "") if p.isdigit() else (-1, p) for p in re.split(r"[.\-+_ ]", version)]
+
+def _id_words(app_id: str) -> str:
+    """"Microsoft.VisualStudioCode" -> "Microsoft Visual Studio Code", so word searches find Ids"""
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|[.\-_]", " ", app_id)
+
+def read_manifest(path: str):
+    """Top-level `Key: value` pairs of a manifest, with `- item` lists (e.g. Tags) as lists"""
+    fields, key = {}, None
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        for ln in fh:
+            if not ln.strip() or ln.lstrip().startswith("#"):
+                continue
+            if ln[0] not in " -":
+                key, _, value = ln.partition(":")
+                key, value = key.strip(), value.strip().strip("'\"")
+                if key not in fields:
+                    fields[key] = value if value else []
+                else:
+                    key = None  # a repeated key (e.g. per-installer) keeps its first value
+            elif key and isinstance(fields.get(key), list) and ln.lstrip().startswith("- "):
+                fields[key].append(ln.lstrip()[2:].strip().strip("'\""))
+    return fields
+
+
+class PackageIndex:
+    """
+    Local SQLite copy of the package catalog with an FTS5 table, so searches are answered
+    in milliseconds and without the winget source. refresh() re-reads only the manifest
+    directories (or export file) that changed since the previous refresh.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS packages (
+            id TEXT PRIMARY KEY COLLATE NOCASE, name TEXT, publisher TEXT, version TEXT,
+            tags TEXT, moniker TEXT, words TEXT);
+        CREATE VIRTUAL TABLE IF NOT EXISTS packages_fts USING fts5(
+            id, name, publisher, tags, moniker, words,
+            content='packages', content_rowid='rowid', prefix='2 3');
+        CREATE TRIGGER IF NOT EXISTS packages_ai AFTER INSERT ON packages BEGIN
+            INSERT INTO packages_fts(rowid, id, name, publisher, tags, moniker, words)
+            VALUES (new.rowid, new.id, new.name, new.publisher, new.tags, new.moniker, new.words);
+        END;
+        CREATE TRIGGER IF NOT EXISTS packages_ad AFTER DELETE ON packages BEGIN
+            INSERT INTO packages_fts(packages_fts, rowid, id, name, publisher, tags, moniker, words)
+            VALUES ('delete', old.rowid, old.id, old.name, old.publisher, old.tags, old.moniker, old.words);
+        END;
+        CREATE TRIGGER IF NOT EXISTS packages_au AFTER UPDATE ON packages BEGIN
+            INSERT INTO packages_fts(packages_fts, rowid, id, name, publisher, tags, moniker, words)
+            VALUES ('delete', old.rowid, old.id, old.name, old.publisher, old.tags, old.moniker, old.words);
+            INSERT INTO packages_fts(rowid, id, name, publisher, tags, moniker, words)
+            VALUES (new.rowid, new.id, new.name, new.publisher, new.tags, new.moniker, new.words);
+        END;
+        -- one row per manifest directory (one package version), for incremental refresh
+        CREATE TABLE IF NOT EXISTS manifests (
+            dir TEXT PRIMARY KEY, mtime REAL, id TEXT COLLATE NOCASE, version TEXT, record TEXT);
+        CREATE INDEX IF NOT EXISTS manifests_id ON manifests(id);
+    """
+    FIELDS = ("id", "name", "publisher", "version", "tags", "moniker")
+    # bm25 column weights, in packages_fts column order
+    WEIGHTS = (8.0, 10.0, 2.0, 1.0, 8.0, 4.0)
+
+    def __init__(self, path=None, source=PACKAGE_SOURCE, ttl=PACKAGE_INDEX_TTL):
+        self.path = path or os.path.join(DATA_DIR, "packages.db")
+        self.source = source
+        self.ttl = ttl
+        self.built_at = 0.0
+        self.count = 0
+        self.error = None
+        self._lock = threading.Lock()  # one refresh at a time
+        self.stop = threading.Event()  # set to abandon a running refresh (rolled back)
+        if os.path.exists(self.path):
+            try:
+                with self._connect() as con:
+                    self._load_meta(con)
+            except sqlite3.Error as e:
+                self.error = str(e)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # a connection per call: the index is used from the GUI thread and refreshed from a worker.
+        # Committed (or rolled back) and closed on exit; an open one keeps the file locked on Windows.
+        con = sqlite3.connect(self.path)
+        try:
+            con.executescript(self.SCHEMA)
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _load_meta(self, con):
+        row = con.execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+        self.built_at = float(row[0]) if row else 0.0
+        self.count = con.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+
+    @property
+    def stale(self):
+        return time.time() - self.built_at > self.ttl
+
+    @property
+    def fresh(self):
+        """True when searches can be answered from the index"""
+        return not self.error and self.count > 0 and not self.stale
+
+    def refresh(self):
+        """Bring the index up to date with the source; returns (upserted, removed) package counts"""
+        if not self.source:
+            return 0, 0
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with self._connect() as con:
+                    if os.path.isdir(self.source):
+                        counts = self._refresh_manifests(con, self.source)
+                    else:
+                        counts = self._refresh_export(con, self.source)
+                    con.execute("INSERT OR REPLACE INTO meta VALUES ('built_at', ?)", (str(time.time()),))
+                    self._load_meta(con)
+                self.error = None
+                return counts
+            except InterruptedError:
+                return 0, 0
+            except (OSError, ValueError, sqlite3.Error) as e:
+                self.error = str(e)
+                return 0, 0
+
+    def _refresh_manifests(self, con, root):
+        known = dict(con.execute("SELECT dir, mtime FROM manifests"))
+        touched = set()
+        seen = set()
+        for dirpath, _, files in os.walk(root):
+            if self.stop.is_set():
+                raise InterruptedError
+            yamls = [os.path.join(dirpath, f) for f in files if f.endswith((".yaml", ".yml"))]
+            if not yamls:
+                continue
+            seen.add(dirpath)
+            mtime = max(os.path.getmtime(f) for f in yamls)
+            if known.get(dirpath) == mtime:
+                continue
+            # multi-file manifests split version, installer and locale fields across files
+            fields = {}
+            for f in sorted(yamls):
+                for key, value in read_manifest(f).items():
+                    fields.setdefault(key, value)
+            app_id = fields.get("PackageIdentifier")
+            if not app_id or isinstance(app_id, list):
+                continue
+            record = self._record(app_id, fields.get("PackageName"), fields.get("Publisher"),
+                                  fields.get("PackageVersion"), fields.get("Tags"), fields.get("Moniker"))
+            old = con.execute("SELECT id FROM manifests WHERE dir = ?", (dirpath,)).fetchone()
+            if old:
+                touched.add(old[0].lower())
+            con.execute("INSERT OR REPLACE INTO manifests VALUES (?, ?, ?, ?, ?)",
+                        (dirpath, mtime, app_id, record["version"], json.dumps(record)))
+            touched.add(app_id.lower())
+        for dirpath in set(known) - seen:
+            touched.update(r[0].lower() for r in con.execute("SELECT id FROM manifests WHERE dir = ?", (dirpath,)))
+            con.execute("DELETE FROM manifests WHERE dir = ?", (dirpath,))
+        upserted = removed = 0
+        for app_id in touched:
+            rows = con.execute("SELECT version, record FROM manifests WHERE id = ?", (app_id,)).fetchall()
+            if rows:
+                self._upsert(con, json.loads(max(rows, key=lambda r: _version_key(r[0] or ""))[1]))
+                upserted += 1
+            else:
+                removed += con.execute("DELETE FROM packages WHERE id = ?", (app_id,)).rowcount
+        return upserted, removed
+
+    def _refresh_export(self, con, path):
+        mtime = os.path.getmtime(path)
+        row = con.execute("SELECT value FROM meta WHERE key = 'export_mtime'").fetchone()
+        if row and float(row[0]) == mtime:
+            return 0, 0
+        current = {r[0].lower(): r[1:] for r in con.execute(f"SELECT {', '.join(self.FIELDS)} FROM packages")}
+        upserted = 0
+        with open(path, encoding="utf-8") as fh:
+            for ln in fh:
+                if not ln.strip():
+                    continue
+                item = json.loads(ln)
+                record = self._record(item["Id"], item.get("Name"), item.get("Publisher"),
+                                      item.get("Version"), item.get("Tags"), item.get("Moniker"))
+                old = current.pop(record["id"].lower(), None)
+                if old != tuple(record[f] for f in self.FIELDS[1:]):
+                    self._upsert(con, record)
+                    upserted += 1
+        con.executemany("DELETE FROM packages WHERE id = ?", [(k,) for k in current])
+        con.execute("INSERT OR REPLACE INTO meta VALUES ('export_mtime', ?)", (str(mtime),))
+        return upserted, len(current)
+
+    @staticmethod
+    def _record(app_id, name, publisher, version, tags, moniker):
+        if isinstance(tags, list):
+            tags = " ".join(tags)
+        return {"id": app_id, "name": name or app_id, "publisher": publisher or "",
+                "version": version or "", "tags": tags or "", "moniker": moniker or ""}
+
+    def _upsert(self, con, record):
+        con.execute("INSERT INTO packages VALUES (:id, :name, :publisher, :version, :tags, :moniker, :words) "
+                    "ON CONFLICT(id) DO UPDATE SET name = excluded.name, publisher = excluded.publisher, "
+                    "version = excluded.version, tags = excluded.tags, moniker = excluded.moniker, "
+                    "words = excluded.words",
+                    dict(record, words=f"{_id_words(record['id'])} {_id_words(record['name'])}"))
+
+    def search(self, query, limit=PACKAGE_INDEX_LIMIT):
+        """Best matches first, as winget search rows; every word of the query must prefix-match"""
+        terms = re.findall(r"\w+", query)
+        if not terms or self.error:
+            return []
+        match = " ".join('"%s"*' % t for t in terms)
+        weights = ", ".join(map(str, self.WEIGHTS))
+        try:
+            with self._connect() as con:
+                rows = con.execute(
+                    f"SELECT p.name, p.id, p.version FROM packages_fts JOIN packages p ON p.rowid = packages_fts.rowid "
+                    f"WHERE packages_fts MATCH ? "
+                    f"ORDER BY p.id = ? DESC, lower(p.name) = ? DESC, bm25(packages_fts, {weights}) LIMIT ?",
+                    (match, query.strip(), query.strip().lower(), limit)).fetchall()
+        except sqlite3.Error:
+            return []
+        return [{"Name": name, "Id": app_id, "Version": version, "Source": "index", "Category": "Winget"}
+                for name, app_id, version in rows]
+
+# --------------------------
+# Installer cache
+# --------------------------
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _safe_name(text: str) -> str:
+    return re.sub(r'[^\w.+-]', '_', text)
+
+class InstallerCache:
+    """
+    Downloaded installers keyed by package id, version and installer hash, in a directory
+    that several machines can share:
+        objects/<sha256>/                 the files of one `winget download` (installer + manifest)
+        entries/<id>/<version>.json       {"id", "version", "sha256", "installer", "size", "stored"}
+    An object is stored once however many ids / versions point at it, and its hash is checked
+    against the manifest's InstallerSha256 when stored and again before every use. An entry's
+    mtime is its last use; evict() drops the least recently used ones beyond max_bytes.
+    Writes go through temporary names and renames, so a half-copied installer is never used.
+    """
+    def __init__(self, root=INSTALLER_CACHE_DIR, max_bytes=INSTALLER_CACHE_BYTES, ttl=INSTALLER_CACHE_TTL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _entries_dir(self, app_id):
+        return os.path.join(self.root, "entries", _safe_name(app_id.lower()))
+
+    def _object_dir(self, sha256):
+        return os.path.join(self.root, "objects", sha256)
+
+    def _entries(self, app_id=None):
+        """(path, entry) of one package, or of every package"""
+        dirs = [self._entries_dir(app_id)] if app_id else [
+            os.path.join(self.root, "entries", name) for name in self._listdir(os.path.join(self.root, "entries"))]
+        for directory in dirs:
+            for name in self._listdir(directory):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    with open(path, encoding="utf-8") as fh:
+                        yield path, json.load(fh)
+                except (OSError, ValueError):
+                    continue
+
+    @staticmethod
+    def _listdir(path):
+        try:
+            return os.listdir(path)
+        except OSError:
+            return []
+
+    def lookup(self, app_id, version=None):
+        """Entry for app_id at version; without a version the newest one stored within ttl. None if absent"""
+        found = None
+        for _, entry in self._entries(app_id):
+            if version:
+                if entry.get("version") == version:
+                    return entry
+            elif time.time() - entry.get("stored", 0) < self.ttl and (
+                    found is None or entry.get("stored", 0) > found.get("stored", 0)):
+                found = entry
+        return found
+
+    def fetch(self, app_id, version=None):
+        """
+        Directory holding the cached installer of app_id (for winget_install_or_update), or
+        None. The installer is hashed first; one that does not match is dropped.
+        """
+        entry = self.lookup(app_id, version)
+        if entry is None:
+            return None
+        directory = self._object_dir(entry["sha256"])
+        installer = os.path.join(directory, entry["installer"])
+        try:
+            ok = file_sha256(installer) == entry["sha256"]
+        except OSError:
+            ok = False
+        entry_path = os.path.join(self._entries_dir(app_id), f"{_safe_name(entry['version'])}.json")
+        if not ok:
+            self._remove(entry_path)
+            shutil.rmtree(directory, ignore_errors=True)
+            return None
+        try:
+            os.utime(entry_path)  # last use, for LRU eviction
+        except OSError:
+            pass
+        return directory
+
+    def store(self, app_id, download_dir, version=None):
+        """
+        Copy a `winget download` directory into the cache. Returns the entry, or None when
+        there is no installer; ValueError when its hash differs from the manifest's InstallerSha256.
+        """
+        installer, fields = find_downloaded_installer(download_dir)
+        if not installer:
+            return None
+        sha256 = file_sha256(installer)
+        if fields is None:
+            raise ValueError(f"installer hash {sha256} does not match any of the manifest's installers")
+        expected = (fields.get("InstallerSha256") or "").lower()
+        if expected and expected != sha256:
+            raise ValueError(f"installer hash {sha256} does not match the manifest's {expected}")
+        target = self._object_dir(sha256)
+        if not os.path.isdir(target):
+            tmp = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+            shutil.copytree(download_dir, tmp)
+            try:
+                os.rename(tmp, target)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)  # another writer stored the same installer first
+        version = version or fields.get("PackageVersion") or "unknown"
+        entry = {"id": app_id, "version": version, "sha256": sha256, "installer": os.path.basename(installer),
+                 "size": sum(os.path.getsize(os.path.join(target, f)) for f in self._listdir(target)),
+                 "stored": time.time()}
+        write_json_atomic(os.path.join(self._entries_dir(app_id), f"{_safe_name(version)}.json"), entry)
+        self.evict()
+        return entry
+
+    def size(self):
+        """Bytes of all stored objects"""
+        sizes = {}
+        for _, entry in self._entries():
+            sizes[entry.get("sha256")] = entry.get("size", 0)
+        return sum(sizes.values())
+
+    def evict(self):
+        """Drop least recently used entries until the objects fit max_bytes, then unreferenced objects"""
+        with self._lock:
+            entries = []
+            for path, entry in self._entries():
+                try:
+                    entries.append((os.path.getmtime(path), path, entry))
+                except OSError:
+                    continue
+            entries.sort(key=lambda e: e[0])
+            users = Counter(entry.get("sha256") for _, _, entry in entries)
+            sizes = {entry.get("sha256"): entry.get("size", 0) for _, _, entry in entries}
+            total = sum(sizes.values())
+            for _, path, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                sha256 = entry.get("sha256")
+                users[sha256] -= 1
+                if not users[sha256]:
+                    total -= sizes[sha256]
+            for name in self._listdir(os.path.join(self.root, "objects")):
+                if ".tmp-" not in name and not users.get(name):
+                    shutil.rmtree(self._object_dir(name), ignore_errors=True)
+            for name in self._listdir(os.path.join(self.root, "entries")):
+                try:
+                    os.rmdir(os.path.join(self.root, "entries", name))  # only succeeds once empty
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def prefetch_installers(cache, packages, max_workers=DOWNLOAD_WORKERS, report=None, cancel=None):
+    """
+    Download [(app id, version or None)] into cache without installing, in parallel.
+    Returns {app id: "cached" (already there) / "downloaded" / "failed"}.
+    """
+    report = report or (lambda message, percent: None)
+    results = {}
+    done = 0
+
+    def fetch(app_id, version):
+        if cache.lookup(app_id, version) is not None:
+            return "cached"
+        with tempfile.TemporaryDirectory(prefix="pam-prefetch-") as tmp:
+            target = os.path.join(tmp, _safe_name(app_id))
+            res = run_with_retry(lambda: winget_download(app_id, target, version=version, cancel=cancel),
+                                 cancel=cancel)
+            if res.returncode != 0:
+                return "failed"
+            return "downloaded" if cache.store(app_id, target, version) else "failed"
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="pam-prefetch") as pool:
+        futures = {pool.submit(fetch, app_id, version): app_id for app_id, version in packages}
+        for fut in as_completed(futures):
+            app_id = futures[fut]
+            try:
+                results[app_id] = fut.result()
+            except (OSError, ValueError) as e:
+                results[app_id] = "failed"
+                report(f"Prefetch error for {app_id}: {e}", 0)
+            done += 1
+            report(f"{app_id}: {results[app_id]}", int(done / len(futures) * 100))
+    return results
+
+# --------------------------
+# Desired state
+# --------------------------
+def read_profile(path: str, depends=None):
+    """
+    Packages wanted on the machine and packages that must be absent, from a profile / manifest:
+    JSON {"packages": [...], "absent": [...]} (or just the packages list), where a package is an
+    Id or {"id": ..., "version": ..., "depends": [ids]}; or text with one "Id" / "Id==version" /
+    "!Id" (absent) per line and "#" comments. Returns ([(app_id, version or None)], [app_id]);
+    a depends dict, when given, gets the declared dependencies (lower-cased id -> ids).
+    """
+    with open(path, encoding="utf-8-sig") as fh:
+        text = fh.read()
+    packages, absent = [], []
+    if text.lstrip().startswith(("[", "{")):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            absent = [str(a) for a in data.get("absent", [])]
+            data = data["packages"]
+        for item in data:
+            if isinstance(item, str):
+                packages.append((item, None))
+            else:
+                packages.append((item["id"], item.get("version") or None))
+                if depends is not None and item.get("depends"):
+                    depends[item["id"].lower()] = [str(d) for d in item["depends"]]
+        return packages, absent
+    for ln in text.splitlines():
+        ln = ln.split("#", 1)[0].strip()
+        if ln.startswith("!"):
+            absent.append(ln[1:].strip())
+        elif ln:
+            app_id, _, version = ln.partition("==")
+            packages.append((app_id.strip(), version.strip() or None))
+    return packages, absent
+
+def write_profile(path: str, packages, absent=()):
+    """Save [(app_id, version or None)] (and absent ids) in the JSON format read_profile reads"""
+    items = [{"id": app_id, "version": version} if version else app_id for app_id, version in packages]
+    data = {"packages": items}
+    if absent:
+        data["absent"] = list(absent)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+
+
+class DeploymentPlan:
+    """The changes that bring the machine to a desired state; packages already there are not touched"""
+    def __init__(self):
+        self.install = []     # app ids, in desired order
+        self.upgrade = []
+        self.remove = []
+        self.unchanged = []
+        self.versions = {}    # app id -> pinned version
+        self.current = {}     # app id -> installed version
+        self.target = {}      # app id -> version an install / upgrade goes to, when known
+        self.depends = {}     # app id -> ids it needs installed first (see dependency_order)
+        self.needed_by = {}   # app id added as a prerequisite -> the ids that need it
+
+    def __bool__(self):
+        return bool(self.install or self.upgrade or self.remove)
+
+    def actions(self):
+        """app id -> "install" / "upgrade", as BatchScheduler(plan=...) takes it"""
+        return dict([(a, "install") for a in self.install] + [(a, "upgrade") for a in self.upgrade])
+
+    def describe(self):
+        lines = []
+        for app_id in self.install:
+            needed = f"  (needed by {', '.join(self.needed_by[app_id])})" if app_id in self.needed_by else ""
+            lines.append(f"install  {app_id} {self.target.get(app_id, '')}".rstrip() + needed)
+        for app_id in self.upgrade:
+            lines.append(f"upgrade  {app_id} {self.current.get(app_id, '?')} -> {self.target.get(app_id, 'latest')}")
+        for app_id in self.remove:
+            lines.append(f"remove   {app_id} {self.current.get(app_id, '')}".rstrip())
+        return lines
+
+    def summary(self):
+        return (f"{len(self.install)} to install, {len(self.upgrade)} to upgrade, "
+                f"{len(self.remove)} to remove, {len(self.unchanged)} already up to date")
+
+    def to_dict(self):
+        return {"install": self.install, "upgrade": self.upgrade, "remove": self.remove,
+                "unchanged": self.unchanged, "versions": self.versions, "depends": self.depends}
+
+
+def dependency_order(app_ids, depends):
+    """
+    app_ids and every package they need, directly or not, each after its prerequisites:
+    a topological order of the dependency DAG that otherwise keeps the given order. depends
+    maps a lower-cased id to the ids it needs. Raises ValueError on a dependency cycle.
+    """
+    order, done, path = [], set(), []
+
+    def visit(app_id):
+        key = app_id.lower()
+        if key in done:
+            return
+        if any(p.lower() == key for p in path):
+            cycle = path[[p.lower() for p in path].index(key):] + [app_id]
+            raise ValueError(f"dependency cycle: {' -> '.join(cycle)}")
+        path.append(app_id)
+        for dep in depends.get(key, ()):
+            visit(dep)
+        path.pop()
+        done.add(key)
+        order.append(app_id)
+
+    for app_id in app_ids:
+        visit(app_id)
+    return order
+
+
+def plan_desired_state(packages, snapshot, upgrades, absent=(), depends=None):
+    """
+    Compare the desired state with one inventory snapshot and one `winget upgrade` listing
+    (see winget_installed_snapshot / winget_upgrade_listing). packages is [(app_id, version
+    or None)]: unpinned packages are upgraded only when winget lists a newer version, pinned
+    ones whenever another version is installed. absent ids are removed if installed.
+    With depends (lower-cased id -> ids it needs) missing prerequisites are planned too, and
+    everything comes in dependency order; prerequisites the profile wants absent are not added.
+    """
+    plan = DeploymentPlan()
+    if depends:
+        unwanted = {app_id.lower() for app_id in absent}
+        depends = {key: [d for d in deps if d.lower() not in unwanted] for key, deps in depends.items()}
+        versions = {app_id.lower(): version for app_id, version in packages}
+        requested = set(versions)
+        packages = [(app_id, versions.get(app_id.lower()))
+                    for app_id in dependency_order([app_id for app_id, _ in packages], depends)]
+        for app_id, _ in packages:
+            needs = depends.get(app_id.lower())
+            if needs:
+                plan.depends[app_id] = list(needs)
+                for dep in needs:
+                    if dep.lower() not in requested:
+                        plan.needed_by.setdefault(dep, []).append(app_id)
+    seen = set()
+    for app_id, version in packages:
+        key = app_id.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        row = snapshot.get(key)
+        if version:
+            plan.versions[app_id] = version
+            plan.target[app_id] = version
+        if row is None:
+            plan.install.append(app_id)
+            continue
+        plan.current[app_id] = row.get("Version", "")
+        newer = (upgrades.get(key) or {}).get("Available") or row.get("Available")
+        if version:
+            changed = row.get("Version") != version
+        else:
+            changed = bool(newer)
+            if newer:
+                plan.target[app_id] = newer
+        (plan.upgrade if changed else plan.unchanged).append(app_id)
+    for app_id in absent:
+        key = app_id.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        row = snapshot.get(key)
+        if row is not None:
+            plan.current[app_id] = row.get("Version", "")
+            plan.remove.append(app_id)
+        else:
+            plan.unchanged.append(app_id)
+    return plan
+
+# --------------------------
+# Progress log
+# --------------------------
+class RotatingLog:
+    """
+    Timestamped progress log on logging.handlers.RotatingFileHandler: it rolls over to
+    path.1 ... path.<backups> at max_bytes, so the full history of batches stays on disk and
+    not in memory. Each write() is one record (one write and flush) however many lines it has.
+    A log that cannot be written is turned off rather than failing the caller.
+    """
+    def __init__(self, path, max_bytes=PROGRESS_LOG_BYTES, backups=PROGRESS_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.enabled = True
+        self._handler = None
+
+    def write(self, lines):
+        if not self.enabled or not lines:
+            return
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        record = logging.LogRecord("pam.progress", logging.INFO, self.path, 0,
+                                   "\n".join(f"{stamp} {ln}" for ln in lines), None, None)
+        if self._handler is None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._handler = logging.handlers.RotatingFileHandler(
+                    self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8", delay=True)
+            except OSError:
+                self.enabled = False
+                return
+            self._handler.handleError = self._failed
+        self._handler.handle(record)
+
+    def _failed(self, record):
+        self.enabled = False
+
+    def close(self):
+        handler, self._handler = self._handler, None
+        if handler is not None:
+            handler.close()
+
+# --------------------------
+# Batch scheduler
+# --------------------------
+# queue priorities, lower runs first: removals, then what the user picked, then bulk upgrades / profiles
+PRIORITY_UNINSTALL = 0
+PRIORITY_USER = 1
+PRIORITY_BULK = 2
+# progress log label of each queued action
+ACTION_LABELS = {"install": "Installing/Updating", "uninstall": "Uninstalling"}
+
+class QueuedTask:
+    __slots__ = ("app_id", "action", "priority", "seq")
+
+    def __init__(self, app_id, action, priority, seq):
+        self.app_id = app_id
+        self.action = action      # "install" / "uninstall"
+        self.priority = priority
+        self.seq = seq            # arrival order within a priority
+
+    def __repr__(self):
+        return f"QueuedTask({self.app_id!r}, {self.action!r}, priority={self.priority})"
+
+
+class TaskQueue:
+    """
+    Pending package operations ordered by (priority, arrival), at most one per app id:
+    queuing an id again coalesces with its pending entry, keeping the higher priority
+    while the later action wins. A heap with lazy deletion, so push and pop are O(log n).
+    Not thread-safe; BatchScheduler holds its lock around it.
+    """
+    def __init__(self):
+        self._heap = []      # (priority, seq, key); stale when the entry's key has changed
+        self._tasks = {}     # lower-cased app id -> QueuedTask
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __contains__(self, app_id):
+        return app_id.lower() in self._tasks
+
+    def get(self, app_id):
+        return self._tasks.get(app_id.lower())
+
+    def push(self, app_id, action, priority):
+        """Queue or coalesce; returns the previous pending task for app_id, or None"""
+        key = app_id.lower()
+        previous = self._tasks.get(key)
+        if previous is not None and previous.priority <= priority:
+            self._tasks[key] = QueuedTask(app_id, action, previous.priority, previous.seq)
+            return previous  # same heap position, nothing to push
+        self._seq += 1
+        task = self._tasks[key] = QueuedTask(app_id, action, priority, self._seq)
+        heapq.heappush(self._heap, (task.priority, task.seq, key))
+        return previous
+
+    def _valid(self, item):
+        task = self._tasks.get(item[2])
+        return task is not None and (task.priority, task.seq) == item[:2]
+
+    def pop(self, ready=None):
+        """Remove and return the first task (the first for which ready(task) is true), or None"""
+        skipped = []
+        found = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if not self._valid(item):
+                continue
+            task = self._tasks[item[2]]
+            if ready is None or ready(task):
+                del self._tasks[item[2]]
+                found = task
+                break
+            skipped.append(item)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return found
+
+    def remove(self, app_id):
+        """Drop app_id's pending task; returns it, or None"""
+        return self._tasks.pop(app_id.lower(), None)
+
+    def tasks(self):
+        """Pending tasks in the order they will run (when ready)"""
+        return sorted(self._tasks.values(), key=lambda t: (t.priority, t.seq))
+
+    def move(self, app_id, offset):
+        """Swap app_id's place with the task offset positions later (negative: earlier); False if out of range"""
+        order = self.tasks()
+        keys = [t.app_id.lower() for t in order]
+        key = app_id.lower()
+        if key not in self._tasks:
+            return False
+        i = keys.index(key)
+        j = i + offset
+        if offset == 0 or not 0 <= j < len(order):
+            return False
+        a, b = order[i], order[j]
+        self._tasks[keys[i]] = QueuedTask(a.app_id, a.action, b.priority, b.seq)
+        self._tasks[keys[j]] = QueuedTask(b.app_id, b.action, a.priority, a.seq)
+        heapq.heappush(self._heap, (b.priority, b.seq, keys[i]))
+        heapq.heappush(self._heap, (a.priority, a.seq, keys[j]))
+        return True
+
+
+class BatchScheduler:
+    """
+    Works through a queue of package operations:
+    - downloads are network bound and run on a pool of max_workers threads, starting as soon
+      as an install is queued
+    - installers (and uninstallers) run one at a time, as Windows Installer requires, taking
+      the highest-priority queued task whose download is done
+    More work can be queued with add() while it runs; an id already pending is coalesced
+    rather than run twice, and one already done in this run is not repeated. run() returns
+    once the queue is empty.
+    report(message, percent) is called from the scheduler threads for log messages;
+    progress(app_id, package_percent, total_percent) gets the streamed progress of the
+    running step, at most every PROGRESS_INTERVAL seconds per package; queue_changed()
+    after every change to the pending tasks.
+    snapshot is an installed inventory (see winget_installed_snapshot); when omitted
+    one is taken at the start of the batch instead of querying winget per package. The
+    batch updates it as it installs and uninstalls, so work queued later sees those changes.
+    versions optionally pins app ids to an exact version. plan (app id -> "install" /
+    "upgrade", e.g. DeploymentPlan.actions()) replaces the snapshot classification.
+    cancel() stops the batch at once: running downloads and the installer are killed
+    with their process trees. Transient failures are retried (see run_with_retry).
+    With an InstallerCache, cached installers are installed without downloading and
+    fresh downloads are added to it.
+    depends (app id -> ids it needs, e.g. DeploymentPlan.depends) makes the batch a DAG:
+    every download still starts at once, but an installer only runs after the prerequisites
+    queued in the same batch are done, and a package whose prerequisite failed is not
+    attempted ("blocked"), nor is anything that needs it in turn.
+    """
+    def __init__(self, tasks, action_label, max_workers=DOWNLOAD_WORKERS, report=None, snapshot=None,
+                 progress=None, versions=None, plan=None, priority=None, queue_changed=None, cache=None,
+                 depends=None):
+        self.action_label = action_label
+        self.cache = cache     # InstallerCache downloads are taken from and stored in
+        self.max_workers = max(1, max_workers)
+        self.report = report or (lambda message, percent: None)
+        self.progress = progress or (lambda app_id, package_percent, total_percent: None)
+        self.queue_changed = queue_changed or (lambda: None)
+        self.snapshot = snapshot
+        self.tasks = []        # every app id queued so far, in order
+        self.versions = {}
+        self.plan = {}         # app id -> "install" / "upgrade" / "skip"
+        self.results = {}      # app id -> "done" / "failed" / "error" / "skipped" / "cancelled" / "blocked"
+        # app id -> {"download_s", "install_s" (or "uninstall_s"), "exit_code", "error", "retries"}, as far as it got
+        self.details = {}
+        self.depends = {}      # lower-cased app id -> ids that must be done before its installer runs
+        self._ids = {}         # lower-cased app id -> the app id as queued
+        self.queue = TaskQueue()
+        self._cancelled = threading.Event()
+        self._lock = threading.Condition()
+        self._closed = False   # run() has drained the queue; add() is refused from then on
+        self._pool = None
+        self._work_dir = None
+        self._downloads = {}   # app id -> Future of its download
+        self._running = None   # task on the installer lane
+        self._last_action = {} # app id -> action it last ran with
+        self._unclassified = []
+        self._started = False  # run() has classified the first tasks; add() classifies by itself from then on
+        self._steps_done = 0
+        self._steps_left = {}  # app id -> steps still to go (download + install, or uninstall)
+        self._partial = {}     # app id -> fraction of its running step
+        self._last_emit = {}   # app id -> monotonic time of its last progress update
+        action = "uninstall" if action_label == ACTION_LABELS["uninstall"] else "install"
+        self.add(tasks, action, priority, versions, plan, depends)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            self._lock.notify_all()
+
+    # ---- queue ----
+    def add(self, tasks, action="install", priority=None, versions=None, plan=None, depends=None):
+        """
+        Queue app ids, also while running. Returns the ids queued (new or coalesced with a
+        pending task), or None once the batch has finished and takes no more work.
+        """
+        if priority is None:
+            priority = PRIORITY_UNINSTALL if action == "uninstall" else PRIORITY_USER
+        queued = []
+        with self._lock:
+            if self._closed:
+                return None
+            for app_id, needs in (depends or {}).items():
+                self.depends[app_id.lower()] = list(needs)
+            for app_id in dict.fromkeys(tasks):
+                if versions and versions.get(app_id):
+                    self.versions[app_id] = versions[app_id]
+                duplicate = self._duplicate(app_id, action)
+                if duplicate:
+                    self.report(f"{app_id} is {duplicate}, not queued again", self._percent())
+                    continue
+                if app_id not in self.details:
+                    self.tasks.append(app_id)
+                    self.details[app_id] = {}
+                    self._ids.setdefault(app_id.lower(), app_id)
+                if action == "install":
+                    self.plan.pop(app_id, None)
+                    if self._uninstalling(app_id):
+                        self.plan[app_id] = "install"  # gone by the time the installer lane gets to it
+                    elif plan is not None and app_id in plan:
+                        self.plan[app_id] = plan[app_id]
+                    elif self.snapshot is not None:
+                        self.plan[app_id] = classify_package(app_id, self.snapshot, self.versions.get(app_id))
+                    elif not self._started:
+                        self._unclassified.append(app_id)  # run() classifies once it has a snapshot
+                    # else running without a snapshot: the install asks winget whether it is installed
+                    if self.plan.get(app_id) == "skip":
+                        if app_id in self.queue:
+                            # a queued uninstall: the later action wins, and the package is up to date
+                            self.queue.remove(app_id)
+                            self._steps_left.pop(app_id, None)
+                        self._skip(app_id)
+                        continue
+                self.results.pop(app_id, None)
+                previous = self.queue.push(app_id, action, priority)
+                if previous is None or previous.action != action:
+                    self._steps_left[app_id] = 2 if action == "install" else 1
+                if action == "install" and self._pool is not None and app_id not in self._unclassified:
+                    self._start_download(app_id)
+                queued.append(app_id)
+            for app_id in queued:
+                task = self.queue.get(app_id)
+                if task is not None:
+                    self._promote(app_id, task.priority)
+            self._lock.notify_all()
+        if queued:
+            self.queue_changed()
+        return queued
+
+    def _duplicate(self, app_id, action):
+        """Why queuing app_id for action would repeat work ("running" / "already done"), or None"""
+        running = self._running
+        if running is not None and running.app_id.lower() == app_id.lower() and running.action == action:
+            return "running"
+        if (app_id not in self.queue and self.results.get(app_id) == "done"
+                and self._last_action.get(app_id) == action):
+            return "already done"
+        return None
+
+    def _uninstalling(self, app_id):
+        """True while an uninstall of app_id is running on the installer lane"""
+        running = self._running
+        return running is not None and running.app_id.lower() == app_id.lower() and running.action == "uninstall"
+
+    def _promote(self, app_id, priority, seen=None):
+        """Give the queued prerequisites of app_id at least its priority, so they do not hold it back"""
+        seen = set() if seen is None else seen
+        for dep in self.depends.get(app_id.lower(), ()):
+            task = self.queue.get(dep)
+            if task is None or dep.lower() in seen:
+                continue
+            seen.add(dep.lower())
+            if task.priority > priority:
+                self.queue.push(task.app_id, task.action, priority)
+            self._promote(dep, priority, seen)
+
+    def _prerequisites(self, app_id):
+        """(prerequisites still to run, first failed prerequisite or None) among those in this batch"""
+        waiting = []
+        running = self._running
+        for dep in self.depends.get(app_id.lower(), ()):
+            queued_id = self._ids.get(dep.lower())
+            if queued_id is None:
+                continue  # not part of this batch: installed already, or not ours to install
+            if (queued_id in self.queue or queued_id in self._unclassified
+                    or (running is not None and running.app_id == queued_id)):
+                waiting.append(queued_id)
+            elif self.results.get(queued_id) not in ("done", "skipped"):
+                return waiting, queued_id
+        return waiting, None
+
+    def _block_dependents(self):
+        """Take the queued installs whose prerequisites failed off the queue; True if there were any"""
+        blocked = False
+        found = True
+        while found:  # blocking one package can block the ones that need it
+            found = False
+            for task in self.queue.tasks():
+                if task.action != "install":
+                    continue
+                _, failed = self._prerequisites(task.app_id)
+                if failed is None:
+                    continue
+                found = blocked = True
+                self.queue.remove(task.app_id)
+                future = self._downloads.pop(task.app_id, None)
+                if future is not None:
+                    future.cancel()
+                self._steps_left.pop(task.app_id, None)
+                self._partial.pop(task.app_id, None)
+                outcome = self.results.get(failed, "not installed")
+                self.results[task.app_id] = "blocked"
+                self.details[task.app_id].update(blocked_by=failed, error=f"needs {failed} ({outcome})")
+                self.report(f"Skipping {task.app_id}: it needs {failed}, which was not installed ({outcome})",
+                            self._percent())
+        return blocked
+
+    def remove(self, app_id):
+        """Drop a pending task; True if there was one"""
+        with self._lock:
+            task = self.queue.remove(app_id)
+            if task is None:
+                return False
+            self._steps_left.pop(task.app_id, None)
+            self._partial.pop(task.app_id, None)
+            self.results[task.app_id] = "removed"
+        self.report(f"Removed {task.app_id} from the queue", self._percent())
+        self.queue_changed()
+        return True
+
+    def move(self, app_id, offset):
+        """Move a pending task offset places later (negative: earlier) in the queue"""
+        with self._lock:
+            moved = self.queue.move(app_id, offset)
+        if moved:
+            self.queue_changed()
+        return moved
+
+    def pending(self):
+        """Queued tasks not started yet, in the order they will run"""
+        with self._lock:
+            return self.queue.tasks()
+
+    def waiting_for(self, app_id):
+        """Prerequisites of app_id in this batch that have not run yet"""
+        with self._lock:
+            return self._prerequisites(app_id)[0]
+
+    # ---- run ----
+    def run(self):
+        with TRACER.span("batch", "batch", action=self.action_label, packages=len(self.tasks)) as sp:
+            self._run()
+            sp.args["packages"] = len(self.tasks)
+            sp.args["outcomes"] = dict(Counter(self.results.values()))
+            sp.args["cancelled"] = self.cancelled
+        return self.results
+
+    def _run(self):
+        if self._unclassified and self.snapshot is None:
+            self.report("Reading installed packages...", 0)
+            self.snapshot = winget_installed_snapshot()
+        with self._lock:
+            classified, self._unclassified = self._unclassified, []
+            self._started = True
+            if self.snapshot is None:
+                classified = []  # queued since the check above: each install asks winget instead
+            for app_id in classified:
+                self.plan[app_id] = classify_package(app_id, self.snapshot, self.versions.get(app_id))
+                task = self.queue.get(app_id)
+                if self.plan[app_id] == "skip" and task is not None and task.action == "install":
+                    self.queue.remove(app_id)
+                    self._steps_left.pop(app_id, None)
+                    self._skip(app_id)
+        if classified:
+            self.queue_changed()
+        self._work_dir = tempfile.mkdtemp(prefix="pam-downloads-")
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pam-download") as pool:
+                with self._lock:
+                    self._pool = pool
+                    for task in self.queue.tasks():
+                        if task.action == "install":
+                            self._start_download(task.app_id)
+                self._installer_lane()
+                if self.cancelled:
+                    pool.shutdown(wait=False, cancel_futures=True)
+        finally:
+            with self._lock:
+                self._closed = True
+                self._pool = None
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+        return self.results
+
+    def _installer_lane(self):
+        """This thread runs every installer and uninstaller, one at a time"""
+        while True:
+            with self._lock:
+                task = None
+                blocked = False
+                while not self.cancelled:
+                    blocked = self._block_dependents() or blocked
+                    task = self.queue.pop(self._ready)
+                    if task is not None or not self.queue:
+                        break
+                    self._lock.wait()
+                if task is None:
+                    self._closed = True  # drained or cancelled: later add() calls start a new batch
+                else:
+                    self._running = task
+            if task is None:
+                if blocked:
+                    self.queue_changed()
+                return
+            self.queue_changed()
+            try:
+                self._execute(task)
+            finally:
+                with self._lock:
+                    self._running = None
+                    self._last_action[task.app_id] = task.action
+
+    def _ready(self, task):
+        if task.action == "uninstall":
+            return True
+        future = self._downloads.get(task.app_id)
+        return future is not None and future.done() and not self._prerequisites(task.app_id)[0]
+
+    def _start_download(self, app_id):
+        if app_id in self._downloads:  # downloading or downloaded, waiting for the installer lane
+            return
+        future = self._pool.submit(self._download, app_id, self._work_dir)
+        self._downloads[app_id] = future
+        future.add_done_callback(self._wake)
+
+    def _wake(self, _future=None):
+        with self._lock:
+            self._lock.notify_all()
+
+    def _execute(self, task):
+        app_id = task.app_id
+        label = ACTION_LABELS[task.action]
+        if task.action == "uninstall":
+            self._apply(app_id, label,
+                        lambda: winget_uninstall(app_id, self._progress_for(app_id, 0, 1.0), self._cancelled))
+            return
+        future = self._downloads.pop(app_id)
+        try:
+            installer_dir = future.result()
+        except Exception as e:
+            installer_dir = None
+            self._step(f"Download error for {app_id}: {e}", app_id)
+        plan = self.plan.get(app_id)
+        installed = None if plan is None else plan == "upgrade"
+        on_progress = self._progress_for(app_id, 0.5, 0.5)
+        version = self.versions.get(app_id)
+        self._apply(app_id, label, lambda: winget_install_or_update(app_id, installer_dir, installed, on_progress,
+                                                                    version, self._cancelled))
+
+    def _skip(self, app_id):
+        self.results[app_id] = "skipped"
+        self.report(f"{app_id} is up to date, skipping", self._percent())
+
+    def _download(self, app_id, work_dir):
+        if self.cancelled:
+            return None
+        cached = self._from_cache(app_id)
+        if cached:
+            self.details[app_id]["cached"] = True
+            self._step(f"Using cached installer for {app_id}", app_id)
+            return cached
+        self.report(f"Downloading {app_id}...", self._percent())
+        target = os.path.join(work_dir, re.sub(r'[^\w.+-]', '_', app_id))
+        started = time.monotonic()
+        res = run_with_retry(lambda: winget_download(app_id, target, self._progress_for(app_id, 0, 0.5),
+                                                     self.versions.get(app_id), self._cancelled),
+                             cancel=self._cancelled, on_retry=self._retrying(app_id, "Download"))
+        self.details[app_id]["download_s"] = round(time.monotonic() - started, 3)
+        if res.returncode == EXIT_CANCELLED:
+            return None
+        if res.returncode == 0:
+            if self.cache is not None:
+                try:
+                    self.cache.store(app_id, target, self.versions.get(app_id))
+                except ValueError as e:
+                    # winget checks the hash itself when it installs
+                    self._step(f"Not using the download of {app_id}: {e}", app_id)
+                    return None
+                except OSError as e:
+                    self.report(f"Could not cache the installer of {app_id}: {e}", self._percent())
+            self._step(f"Downloaded {app_id}", app_id)
+            return target
+        # older winget without `download`, or no downloadable installer: let install fetch it
+        self._step(f"Download skipped for {app_id}, installing through winget", app_id)
+        return None
+
+    def _from_cache(self, app_id):
+        """Cached installer directory for app_id, unless it is the version already installed"""
+        if self.cache is None:
+            return None
+        version = self.versions.get(app_id)
+        entry = self.cache.lookup(app_id, version)
+        installed = (self.snapshot or {}).get(app_id.lower(), {}).get("Version")
+        if entry is None or (not version and installed and entry.get("version") == installed):
+            return None
+        return self.cache.fetch(app_id, entry.get("version"))
+
+    def _apply(self, app_id, label, action):
+        self.report(f"{label} {app_id}...", self._percent())
+        detail = self.details[app_id]
+        key = "uninstall_s" if label == ACTION_LABELS["uninstall"] else "install_s"
+        started = time.monotonic()
+        try:
+            res = run_with_retry(action, cancel=self._cancelled, on_retry=self._retrying(app_id, label))
+            detail[key] = round(time.monotonic() - started, 3)
+            detail["exit_code"] = res.returncode
+            if res.returncode == 0:
+                self.results[app_id] = "done"
+                self._installed(app_id, label != ACTION_LABELS["uninstall"])
+                self._step(f"{label} done for {app_id}", app_id)
+            elif res.returncode == EXIT_CANCELLED:
+                self.results[app_id] = "cancelled"
+                self._step(f"{label} cancelled for {app_id}", app_id)
+            elif res.returncode == EXIT_TIMEOUT:
+                self.results[app_id] = "failed"
+                detail["error"] = res.stdout.rsplit("\n", 1)[-1]
+                self._step(f"{label} failed for {app_id}: {detail['error'].lower()}", app_id)
+            else:
+                self.results[app_id] = "failed"
+                self._step(f"{label} failed for {app_id} (exit code {res.returncode})", app_id)
+        except Exception as e:
+            detail[key] = round(time.monotonic() - started, 3)
+            detail["error"] = str(e)
+            self.results[app_id] = "error"
+            self._step(f"Error for {app_id}: {e}", app_id)
+
+    def _installed(self, app_id, present):
+        """Bring the snapshot row of app_id up to date after an install (present) or uninstall"""
+        with self._lock:
+            if self.snapshot is None:
+                return
+            key = app_id.lower()
+            if not present:
+                self.snapshot.pop(key, None)
+                return
+            row = dict(self.snapshot.get(key) or {"Id": app_id})
+            # an unknown version classifies as "upgrade", so winget decides when it is queued again
+            row["Version"] = self.versions.get(app_id) or row.pop("Available", None) or ""
+            row.pop("Available", None)
+            self.snapshot[key] = row
+
+    def _retrying(self, app_id, what):
+        """on_retry callback for run_with_retry that logs the retry and counts it in details"""
+        def on_retry(res, attempt, delay):
+            detail = self.details[app_id]
+            detail["retries"] = detail.get("retries", 0) + 1
+            self.report(f"{what} of {app_id} failed (exit code {res.returncode}), retrying in {delay:g} s "
+                        f"({attempt}/{RETRY_ATTEMPTS - 1})", self._percent())
+        return on_retry
+
+    def _progress_for(self, app_id, offset, share):
+        """
+        on_progress callback for one step of app_id. offset is how far the package
+        already is and share the part of it this step covers: installs are half
+        download, half installer.
+        """
+        def on_progress(fraction):
+            now = time.monotonic()
+            with self._lock:
+                self._partial[app_id] = fraction
+                if fraction < 1.0 and now - self._last_emit.get(app_id, 0.0) < PROGRESS_INTERVAL:
+                    return
+                self._last_emit[app_id] = now
+                total = self._percent()
+            self.progress(app_id, int((offset + share * fraction) * 100), total)
+        return on_progress
+
+    def _percent(self):
+        # the total grows as work is queued, so the bar can step back a little when it does
+        total = self._steps_done + sum(self._steps_left.values())
+        if not total:
+            return 0
+        done = self._steps_done + sum(self._partial.values())
+        return min(99, int(done / total * 100))
+
+    def _step(self, message, app_id):
+        with self._lock:
+            self._steps_done += 1
+            left = self._steps_left.get(app_id, 0) - 1
+            if left > 0:
+                self._steps_left[app_id] = left
+            else:
+                self._steps_left.pop(app_id, None)
+            self._partial.pop(app_id, None)
+            percent = self._percent()
+        self.report(message, percent)
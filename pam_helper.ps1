@@ -0,0 +1,68 @@
+# Long-lived winget helper for pam_core.HelperBackend (PAM_BACKEND=helper).
+#
+# Reads one JSON request per line on stdin and writes one JSON reply per line on stdout,
+# answering from the Microsoft.WinGet.Client module, so the package index is loaded once
+# instead of by every `winget` process. Exits when stdin is closed.
+#
+#   -> {"id": 1, "op": "search", "query": "vlc", "source": "winget"}
+#   -> {"id": 2, "op": "list"}   {"id": 3, "op": "upgrades"}   {"id": 4, "op": "is_installed", "app_id": "Git.Git"}
+#   <- {"id": 1, "rows": [{"Name": "VLC media player", "Id": "VideoLAN.VLC", "Version": "3.0.21", "Source": "winget"}]}
+#   <- {"id": 4, "installed": true}      {"id": 5, "error": "message"}
+#
+# Install the module with: Install-Module Microsoft.WinGet.Client -Scope CurrentUser
+
+$ErrorActionPreference = 'Stop'
+[Console]::InputEncoding = [Text.Encoding]::UTF8
+[Console]::OutputEncoding = [Text.Encoding]::UTF8
+# without the module the helper exits before answering and the manager stays on winget.exe
+Import-Module Microsoft.WinGet.Client
+
+function Send-Reply($reply) {
+    [Console]::Out.WriteLine(($reply | ConvertTo-Json -Compress -Depth 4))
+    [Console]::Out.Flush()
+}
+
+function ConvertTo-Row($pkg) {
+    $available = $null
+    if ($pkg.PSObject.Properties['IsUpdateAvailable'] -and $pkg.IsUpdateAvailable) {
+        $available = $pkg.AvailableVersions | Select-Object -First 1
+    }
+    $version = if ($pkg.PSObject.Properties['InstalledVersion']) { $pkg.InstalledVersion } else { $pkg.Version }
+    [ordered]@{ Name = $pkg.Name; Id = $pkg.Id; Version = $version; Available = $available; Source = $pkg.Source }
+}
+
+while ($null -ne ($line = [Console]::In.ReadLine())) {
+    if (-not $line.Trim()) { continue }
+    try {
+        $req = $line | ConvertFrom-Json
+    } catch {
+        continue
+    }
+    try {
+        switch ($req.op) {
+            'search' {
+                $params = @{ Query = $req.query }
+                if ($req.source) { $params.Source = $req.source }
+                $rows = @(Find-WinGetPackage @params | ForEach-Object { ConvertTo-Row $_ })
+                Send-Reply @{ id = $req.id; rows = $rows }
+            }
+            'list' {
+                $rows = @(Get-WinGetPackage | ForEach-Object { ConvertTo-Row $_ })
+                Send-Reply @{ id = $req.id; rows = $rows }
+            }
+            'upgrades' {
+                $rows = @(Get-WinGetPackage | Where-Object IsUpdateAvailable | ForEach-Object { ConvertTo-Row $_ })
+                Send-Reply @{ id = $req.id; rows = $rows }
+            }
+            'is_installed' {
+                $found = @(Get-WinGetPackage -Id $req.app_id -MatchOption Equals -ErrorAction SilentlyContinue)
+                Send-Reply @{ id = $req.id; installed = ($found.Count -gt 0) }
+            }
+            default {
+                Send-Reply @{ id = $req.id; error = "unknown operation $($req.op)" }
+            }
+        }
+    } catch {
+        Send-Reply @{ id = $req.id; error = $_.Exception.Message }
+    }
+}
@@ -0,0 +1,40 @@
+"""
+Shared fixtures. pam_core reads PAM_WINGET / PAM_DATA_DIR when imported, so the fake winget
+(benchmarks/fake_winget.py) and a throwaway data dir are set up before any test imports it.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fake_winget  # noqa: E402
+
+fake_winget.use_fake_winget()
+
+import pam_core  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fake_env(tmp_path, monkeypatch):
+    """No fake winget delays, its lock and flaky counters in tmp_path, and retries without the back-off wait"""
+    for name in ("DOWNLOAD_DELAY", "INSTALL_DELAY", "SEARCH_DELAY", "LIST_DELAY", "ROW_DELAY",
+                 "HELPER_START", "HELPER_DELAY"):
+        monkeypatch.setenv(f"FAKE_WINGET_{name}", "0")
+    for name in ("FLAKY", "FAIL", "SEARCH_ROWS", "LIST_ROWS"):
+        monkeypatch.delenv(f"FAKE_WINGET_{name}", raising=False)
+    monkeypatch.setenv("FAKE_WINGET_STATE", str(tmp_path / "fake-winget"))
+    monkeypatch.setattr(pam_core, "RETRY_BACKOFF", 0.01)
+    yield
+
+
+@pytest.fixture
+def fake():
+    """A FakeBackend installed as pam_core's backend for the test"""
+    backend = fake_winget.FakeBackend()
+    previous = pam_core.set_backend(backend)
+    yield backend
+    pam_core.set_backend(previous)
@@ -0,0 +1,100 @@
+"""pam_cli exit codes and reports, running the fake winget as the winget command"""
+import json
+
+import pytest
+
+import pam_cli
+import pam_core
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    # main() installs the backend chosen on its command line
+    previous = pam_core.set_backend(None)
+    yield
+    pam_core.set_backend(previous)
+
+
+def run(tmp_path, action, manifest, *args):
+    """(exit code, report) of pam_cli for a manifest given as data, or as a path when it is a str"""
+    path = manifest
+    if not isinstance(manifest, str):
+        path = str(tmp_path / "manifest.json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh)
+    report = tmp_path / "report.json"
+    code = pam_cli.main([action, path, "--quiet", "--no-cache", "--report", str(report), *args])
+    if not report.exists():
+        return code, None
+    with open(report, encoding="utf-8") as fh:
+        return code, json.load(fh)
+
+
+def outcomes(report):
+    return {row["id"]: row["outcome"] for row in report["packages"]}
+
+
+def test_install_succeeds(tmp_path):
+    code, report = run(tmp_path, "install", ["Test.One", {"id": "Test.Two", "version": "2.0"}])
+    assert code == 0
+    assert outcomes(report) == {"Test.One": "done", "Test.Two": "done"}
+    assert report["summary"] == {"done": 2}
+
+
+def test_text_manifest(tmp_path):
+    manifest = tmp_path / "packages.txt"
+    manifest.write_text("# tools\nTest.One\nTest.Two==2.0  # pinned\n\n")
+    code, report = run(tmp_path, "uninstall", str(manifest))
+    assert code == 0
+    assert [(row["id"], row["version"]) for row in report["packages"]] == [("Test.One", None), ("Test.Two", "2.0")]
+
+
+def test_failed_package_exits_1(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_FAIL", "Test.Broken")
+    code, report = run(tmp_path, "install", ["Test.One", "Test.Broken"])
+    assert code == 1
+    assert outcomes(report) == {"Test.One": "done", "Test.Broken": "failed"}
+
+
+def test_blocked_package_exits_1(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_FAIL", "Test.Runtime")
+    code, report = run(tmp_path, "install", {"packages": [{"id": "Test.App", "depends": ["Test.Runtime"]}]})
+    assert code == 1
+    assert outcomes(report) == {"Test.Runtime": "failed", "Test.App": "blocked"}
+
+
+def test_unreadable_manifest_exits_2(tmp_path, capsys):
+    assert run(tmp_path, "install", str(tmp_path / "missing.json")) == (2, None)
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json")
+    assert run(tmp_path, "install", str(bad)) == (2, None)
+    assert "Cannot read manifest" in capsys.readouterr().err
+
+
+def test_dependency_cycle_exits_2(tmp_path, capsys):
+    manifest = {"packages": [{"id": "A.A", "depends": ["B.B"]}, {"id": "B.B", "depends": ["A.A"]}]}
+    assert run(tmp_path, "install", manifest) == (2, None)
+    assert "dependency cycle" in capsys.readouterr().err
+
+
+def test_unknown_backend_exits_2(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(pam_cli, "BACKEND", "hepler")
+    assert run(tmp_path, "install", {"packages": ["Test.App"]}) == (2, None)
+    assert "Unknown backend 'hepler'" in capsys.readouterr().err
+
+
+def test_apply_dry_run_only_plans(tmp_path):
+    manifest = {"packages": ["Git.Git", "Mozilla.Firefox", "New.Package"], "absent": ["VideoLAN.VLC"]}
+    code, report = run(tmp_path, "apply", manifest, "--dry-run")
+    assert code == 0
+    assert outcomes(report) == {"Mozilla.Firefox": "skipped", "New.Package": "planned", "Git.Git": "planned",
+                                "VideoLAN.VLC": "planned"}
+    assert report["plan"]["remove"] == ["VideoLAN.VLC"]
+
+
+def test_helper_backend_gives_the_same_plan(tmp_path):
+    manifest = {"packages": ["Git.Git", "Mozilla.Firefox", "New.Package"]}
+    _, cli = run(tmp_path, "apply", manifest, "--dry-run", "--backend", "cli")
+    code, helper = run(tmp_path, "apply", manifest, "--dry-run", "--backend", "helper")
+    assert code == 0
+    assert helper["plan"] == cli["plan"]
@@ -0,0 +1,23 @@
+"""Command lines built for winget: arguments reach the program intact, whatever they contain"""
+import sys
+
+import pytest
+
+from pam_core import run_cmd, shell_quote, winget_search_cmd
+
+ECHO_ARGS = f'{shell_quote(sys.executable)} -c "import sys; print(repr(sys.argv[1:]))"'
+
+
+@pytest.mark.parametrize("arg", ["git & echo injected", "a|b", "x^y", "<in> out", "%PATH%", '"quoted" & more',
+                                 "$(echo injected)", "it's", ""])
+def test_arguments_are_passed_as_one(arg):
+    res = run_cmd(f"{ECHO_ARGS} {shell_quote(arg)}")
+    assert res.returncode == 0
+    assert res.stdout.strip() == repr([arg])
+
+
+def test_search_query_cannot_run_commands(tmp_path):
+    marker = tmp_path / "injected"
+    res = run_cmd(winget_search_cmd(f"git & echo x > {marker}"))
+    assert res.returncode == 0
+    assert not marker.exists()
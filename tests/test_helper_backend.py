@@ -0,0 +1,79 @@
+"""HelperBackend against the fake helper process, and its fallback to the winget CLI"""
+import sys
+import time
+
+import pytest
+
+import fake_winget
+from pam_core import HelperBackend, kill_process_tree
+
+
+@pytest.fixture
+def helper():
+    backends = []
+
+    def make(command=f"{fake_winget.COMMAND} helper"):
+        backends.append(HelperBackend(command))
+        return backends[-1]
+
+    yield make
+    for backend in backends:
+        backend.close()
+
+
+def installed_ids():
+    return [row["Id"] for row in fake_winget.parsed_table("list")]
+
+
+def test_listings_come_from_the_helper(helper):
+    backend = helper()
+    assert [row["Id"] for row in backend.list_installed()] == installed_ids()
+    upgrades = backend.list_upgrades()
+    assert upgrades and all(row["Available"] for row in upgrades)
+    assert backend.is_installed("Git.Git")
+    assert not backend.is_installed("Not.Installed")
+    assert [row["Id"] for row in backend.installed_rows(["git.git", "Not.Installed"])] == ["Git.Git"]
+    assert backend._answered and not backend.disabled
+
+
+def test_helper_errors_are_raised(helper):
+    backend = helper()
+    with pytest.raises(RuntimeError, match="unknown operation"):
+        backend.request("bogus")
+    # the helper stays in use after an error reply
+    assert backend.is_installed("Git.Git")
+
+
+def test_a_helper_that_never_answers_falls_back_to_the_cli(helper):
+    backend = helper(f'"{sys.executable}" -c "pass"')
+    assert [row["Id"] for row in backend.list_installed()] == installed_ids()
+    assert backend.disabled
+    # once disabled, the CLI answers without trying the helper again
+    with pytest.raises(OSError):
+        backend.request("list")
+    assert backend.is_installed("Git.Git")
+
+
+def test_a_stuck_helper_is_given_up(helper, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_HELPER_DELAY", "5")
+    backend = helper()
+    with pytest.raises(TimeoutError):
+        backend.request("list", timeout=0.3)
+    # it never answered at all, so it is not started again once its reader has seen it exit
+    assert backend._proc is None
+    deadline = time.monotonic() + 2
+    while not backend.disabled and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert backend.disabled
+    assert [row["Id"] for row in backend.list_installed()] == installed_ids()
+
+
+def test_a_helper_that_dies_is_restarted(helper):
+    backend = helper()
+    assert backend.is_installed("Git.Git")
+    first = backend._proc
+    kill_process_tree(first)
+    first.wait()
+    assert backend.is_installed("Git.Git")
+    assert backend._proc is not first
+    assert not backend.disabled
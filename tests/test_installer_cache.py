@@ -0,0 +1,86 @@
+"""InstallerCache storage and hash checks, and batches installing from it"""
+import os
+
+import pytest
+
+import fake_winget
+from pam_core import ACTION_LABELS, BatchScheduler, InstallerCache, file_sha256
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return InstallerCache(str(tmp_path / "cache"))
+
+
+def download(tmp_path, app_id, version="1.0.0"):
+    directory = str(tmp_path / "downloads" / app_id)
+    fake_winget._write_download(app_id, directory, version)
+    return directory
+
+
+def test_store_and_fetch(tmp_path, cache):
+    entry = cache.store("Test.App", download(tmp_path, "Test.App"))
+    assert (entry["id"], entry["version"], entry["installer"]) == ("Test.App", "1.0.0", "Test.App.exe")
+    directory = cache.fetch("test.app")
+    assert sorted(os.listdir(directory)) == ["Test.App.exe", "Test.App.yaml"]
+    assert file_sha256(os.path.join(directory, "Test.App.exe")) == entry["sha256"]
+    assert cache.lookup("Test.App", "2.0.0") is None
+
+
+def test_identical_installers_are_stored_once(tmp_path, cache):
+    first = cache.store("Test.App", download(tmp_path, "Test.App", "1.0.0"))
+    second = cache.store("Test.App", download(tmp_path, "Test.App", "1.0.1"))
+    assert first["sha256"] == second["sha256"]
+    assert os.listdir(os.path.join(cache.root, "objects")) == [first["sha256"]]
+    assert cache.size() == first["size"]
+
+
+def test_store_rejects_a_hash_mismatch(tmp_path, cache):
+    directory = download(tmp_path, "Test.App")
+    with open(os.path.join(directory, "Test.App.exe"), "a") as fh:
+        fh.write("# tampered\n")
+    with pytest.raises(ValueError, match="does not match"):
+        cache.store("Test.App", directory)
+    assert cache.lookup("Test.App") is None
+
+
+def test_fetch_drops_a_corrupted_object(tmp_path, cache):
+    entry = cache.store("Test.App", download(tmp_path, "Test.App"))
+    installer = os.path.join(cache.root, "objects", entry["sha256"], entry["installer"])
+    with open(installer, "a") as fh:
+        fh.write("# corrupted on the share\n")
+    assert cache.fetch("Test.App") is None
+    assert cache.lookup("Test.App") is None
+    assert not os.path.exists(installer)
+
+
+def test_batches_install_from_the_cache(fake, cache):
+    first = BatchScheduler(["Test.App"], ACTION_LABELS["install"], 2, snapshot={}, cache=cache)
+    first.run()
+    assert first.results == {"Test.App": "done"}
+    assert cache.lookup("Test.App") is not None
+    second = BatchScheduler(["Test.App"], ACTION_LABELS["install"], 2, snapshot={}, cache=cache)
+    second.run()
+    assert second.results == {"Test.App": "done"}
+    assert second.details["Test.App"]["cached"]
+    assert fake.calls["download"] == 1
+
+
+def test_a_download_failing_its_hash_is_not_used(fake, cache, monkeypatch):
+    def bad_download(app_id, directory, version=None):
+        installer = write_download(app_id, directory, version)
+        with open(installer, "a") as fh:
+            fh.write("# not what the manifest says\n")
+        return installer
+
+    write_download = fake_winget._write_download
+    monkeypatch.setattr(fake_winget, "_write_download", bad_download)
+    messages = []
+    scheduler = BatchScheduler(["Test.App"], ACTION_LABELS["install"], 2, lambda m, p: messages.append(m),
+                               snapshot={}, cache=cache)
+    scheduler.run()
+    assert any(m.startswith("Not using the download of Test.App") for m in messages)
+    assert cache.lookup("Test.App") is None
+    # winget fetches and checks the installer itself instead
+    assert fake.calls["install"] == 1
+    assert scheduler.results == {"Test.App": "done"}
@@ -0,0 +1,41 @@
+"""InventoryCache / UpgradeCache listings, and cancelling them"""
+import threading
+import time
+
+import pytest
+
+from pam_core import InventoryCache, UpgradeCache, WingetBackend
+
+
+def cancel_after(seconds):
+    cancel = threading.Event()
+    threading.Timer(seconds, cancel.set).start()
+    return cancel
+
+
+def test_listings_are_cached(tmp_path, fake):
+    inventory = InventoryCache(str(tmp_path / "installed.json"))
+    assert "Git.Git" in [it["Id"] for it in inventory.get()]
+    inventory.get()
+    assert fake.calls["list"] == 1
+    assert InventoryCache(str(tmp_path / "installed.json")).items == inventory.items
+
+
+def test_a_cancelled_listing_keeps_the_last_one(tmp_path, fake, monkeypatch):
+    inventory = InventoryCache(str(tmp_path / "installed.json"))
+    upgrades = UpgradeCache(str(tmp_path / "upgrades.json"))
+    items, available = inventory.get(), upgrades.get()
+    monkeypatch.setenv("FAKE_WINGET_LIST_DELAY", "30")
+    started = time.monotonic()
+    assert inventory.get(force=True, cancel=cancel_after(0.1)) == items
+    # for upgrades an empty listing means "all current": a cut-off one must not look like that
+    assert upgrades.get(force=True, cancel=cancel_after(0.1)) == available != []
+    assert time.monotonic() - started < 2
+
+
+def test_the_cli_backend_kills_a_cancelled_listing(monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_LIST_DELAY", "30")
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        WingetBackend().list_upgrades(cancel_after(0.2))
+    assert time.monotonic() - started < 5
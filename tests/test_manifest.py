@@ -0,0 +1,71 @@
+"""Manifests of `winget download` directories: which installer entry the downloaded file is"""
+import os
+
+import pytest
+
+from pam_core import (
+    InstallerCache, file_sha256, find_downloaded_installer, installer_command, winget_install_or_update,
+)
+
+
+def download_dir(tmp_path, manifest, installer="Test.App.exe"):
+    directory = tmp_path / "download"
+    directory.mkdir()
+    (directory / installer).write_text("#!/bin/sh\nexit 0\n")
+    (directory / "Test.App.yaml").write_text(manifest.format(sha256=file_sha256(str(directory / installer)).upper()))
+    return str(directory)
+
+
+MULTI = """\
+PackageIdentifier: Test.App
+PackageVersion: 1.0.0
+InstallerType: inno
+InstallerSwitches:
+  Silent: /VERYSILENT
+Installers:
+- Architecture: x86
+  InstallerUrl: https://example.com/test-x86.exe
+  InstallerSha256: {other}
+- Architecture: x64
+  InstallerType: nullsoft
+  InstallerUrl: https://example.com/test-x64.exe
+  InstallerSha256: {sha256}
+  InstallerSwitches:
+    Silent: /S /x64
+  AppsAndFeaturesEntries:
+  - DisplayName: Test App
+ManifestType: merged
+"""
+
+
+def test_the_entry_with_the_files_hash_is_used(tmp_path):
+    directory = download_dir(tmp_path, MULTI.replace("{other}", "0" * 64))
+    installer, fields = find_downloaded_installer(directory)
+    assert (fields["Architecture"], fields["InstallerType"], fields["Silent"]) == ("x64", "nullsoft", "/S /x64")
+    assert fields["PackageVersion"] == "1.0.0"
+    assert installer_command(installer, fields) == f'"{installer}" /S /x64'
+
+
+def test_entries_inherit_top_level_values(tmp_path):
+    # the downloaded file is the x86 entry this time, which sets neither type nor switches
+    _, fields = find_downloaded_installer(download_dir(tmp_path, MULTI.replace("{sha256}", "0" * 64)
+                                                       .replace("{other}", "{sha256}")))
+    assert (fields["Architecture"], fields["InstallerType"], fields["Silent"]) == ("x86", "inno", "/VERYSILENT")
+
+
+def test_an_unknown_installer_goes_through_winget(tmp_path, fake):
+    directory = download_dir(tmp_path, MULTI.replace("{other}", "0" * 64).replace("{sha256}", "1" * 64))
+    installer, fields = find_downloaded_installer(directory)
+    assert installer and fields is None
+    assert winget_install_or_update("Test.App", directory, installed=False).returncode == 0
+    assert fake.calls["install"] == 1
+    with pytest.raises(ValueError, match="any of the manifest's installers"):
+        InstallerCache(str(tmp_path / "cache")).store("Test.App", directory)
+
+
+def test_a_single_entry_is_the_installer(tmp_path):
+    manifest = "PackageIdentifier: Test.App\nInstallers:\n  - InstallerType: msi\n    InstallerSha256: {sha256}\n"
+    installer, fields = find_downloaded_installer(download_dir(tmp_path, manifest, "Test.App.msi"))
+    assert fields["InstallerSha256"] == file_sha256(installer).upper()
+    assert installer_command(installer, fields) == f'msiexec /i "{installer}" /qn /norestart'
+    assert os.path.basename(installer) == "Test.App.msi"
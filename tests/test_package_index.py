@@ -0,0 +1,40 @@
+"""PackageIndex: searches from the local SQLite copy, and the connections behind them"""
+import json
+import sqlite3
+
+import pytest
+
+from pam_core import PackageIndex
+
+
+def export(tmp_path, *ids):
+    path = tmp_path / "packages.jsonl"
+    path.write_text("".join(json.dumps({"Id": app_id, "Name": app_id.split(".")[-1], "Version": "1.0"}) + "\n"
+                            for app_id in ids))
+    return str(path)
+
+
+def test_search_finds_exported_packages(tmp_path):
+    index = PackageIndex(str(tmp_path / "packages.db"), export(tmp_path, "Git.Git", "Mozilla.Firefox"))
+    assert index.refresh() == (2, 0)
+    assert [row["Id"] for row in index.search("fire")] == ["Mozilla.Firefox"]
+    assert PackageIndex(str(tmp_path / "packages.db"), None).count == 2
+
+
+def test_connections_are_closed(tmp_path, monkeypatch):
+    opened = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(sqlite3, "connect", connect)
+    index = PackageIndex(str(tmp_path / "packages.db"), export(tmp_path, "Git.Git"))
+    index.refresh()
+    index.search("git")
+    PackageIndex(index.path, None)
+    assert len(opened) == 3
+    for con in opened:
+        with pytest.raises(sqlite3.ProgrammingError, match="closed"):
+            con.execute("SELECT 1")
@@ -0,0 +1,69 @@
+"""iter_winget_table on recorded and synthetic winget tables"""
+import os
+
+from pam_core import iter_winget_table, parse_winget_search_output
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "data")
+
+
+def recorded_lines(name):
+    """benchmarks/data/winget_<name>.txt as winget printed it, spinner and trailer included"""
+    with open(os.path.join(DATA, f"winget_{name}.txt"), encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+def test_recorded_list_rows():
+    rows = {row["Id"]: row for row in iter_winget_table(recorded_lines("list"))}
+    # spinner lines, the header and the "6 upgrades available." trailer are not rows
+    assert len(rows) == 16
+    git = rows["Git.Git"]
+    assert (git["Name"], git["Version"], git["Available"], git["Source"]) == ("Git", "2.43.0", "2.44.0", "winget")
+    assert rows["Mozilla.Firefox"]["Available"] == ""
+    assert rows["Microsoft.UI.Xaml.2.8_8wekyb3d8bbwe"]["Source"] == ""
+    assert all(row["Category"] == "Winget" for row in rows.values())
+
+
+def test_names_keep_their_spacing():
+    rows = {row["Id"]: row for row in iter_winget_table(recorded_lines("list"))}
+    assert rows["OpenJS.NodeJS.LTS"]["Name"] == "Node.js  LTS"
+    assert rows["Microsoft.VCRedist.2015+.x64"]["Name"] == "Microsoft Visual C++ 2015-2022 Redistributa…"
+
+
+def test_wide_characters_shift_the_columns():
+    rows = {row["Id"]: row for row in iter_winget_table(recorded_lines("list"))}
+    row = rows["NetEase.CloudMusic"]
+    assert (row["Name"], row["Version"], row["Source"]) == ("网易云音乐", "2.10.13.202675", "winget")
+
+
+def test_output_without_a_table():
+    lines = ["   - ", "No installed package found matching input criteria."]
+    assert list(iter_winget_table(lines)) == []
+    # a header is only one when the dash line follows it
+    assert list(iter_winget_table(["Name  Id  Version", "Git   Git.Git  2.43.0"])) == []
+
+
+def test_localized_header():
+    output = "\n".join([
+        "Nom       ID        Version  Disponible  Source",
+        "-----------------------------------------------",
+        "Git       Git.Git   2.43.0   2.44.0      winget",
+    ])
+    [row] = parse_winget_search_output(output)
+    assert (row["Name"], row["Id"], row["Version"], row["Disponible"], row["Source"]) == (
+        "Git", "Git.Git", "2.43.0", "2.44.0", "winget")
+
+
+def test_rows_are_yielded_while_reading():
+    recorded = recorded_lines("search")
+    header = next(i for i, ln in enumerate(recorded) if ln.startswith("-----")) + 1
+    read = []
+
+    def lines():
+        for ln in recorded:
+            read.append(ln)
+            yield ln
+
+    first = next(iter_winget_table(lines()))
+    # only the line after the first row has been read, not the whole output
+    assert len(read) == header + 2
+    assert first["Id"] == "7zip.7zip"
@@ -0,0 +1,70 @@
+"""plan_desired_state against an installed snapshot and upgrade listing as winget reports them"""
+import pytest
+
+from pam_core import dependency_order, plan_desired_state
+
+
+@pytest.fixture
+def state():
+    """(snapshot, upgrades) keyed by lower-cased Id, like winget_installed_snapshot / winget_upgrade_listing"""
+    rows = [{"Id": "Git.Git", "Version": "2.43.0", "Available": "2.44.0"},
+            {"Id": "Mozilla.Firefox", "Version": "124.0.1", "Available": ""},
+            {"Id": "VideoLAN.VLC", "Version": "3.0.20", "Available": ""}]
+    snapshot = {row["Id"].lower(): row for row in rows}
+    return snapshot, {key: row for key, row in snapshot.items() if row["Available"]}
+
+
+def test_only_what_differs_is_planned(state):
+    snapshot, upgrades = state
+    plan = plan_desired_state([("Git.Git", None), ("Mozilla.Firefox", None), ("New.Package", None)], snapshot,
+                              upgrades, absent=["VideoLAN.VLC", "Not.Installed"])
+    assert plan.install == ["New.Package"]
+    assert plan.upgrade == ["Git.Git"]
+    assert plan.remove == ["VideoLAN.VLC"]
+    assert plan.unchanged == ["Mozilla.Firefox", "Not.Installed"]
+    assert plan.current["Git.Git"] == "2.43.0"
+    assert plan.target["Git.Git"] == "2.44.0"
+    assert plan.actions() == {"New.Package": "install", "Git.Git": "upgrade"}
+
+
+def test_ids_match_case_insensitively(state):
+    snapshot, upgrades = state
+    plan = plan_desired_state([("mozilla.firefox", None), ("MOZILLA.FIREFOX", None)], snapshot, upgrades)
+    assert plan.unchanged == ["mozilla.firefox"]
+    assert not plan
+
+
+def test_pinned_versions(state):
+    snapshot, upgrades = state
+    plan = plan_desired_state([("Mozilla.Firefox", "125.0"), ("Git.Git", "2.43.0"), ("New.Package", "1.2")],
+                              snapshot, upgrades)
+    # a pin moves an installed package to that version even when winget lists no newer one
+    assert plan.upgrade == ["Mozilla.Firefox"]
+    assert plan.unchanged == ["Git.Git"]
+    assert plan.install == ["New.Package"]
+    assert plan.versions == {"Mozilla.Firefox": "125.0", "Git.Git": "2.43.0", "New.Package": "1.2"}
+
+
+def test_missing_prerequisites_are_planned_first(state):
+    snapshot, upgrades = state
+    depends = {"app.main": ["Lib.Runtime", "Git.Git"], "lib.runtime": ["Lib.Core"]}
+    plan = plan_desired_state([("App.Main", None)], snapshot, upgrades, depends=depends)
+    assert plan.install == ["Lib.Core", "Lib.Runtime", "App.Main"]
+    assert plan.upgrade == ["Git.Git"]
+    assert plan.needed_by == {"Lib.Core": ["Lib.Runtime"], "Lib.Runtime": ["App.Main"], "Git.Git": ["App.Main"]}
+    assert plan.depends == {"App.Main": ["Lib.Runtime", "Git.Git"], "Lib.Runtime": ["Lib.Core"]}
+    assert "install  Lib.Core  (needed by Lib.Runtime)" in plan.describe()
+
+
+def test_prerequisites_wanted_absent_are_not_added(state):
+    snapshot, upgrades = state
+    plan = plan_desired_state([("App.Main", None)], snapshot, upgrades, absent=["VideoLAN.VLC"],
+                              depends={"app.main": ["VideoLAN.VLC"]})
+    assert plan.install == ["App.Main"]
+    assert plan.remove == ["VideoLAN.VLC"]
+    assert plan.depends == {}
+
+
+def test_dependency_cycle_is_rejected():
+    with pytest.raises(ValueError, match="A.A -> B.B -> A.A"):
+        dependency_order(["A.A"], {"a.a": ["B.B"], "b.b": ["A.A"]})
@@ -0,0 +1,51 @@
+"""RotatingLog: batched, timestamped lines on a rotating file"""
+import os
+import re
+
+from pam_core import RotatingLog
+
+
+def read(path):
+    with open(path, encoding="utf-8") as fh:
+        return fh.read().splitlines()
+
+
+def test_every_line_is_timestamped(tmp_path):
+    path = str(tmp_path / "logs" / "progress.log")
+    log = RotatingLog(path)
+    log.write(["---- Installing/Updating 2 app(s) ----", "Downloading Git.Git..."])
+    log.write([])
+    log.write(["Downloaded Git.Git"])
+    log.close()
+    lines = read(path)
+    assert [ln[20:] for ln in lines] == ["---- Installing/Updating 2 app(s) ----", "Downloading Git.Git...",
+                                        "Downloaded Git.Git"]
+    assert all(re.match(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d ", ln) for ln in lines)
+
+
+def test_rolls_over_and_keeps_backups(tmp_path):
+    path = str(tmp_path / "progress.log")
+    log = RotatingLog(path, max_bytes=200, backups=2)
+    for i in range(20):
+        log.write([f"batch {i} line {j}" for j in range(3)])
+    log.close()
+    assert sorted(os.listdir(tmp_path)) == ["progress.log", "progress.log.1", "progress.log.2"]
+    assert all(os.path.getsize(os.path.join(tmp_path, name)) <= 200 for name in os.listdir(tmp_path))
+    # a batch is never split across files, and the newest is in the current one
+    assert read(path)[-1].endswith("batch 19 line 2")
+    assert read(path + ".1")[-1].endswith("batch 18 line 2")
+
+
+def test_unwritable_log_is_turned_off(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    log = RotatingLog(str(blocker / "progress.log"))
+    log.write(["lost"])
+    assert not log.enabled
+    log.write(["also lost"])
+    log.close()
+    # the file itself cannot be opened: the handler reports the error instead of raising it
+    log = RotatingLog(str(tmp_path))
+    log.write(["lost"])
+    assert not log.enabled
+    log.close()
@@ -0,0 +1,177 @@
+"""BatchScheduler against FakeBackend: the installer lane, retries, cancel and the dependency DAG"""
+import subprocess
+import threading
+import time
+
+import fake_winget
+import pam_core
+from pam_core import ACTION_LABELS, BatchScheduler
+
+
+def run_batch(ids, snapshot=None, **kwargs):
+    messages = []
+    scheduler = BatchScheduler(ids, ACTION_LABELS["install"], 4, lambda message, percent: messages.append(message),
+                               {} if snapshot is None else snapshot, **kwargs)
+    scheduler.run()
+    return scheduler, messages
+
+
+def test_batch_installs_everything(fake):
+    ids = [f"Test.Package{i}" for i in range(6)]
+    scheduler, messages = run_batch(ids)
+    assert scheduler.results == {app_id: "done" for app_id in ids}
+    assert fake.calls["download"] == 6
+    assert all(scheduler.details[app_id]["exit_code"] == 0 for app_id in ids)
+    assert f"{ACTION_LABELS['install']} done for Test.Package5" in messages
+
+
+def test_fake_install_lock_rejects_a_second_installer(fake, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_INSTALL_DELAY", "0.3")
+    codes = []
+    first = threading.Thread(target=lambda: codes.append(fake.install("First.One").returncode))
+    first.start()
+    time.sleep(0.1)
+    codes.append(fake.install("Second.One").returncode)
+    first.join()
+    assert sorted(codes) == [0, fake_winget.ERROR_INSTALL_ALREADY_RUNNING]
+
+
+def test_installers_run_one_at_a_time(fake, monkeypatch):
+    # downloads overlap, so only the single installer lane keeps installs off each other's lock
+    monkeypatch.setenv("FAKE_WINGET_DOWNLOAD_DELAY", "0.05")
+    monkeypatch.setenv("FAKE_WINGET_INSTALL_DELAY", "0.05")
+    ids = [f"Test.Package{i}" for i in range(8)]
+    scheduler, _ = run_batch(ids)
+    assert set(scheduler.results.values()) == {"done"}
+    assert not any("retries" in scheduler.details[app_id] for app_id in ids)
+
+
+def test_up_to_date_packages_are_skipped(fake):
+    snapshot = pam_core.winget_installed_snapshot()
+    scheduler, messages = run_batch(["Mozilla.Firefox", "Git.Git", "New.Package"], snapshot)
+    assert scheduler.results == {"Mozilla.Firefox": "skipped", "Git.Git": "done", "New.Package": "done"}
+    assert "Mozilla.Firefox is up to date, skipping" in messages
+    assert fake.calls["download"] == 2
+
+
+def test_transient_download_failures_are_retried(fake, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_FLAKY", "2")
+    scheduler, messages = run_batch(["Flaky.Package"])
+    assert scheduler.results == {"Flaky.Package": "done"}
+    assert scheduler.details["Flaky.Package"]["retries"] == 2
+    assert fake.calls["download"] == 3
+    assert any(m.startswith("Download of Flaky.Package failed") for m in messages)
+
+
+def test_retries_give_up_after_retry_attempts(fake, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_FLAKY", str(pam_core.RETRY_ATTEMPTS))
+    scheduler, messages = run_batch(["Flaky.Package"])
+    assert fake.calls["download"] == pam_core.RETRY_ATTEMPTS
+    # without a download the install goes through winget, which succeeds
+    assert "Download skipped for Flaky.Package, installing through winget" in messages
+    assert scheduler.results == {"Flaky.Package": "done"}
+
+
+def test_only_network_and_source_failures_are_transient():
+    def failure(code, out):
+        return subprocess.CompletedProcess("winget", code, out, "")
+
+    assert pam_core.is_transient_failure(failure(1, fake_winget._NETWORK_ERROR))
+    assert pam_core.is_transient_failure(failure(0x80072EE2, ""))
+    assert pam_core.is_transient_failure(failure(fake_winget.ERROR_INSTALL_ALREADY_RUNNING, ""))
+    assert pam_core.is_transient_failure(failure(1, "Failed when searching source; results will not be included"))
+    # package names and installer output that merely mention the network are not
+    assert not pam_core.is_transient_failure(failure(fake_winget.ERROR_INSTALL_FAILURE,
+                                                     "Installing Network Connection Manager...\n"
+                                                     "Installer failed with exit code: 1603"))
+    assert not pam_core.is_transient_failure(failure(0, fake_winget._NETWORK_ERROR))
+    assert not pam_core.is_transient_failure(failure(pam_core.EXIT_TIMEOUT, "connection"))
+
+
+def test_failed_installs_are_not_retried(fake, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_FAIL", "Broken.Package")
+    scheduler, _ = run_batch(["Broken.Package", "Good.Package"])
+    assert scheduler.results == {"Broken.Package": "failed", "Good.Package": "done"}
+    # the downloaded installer runs as a process: POSIX keeps 8 bits of its exit status
+    assert scheduler.details["Broken.Package"]["exit_code"] in (fake_winget.ERROR_INSTALL_FAILURE,
+                                                                fake_winget.ERROR_INSTALL_FAILURE & 0xFF)
+    assert "retries" not in scheduler.details["Broken.Package"]
+
+
+def test_cancel_stops_the_batch(fake, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_DOWNLOAD_DELAY", "10")
+    scheduler = BatchScheduler([f"Slow.Package{i}" for i in range(6)], ACTION_LABELS["install"], 2, snapshot={})
+    runner = threading.Thread(target=scheduler.run)
+    runner.start()
+    time.sleep(0.2)
+    started = time.monotonic()
+    scheduler.cancel()
+    runner.join(5)
+    assert not runner.is_alive()
+    assert time.monotonic() - started < 2
+    assert scheduler.cancelled
+    assert "done" not in scheduler.results.values()
+    assert scheduler.add(["Late.Package"]) is None
+
+
+def test_prerequisites_install_first(fake):
+    depends = {"app.main": ["Lib.Base"], "lib.base": ["Lib.Core"]}
+    scheduler, messages = run_batch(["App.Main", "Lib.Base", "Lib.Core"], depends=depends)
+    assert set(scheduler.results.values()) == {"done"}
+    label = ACTION_LABELS["install"]
+    order = [m[len(label) + 1:-3] for m in messages if m.startswith(label) and m.endswith("...")]
+    assert order == ["Lib.Core", "Lib.Base", "App.Main"]
+
+
+def test_failed_prerequisite_blocks_its_dependents(fake, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_FAIL", "Lib.Core")
+    depends = {"app.main": ["Lib.Base"], "lib.base": ["Lib.Core"], "app.other": ["Lib.Other"]}
+    scheduler, messages = run_batch(["Lib.Core", "Lib.Base", "App.Main", "Lib.Other", "App.Other"], depends=depends)
+    assert scheduler.results == {"Lib.Core": "failed", "Lib.Base": "blocked", "App.Main": "blocked",
+                                 "Lib.Other": "done", "App.Other": "done"}
+    assert scheduler.details["Lib.Base"]["blocked_by"] == "Lib.Core"
+    assert scheduler.details["App.Main"]["blocked_by"] == "Lib.Base"
+    assert "Skipping App.Main: it needs Lib.Base, which was not installed (blocked)" in messages
+    # blocked packages never reach the installer
+    assert "exit_code" not in scheduler.details["Lib.Base"]
+    assert "exit_code" not in scheduler.details["App.Main"]
+
+
+def start_uninstalls(ids, snapshot=None):
+    """A batch uninstalling ids, running on its own thread; FAKE_WINGET_INSTALL_DELAY keeps it busy"""
+    messages = []
+    scheduler = BatchScheduler(ids, ACTION_LABELS["uninstall"], 2, lambda message, percent: messages.append(message),
+                               snapshot)
+    runner = threading.Thread(target=scheduler.run)
+    runner.start()
+    time.sleep(0.1)
+    return scheduler, runner, messages
+
+
+def test_installs_added_without_a_snapshot_run(fake, monkeypatch):
+    # an uninstall-only batch never reads the inventory, and one older than INVENTORY_TTL is not passed in
+    monkeypatch.setenv("FAKE_WINGET_INSTALL_DELAY", "0.3")
+    scheduler, runner, _ = start_uninstalls(["Git.Git"])
+    assert scheduler.add(["New.Package"], "install") == ["New.Package"]
+    runner.join(10)
+    if runner.is_alive():
+        scheduler.cancel()
+    assert scheduler.results == {"Git.Git": "done", "New.Package": "done"}
+    assert fake.calls["download"] == 1
+
+
+def test_reinstall_after_uninstall(fake, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_INSTALL_DELAY", "0.3")
+    snapshot = pam_core.winget_installed_snapshot()
+    scheduler, runner, messages = start_uninstalls(["Mozilla.Firefox", "VideoLAN.VLC"], snapshot)
+    # Firefox (up to date) is being uninstalled: installing it again is not "up to date"
+    scheduler.add(["Mozilla.Firefox"], "install")
+    # VLC's uninstall is still queued: the later install wins, and VLC is up to date already
+    scheduler.add(["VideoLAN.VLC"], "install")
+    runner.join(10)
+    assert scheduler.results == {"Mozilla.Firefox": "done", "VideoLAN.VLC": "skipped"}
+    assert "Mozilla.Firefox is up to date, skipping" not in messages
+    assert fake.calls["uninstall"] == 1
+    assert scheduler.details["Mozilla.Firefox"]["install_s"] > 0
+    # the snapshot follows the batch: installed again, at a version winget is asked about
+    assert pam_core.classify_package("Mozilla.Firefox", scheduler.snapshot) == "upgrade"
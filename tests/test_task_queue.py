@@ -0,0 +1,70 @@
+"""TaskQueue ordering and coalescing"""
+from pam_core import PRIORITY_BULK, PRIORITY_UNINSTALL, PRIORITY_USER, TaskQueue
+
+
+def drain(queue, ready=None):
+    order = []
+    while True:
+        task = queue.pop(ready)
+        if task is None:
+            return order
+        order.append((task.app_id, task.action, task.priority))
+
+
+def test_priority_then_arrival():
+    queue = TaskQueue()
+    queue.push("Bulk.One", "install", PRIORITY_BULK)
+    queue.push("User.One", "install", PRIORITY_USER)
+    queue.push("Bulk.Two", "install", PRIORITY_BULK)
+    queue.push("Gone.One", "uninstall", PRIORITY_UNINSTALL)
+    queue.push("User.Two", "install", PRIORITY_USER)
+    assert [app_id for app_id, _, _ in drain(queue)] == ["Gone.One", "User.One", "User.Two", "Bulk.One", "Bulk.Two"]
+    assert len(queue) == 0
+
+
+def test_coalescing_keeps_the_higher_priority():
+    queue = TaskQueue()
+    queue.push("A.A", "install", PRIORITY_BULK)
+    queue.push("B.B", "install", PRIORITY_USER)
+    assert queue.push("a.a", "install", PRIORITY_USER).priority == PRIORITY_BULK  # case-insensitive, like winget
+    assert len(queue) == 2
+    # promoted to the user lane, behind B.B which was there first
+    assert drain(queue) == [("B.B", "install", PRIORITY_USER), ("a.a", "install", PRIORITY_USER)]
+
+
+def test_coalescing_never_demotes():
+    queue = TaskQueue()
+    queue.push("A.A", "install", PRIORITY_USER)
+    queue.push("B.B", "install", PRIORITY_BULK)
+    queue.push("A.A", "install", PRIORITY_BULK)
+    assert [(t.app_id, t.priority) for t in queue.tasks()] == [("A.A", PRIORITY_USER), ("B.B", PRIORITY_BULK)]
+
+
+def test_the_later_action_wins():
+    queue = TaskQueue()
+    queue.push("A.A", "install", PRIORITY_USER)
+    queue.push("A.A", "uninstall", PRIORITY_USER)
+    assert drain(queue) == [("A.A", "uninstall", PRIORITY_USER)]
+
+
+def test_pop_skips_tasks_that_are_not_ready():
+    queue = TaskQueue()
+    for app_id in ("A.A", "B.B", "C.C"):
+        queue.push(app_id, "install", PRIORITY_USER)
+    assert queue.pop(lambda task: task.app_id != "A.A").app_id == "B.B"
+    # skipped tasks keep their place
+    assert [t.app_id for t in queue.tasks()] == ["A.A", "C.C"]
+    assert queue.pop(lambda task: False) is None
+    assert len(queue) == 2
+
+
+def test_remove_and_move():
+    queue = TaskQueue()
+    for app_id in ("A.A", "B.B", "C.C"):
+        queue.push(app_id, "install", PRIORITY_USER)
+    assert queue.move("C.C", -2)
+    assert not queue.move("C.C", -1)
+    assert queue.remove("b.b").app_id == "B.B"
+    assert queue.remove("B.B") is None
+    assert "B.B" not in queue
+    assert [app_id for app_id, _, _ in drain(queue)] == ["C.C", "A.A"]